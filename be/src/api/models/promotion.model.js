@@ -91,7 +91,7 @@ const promotionModel = (sequelize) => {
                         });
                         // Dynamic import to avoid circular dependencies
                         const { syncRagKnowledge } = await import('../services/ragSync.service.js');
-                        await syncRagKnowledge({ flushCache: true });
+                        await syncRagKnowledge({ restaurantIds: [promotion.restaurantId], flushCache: true });
                     } catch (error) {
                         logger.error('Failed to sync RAG after promotion create', {
                             error: error.message
@@ -106,7 +106,7 @@ const promotionModel = (sequelize) => {
                             name: promotion.name
                         });
                         const { syncRagKnowledge } = await import('../services/ragSync.service.js');
-                        await syncRagKnowledge({ flushCache: true });
+                        await syncRagKnowledge({ restaurantIds: [promotion.restaurantId], flushCache: true });
                     } catch (error) {
                         logger.error('Failed to sync RAG after promotion update', {
                             error: error.message
@@ -120,7 +120,7 @@ const promotionModel = (sequelize) => {
                             promotionId: promotion.id
                         });
                         const { syncRagKnowledge } = await import('../services/ragSync.service.js');
-                        await syncRagKnowledge({ flushCache: true });
+                        await syncRagKnowledge({ restaurantIds: [promotion.restaurantId], flushCache: true });
                     } catch (error) {
                         logger.error('Failed to sync RAG after promotion delete', {
                             error: error.message
@@ -30,8 +30,14 @@ const ensureRagConfigured = () => {
     return baseUrl;
 };
 
-const buildHeaders = () => {
-    const headers = { 'Content-Type': 'application/json' };
+const NDJSON_CONTENT_TYPE = 'application/x-ndjson';
+const NDJSON_LINES_PER_CHUNK = 100;
+const INGEST_JOB_POLL_MS = 2000;
+const INGEST_JOB_TIMEOUT_MS = 30 * 60 * 1000;
+const INGEST_JOB_FINISHED = new Set(['succeeded', 'failed']);
+
+const buildHeaders = (contentType = 'application/json') => {
+    const headers = { 'Content-Type': contentType };
     if (env.rag?.adminKey) {
         headers[RAG_HEADERS.adminKey] = env.rag.adminKey;
     }
@@ -41,10 +47,12 @@ const buildHeaders = () => {
 const callRag = async (path, payload = null, options = {}) => {
     const baseUrl = ensureRagConfigured();
     const url = `${baseUrl}${path}`;
+    const isStream = payload instanceof ReadableStream;
     const response = await fetch(url, {
         method: options.method || 'POST',
-        headers: buildHeaders(),
-        body: payload ? JSON.stringify(payload) : undefined
+        headers: buildHeaders(options.contentType),
+        body: isStream ? payload : payload ? JSON.stringify(payload) : undefined,
+        ...(isStream ? { duplex: 'half' } : {})
     });
 
     if (!response.ok) {
@@ -64,6 +72,8 @@ const callRag = async (path, payload = null, options = {}) => {
     return response.json();
 };
 
+const toEpochSeconds = (value) => (value ? Math.floor(new Date(value).getTime() / 1000) : undefined);
+
 const formatAddress = (address) => {
     if (!address) {
         return null;
@@ -169,6 +179,8 @@ const buildPromotionDocuments = (promotions, restaurantMap) =>
                     restaurant_id: restaurant.id,
                     source_id: `promotion:${promotion.id}`,
                     tags: ['promotion', promotion.status.toLowerCase()],
+                    starts_at: toEpochSeconds(promotion.startsAt),
+                    ends_at: toEpochSeconds(promotion.endsAt),
                     extras: {
                         startsAt,
                         endsAt,
@@ -220,15 +232,39 @@ const buildMenuDocuments = (categories, restaurantMap) => {
     return documents;
 };
 
-const chunkArray = (items, size) => {
-    if (size <= 0) {
-        return [items];
-    }
-    const chunks = [];
-    for (let index = 0; index < items.length; index += size) {
-        chunks.push(items.slice(index, index + size));
+// Streams documents as NDJSON so the RAG service can start embedding before the upload ends.
+const toNdjsonStream = (documents) => {
+    const encoder = new TextEncoder();
+    let index = 0;
+    return new ReadableStream({
+        pull(controller) {
+            if (index >= documents.length) {
+                controller.close();
+                return;
+            }
+            const lines = documents
+                .slice(index, index + NDJSON_LINES_PER_CHUNK)
+                .map((document) => `${JSON.stringify(document)}\n`);
+            index += lines.length;
+            controller.enqueue(encoder.encode(lines.join('')));
+        }
+    });
+};
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// Ingest runs as a background job on the RAG service; poll until it finishes so
+// no single HTTP request has to stay open for the whole embedding run.
+const waitForIngestJob = async (jobId) => {
+    const deadline = Date.now() + INGEST_JOB_TIMEOUT_MS;
+    while (Date.now() < deadline) {
+        const job = await callRag(`/ingest/jobs/${encodeURIComponent(jobId)}`, null, { method: 'GET' });
+        if (job && INGEST_JOB_FINISHED.has(job.status)) {
+            return job;
+        }
+        await sleep(INGEST_JOB_POLL_MS);
     }
-    return chunks;
+    throw new Error(`RAG ingest job ${jobId} did not finish in time`);
 };
 
 const resolveRestaurants = async (restaurantIds) => {
@@ -370,8 +406,15 @@ const updateLastRun = (summary) => {
     ragSyncState.lastError = null;
 };
 
-export const flushRagCache = async () => {
-    await callRag('/cache/flush');
+export const flushRagCache = async (restaurantIds = undefined) => {
+    if (Array.isArray(restaurantIds) && restaurantIds.length > 0) {
+        // Scoped flushes only bump the restaurants' cache generation; other restaurants stay warm.
+        await Promise.all(
+            restaurantIds.map((id) => callRag(`/cache/flush?restaurant_id=${encodeURIComponent(id)}`))
+        );
+    } else {
+        await callRag('/cache/flush');
+    }
     ragSyncState.lastCacheFlushAt = new Date().toISOString();
     return { flushedAt: ragSyncState.lastCacheFlushAt };
 };
@@ -387,18 +430,26 @@ export const syncRagKnowledge = async ({ restaurantIds = undefined, flushCache =
             throw new Error('No restaurants available for knowledge sync');
         }
 
-        let ingested = 0;
+        let ingestSummary = null;
         if (documents.length > 0) {
-            const batches = chunkArray(documents, 25);
-            for (const batch of batches) {
-                await callRag('/ingest', { documents: batch });
-                ingested += batch.length;
+            // full_sync removes vectors of these restaurants that are no longer produced
+            // (expired promotions, unavailable menu items).
+            const { job_id: jobId } = await callRag('/ingest/jobs?full_sync=true', toNdjsonStream(documents), {
+                contentType: NDJSON_CONTENT_TYPE
+            });
+            const job = await waitForIngestJob(jobId);
+            if (job.status === 'failed') {
+                throw new Error(`RAG ingest job ${jobId} failed: ${job.error || 'unknown error'}`);
+            }
+            ingestSummary = job.progress ?? null;
+            if (ingestSummary?.errors?.length) {
+                logger.warn('RAG Sync - Some documents were not ingested', { jobId, errors: ingestSummary.errors });
             }
         }
 
         if (flushCache) {
             try {
-                await flushRagCache();
+                await flushRagCache(restaurantIds);
             } catch (error) {
                 logger.warn('Failed to flush RAG cache', { message: error.message });
             }
@@ -406,7 +457,11 @@ export const syncRagKnowledge = async ({ restaurantIds = undefined, flushCache =
 
         const summary = {
             restaurants: restaurants.length,
-            documents: ingested
+            documents: documents.length,
+            skippedDocuments: ingestSummary?.skipped_documents ?? 0,
+            ingestedChunks: ingestSummary?.ingested_chunks ?? 0,
+            deletedChunks: ingestSummary?.deleted_chunks ?? 0,
+            failedChunks: ingestSummary?.failed_chunks ?? 0
         };
         updateLastRun(summary);
         logger.info('Knowledge sync completed', summary);
@@ -15,6 +15,31 @@ class Settings(BaseSettings):
     ollama_generate_model: str = Field("mistral:7b-instruct", alias="OLLAMA_GENERATE_MODEL")
     max_result_chunks: int = Field(5, alias="MAX_RESULT_CHUNKS")
     cache_ttl_seconds: int = Field(600, alias="CACHE_TTL_SECONDS")
+    cache_stale_ttl_seconds: int = Field(3600, alias="CACHE_STALE_TTL_SECONDS")
+    cache_compression: str = Field("zstd", alias="CACHE_COMPRESSION")
+    cache_compression_level: int = Field(3, alias="CACHE_COMPRESSION_LEVEL")
+    cache_compression_min_bytes: int = Field(256, alias="CACHE_COMPRESSION_MIN_BYTES")
+    local_cache_max_bytes: int = Field(32 * 1024 * 1024, alias="LOCAL_CACHE_MAX_BYTES")
+    local_cache_ttl_seconds: int = Field(60, alias="LOCAL_CACHE_TTL_SECONDS")
+    query_filler_phrases: str = Field(
+        default="please,pls,plz,thanks,thank you,thx,hi,hello,hey,ok,okay,xin chào,chào,làm ơn,cảm ơn,nhé,ạ",
+        alias="QUERY_FILLER_PHRASES",
+    )
+    query_stopwords: str = Field(default="a,an,the", alias="QUERY_STOPWORDS")
+    chunk_tokenizer_path: str = Field(
+        default="models/menu-similarity-model/tokenizer.json",
+        alias="CHUNK_TOKENIZER_PATH",
+    )
+    embed_max_tokens: int = Field(512, alias="EMBED_MAX_TOKENS")
+    ingest_document_batch_size: int = Field(64, alias="INGEST_DOCUMENT_BATCH_SIZE")
+    ingest_embed_batch_size: int = Field(32, alias="INGEST_EMBED_BATCH_SIZE")
+    ingest_embed_concurrency: int = Field(4, alias="INGEST_EMBED_CONCURRENCY")
+    ingest_upsert_batch_size: int = Field(256, alias="INGEST_UPSERT_BATCH_SIZE")
+    ingest_max_retries: int = Field(3, alias="INGEST_MAX_RETRIES")
+    ingest_retry_backoff_seconds: float = Field(1.0, alias="INGEST_RETRY_BACKOFF_SECONDS")
+    # Per process, not cluster-wide: N replicas run up to N x this many ingest jobs.
+    ingest_job_workers: int = Field(1, alias="INGEST_JOB_WORKERS")
+    ingest_job_ttl_seconds: int = Field(24 * 3600, alias="INGEST_JOB_TTL_SECONDS")
     cors_allow_origins: str = Field("*", alias="CORS_ALLOW_ORIGINS")
     admin_api_key: str = Field("", alias="RAG_ADMIN_API_KEY")
     db_uri: str | None = Field(default=None, alias="DB_URI")
@@ -42,6 +67,14 @@ class Settings(BaseSettings):
             return ["*"]
         return [origin.strip() for origin in value.split(",") if origin.strip()]
 
+    @property
+    def query_filler_phrases_list(self) -> list[str]:
+        return [phrase.strip() for phrase in self.query_filler_phrases.split(",") if phrase.strip()]
+
+    @property
+    def query_stopwords_list(self) -> list[str]:
+        return [word.strip() for word in self.query_stopwords.split(",") if word.strip()]
+
 
 @lru_cache()
 def get_settings() -> Settings:
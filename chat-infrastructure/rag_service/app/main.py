@@ -1,10 +1,33 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .config import get_settings
 from .routers import analytics, clarification, rag
+from .services.cache import run_invalidation_listener
+from .services.jobs import run_job_workers
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    settings = get_settings()
+    tasks = [asyncio.create_task(run_invalidation_listener())]
+    if settings.ingest_job_workers > 0:
+        tasks.append(asyncio.create_task(run_job_workers(settings.ingest_job_workers)))
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
 
 
 def create_app() -> FastAPI:
@@ -13,6 +36,7 @@ def create_app() -> FastAPI:
         title="Restaurant RAG Service",
         description="Retrieval augmented generation service for customer support.",
         version="0.1.0",
+        lifespan=lifespan,
     )
 
     allow_origins = settings.cors_allow_origins_list
@@ -1,20 +1,34 @@
 from __future__ import annotations
 
-from typing import Any
+import json
+from typing import Any, AsyncIterator, Literal
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 
 from ..schemas import (
+    CacheStatsResponse,
     EmbedRequest,
     EmbedResponse,
     HealthResponse,
+    IngestDocument,
+    IngestJobResponse,
     IngestRequest,
     RagQueryRequest,
     RagQueryResponse,
 )
-from ..services.cache import clear_cached_answers, get_client as get_redis_client
+from ..services.cache import (
+    bump_generations,
+    clear_cached_answers,
+    get_cache_stats,
+    get_client as get_redis_client,
+    iter_clear_cached_answers,
+)
 from ..services.embedding import embed_texts
-from ..services.ingest import ingest_documents
+from ..services.ingest import IngestStats, ingest_documents, ingest_stream, iter_ndjson_lines
+from ..services.jobs import create_job, get_job
 from ..services.query import answer_question
 from ..services.vectorstore import get_client as get_qdrant_client
 from .dependencies import require_admin_key
@@ -22,22 +36,179 @@ from .dependencies import require_admin_key
 router = APIRouter(prefix="/rag", tags=["RAG"])
 
 
-@router.post("/ingest", dependencies=[Depends(require_admin_key)])
-async def ingest(request: IngestRequest) -> dict[str, Any]:
-    inserted = await ingest_documents(request)
-    return {"ingested_chunks": inserted}
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
 
+_INGEST_REQUEST_BODY = {
+    "required": True,
+    "content": {
+        "application/json": {"schema": IngestRequest.model_json_schema()},
+        NDJSON_MEDIA_TYPE: {"schema": IngestDocument.model_json_schema()},
+    },
+}
+
+
+def _is_ndjson(request: Request) -> bool:
+    return request.headers.get("content-type", "").startswith(NDJSON_MEDIA_TYPE)
+
+
+async def _read_ingest_request(request: Request) -> IngestRequest:
+    try:
+        return IngestRequest.model_validate_json(await request.body())
+    except ValidationError as exc:
+        errors = [{**error, "loc": ("body", *error["loc"])} for error in exc.errors(include_url=False)]
+        raise RequestValidationError(errors) from exc
 
-@router.post("/query", response_model=RagQueryResponse)
-async def query(request: RagQueryRequest) -> RagQueryResponse:
-    answer, sources, cached = await answer_question(request)
-    return RagQueryResponse(answer=answer, sources=sources, cached=cached)
 
+def _set_ingest_status(response: Response, stats: IngestStats) -> None:
+    # Chunks that could not be embedded or stored are an upstream failure, not a success.
+    if not stats.ok:
+        response.status_code = 502
 
-@router.post("/cache/flush", dependencies=[Depends(require_admin_key)])
-async def flush_cache() -> dict[str, Any]:
-    deleted = await clear_cached_answers()
-    return {"deleted": deleted}
+
+@router.post(
+    "/ingest",
+    dependencies=[Depends(require_admin_key)],
+    openapi_extra={"requestBody": _INGEST_REQUEST_BODY},
+)
+async def ingest(
+    request: Request,
+    response: Response,
+    chunk_size: int = Query(default=500, ge=100, le=2000, description="NDJSON uploads only."),
+    chunk_overlap: int = Query(default=100, ge=0, le=500, description="NDJSON uploads only."),
+    full_sync: bool = Query(default=False, description="NDJSON uploads only."),
+    full_sync_scope: Literal["restaurants", "catalog"] = Query(
+        default="restaurants", description="NDJSON uploads only."
+    ),
+    results: Literal["all", "errors", "none"] = Query(
+        default="all", description="Per-line results to return for NDJSON uploads."
+    ),
+) -> dict[str, Any]:
+    if not _is_ndjson(request):
+        stats = await ingest_documents(await _read_ingest_request(request))
+        _set_ingest_status(response, stats)
+        return stats.as_dict()
+
+    # One document per line, validated and fed into the pipeline while the upload is still arriving.
+    stats = IngestStats()
+    line_results: dict[int, dict[str, Any]] = {}
+    document_lines: list[int] = []
+
+    def record(line: int, status: str, details: dict[str, Any]) -> None:
+        if results == "all" or (results == "errors" and status in ("invalid", "failed")):
+            line_results[line] = {"line": line, "status": status, **details}
+        else:
+            line_results.pop(line, None)
+
+    async def documents() -> AsyncIterator[IngestDocument]:
+        async for line, raw in iter_ndjson_lines(request.stream()):
+            try:
+                doc = IngestDocument.model_validate_json(raw)
+            except ValidationError as exc:
+                stats.invalid_documents += 1
+                record(line, "invalid", {"error": exc.errors(include_url=False)[0]["msg"]})
+                continue
+            if results != "none":
+                document_lines.append(line)
+            yield doc
+
+    await ingest_stream(
+        documents(),
+        chunk_size,
+        chunk_overlap,
+        full_sync=full_sync,
+        full_sync_scope=full_sync_scope,
+        on_document=None if results == "none" else (
+            lambda ordinal, status, details: record(document_lines[ordinal], status, details)
+        ),
+        stats=stats,
+    )
+    _set_ingest_status(response, stats)
+    return {"summary": stats.as_dict(), "results": [line_results[line] for line in sorted(line_results)]}
+
+
+@router.post(
+    "/ingest/jobs",
+    dependencies=[Depends(require_admin_key)],
+    status_code=202,
+    openapi_extra={"requestBody": _INGEST_REQUEST_BODY},
+)
+async def create_ingest_job(
+    request: Request,
+    chunk_size: int = Query(default=500, ge=100, le=2000, description="NDJSON uploads only."),
+    chunk_overlap: int = Query(default=100, ge=0, le=500, description="NDJSON uploads only."),
+    full_sync: bool = Query(default=False, description="NDJSON uploads only."),
+    full_sync_scope: Literal["restaurants", "catalog"] = Query(
+        default="restaurants", description="NDJSON uploads only."
+    ),
+) -> dict[str, Any]:
+    """Queue documents for background ingestion; poll ``/rag/ingest/jobs/{job_id}`` for progress."""
+    if _is_ndjson(request):
+        lines = (raw.decode("utf-8") async for _, raw in iter_ndjson_lines(request.stream()))
+        return await create_job(
+            lines, chunk_size, chunk_overlap, full_sync=full_sync, full_sync_scope=full_sync_scope
+        )
+
+    payload = await _read_ingest_request(request)
+
+    async def lines_from_payload() -> AsyncIterator[str]:
+        for doc in payload.documents:
+            yield doc.model_dump_json()
+
+    return await create_job(
+        lines_from_payload(),
+        payload.chunk_size,
+        payload.chunk_overlap,
+        full_sync=payload.full_sync,
+        full_sync_scope=payload.full_sync_scope,
+    )
+
+
+@router.get(
+    "/ingest/jobs/{job_id}", dependencies=[Depends(require_admin_key)], response_model=IngestJobResponse
+)
+async def ingest_job_status(job_id: str) -> IngestJobResponse:
+    job = await get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingest job not found.")
+    return IngestJobResponse(**job)
+
+
+@router.post("/query", response_model=RagQueryResponse)
+async def query(request: RagQueryRequest) -> RagQueryResponse:
+    answer, sources, cached, stale = await answer_question(request)
+    return RagQueryResponse(answer=answer, sources=sources, cached=cached, stale=stale)
+
+
+@router.post("/cache/flush", dependencies=[Depends(require_admin_key)], response_model=None)
+async def flush_cache(
+    restaurant_id: str | None = Query(default=None),
+    purge: bool = Query(default=False, description="Also unlink the restaurant's superseded keys now."),
+    stream: bool = Query(default=False, description="Stream NDJSON progress while keys are unlinked."),
+    batch_size: int = Query(default=1000, ge=10, le=10000),
+) -> dict[str, Any] | StreamingResponse:
+    result: dict[str, Any] = {}
+    if restaurant_id:
+        generations = await bump_generations([restaurant_id])
+        result = {"restaurant_id": restaurant_id, "generation": generations[restaurant_id]}
+        if not purge:
+            return result
+
+    if stream:
+        async def progress() -> AsyncIterator[str]:
+            deleted = 0
+            async for deleted in iter_clear_cached_answers(restaurant_id=restaurant_id, batch_size=batch_size):
+                yield json.dumps({"deleted": deleted}) + "\n"
+            yield json.dumps({**result, "deleted": deleted, "done": True}) + "\n"
+
+        return StreamingResponse(progress(), media_type="application/x-ndjson")
+
+    deleted = await clear_cached_answers(restaurant_id=restaurant_id, batch_size=batch_size)
+    return {**result, "deleted": deleted}
+
+
+@router.get("/cache/stats", dependencies=[Depends(require_admin_key)], response_model=CacheStatsResponse)
+async def cache_stats() -> CacheStatsResponse:
+    return CacheStatsResponse(**get_cache_stats())
 
 
 @router.post("/embed", dependencies=[Depends(require_admin_key)], response_model=EmbedResponse)
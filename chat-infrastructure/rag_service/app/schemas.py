@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -11,6 +11,9 @@ class DocumentMetadata(BaseModel):
     source_id: Optional[str] = Field(default=None)
     tags: List[str] = Field(default_factory=list)
     extras: Dict[str, Any] = Field(default_factory=dict)
+    starts_at: Optional[float] = Field(default=None, description="Unix timestamp the content becomes valid.")
+    ends_at: Optional[float] = Field(default=None, description="Unix timestamp the content stops being valid.")
+    valid_until: Optional[float] = Field(default=None, description="Unix timestamp the last attached voucher expires.")
 
 
 class IngestDocument(BaseModel):
@@ -22,6 +25,27 @@ class IngestRequest(BaseModel):
     documents: List[IngestDocument]
     chunk_size: int = Field(500, ge=100, le=2000)
     chunk_overlap: int = Field(100, ge=0, le=500)
+    full_sync: bool = Field(
+        default=False,
+        description="Delete every other source of the submitted restaurants that is not part of this request.",
+    )
+    full_sync_scope: Literal["restaurants", "catalog"] = Field(
+        default="restaurants",
+        description="With full_sync, 'catalog' also deletes every source of restaurants absent from this request.",
+    )
+
+
+class IngestJobResponse(BaseModel):
+    job_id: str
+    status: str = Field(..., description="uploading, queued, running, succeeded or failed.")
+    created_at: Optional[float] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    documents_total: int = 0
+    progress: Optional[Dict[str, Any]] = Field(
+        default=None, description="Ingest counters: chunks embedded/ingested/failed, throughput and errors."
+    )
+    error: Optional[str] = None
 
 
 class SourceChunk(BaseModel):
@@ -41,6 +65,21 @@ class RagQueryResponse(BaseModel):
     answer: str
     sources: List[SourceChunk]
     cached: bool = False
+    stale: bool = Field(default=False, description="Served from cache past its soft TTL while a refresh runs.")
+
+
+class CacheStatsResponse(BaseModel):
+    lookups: int
+    local_hits: int
+    redis_hits: int
+    misses: int
+    invalidations: int
+    local_entries: int
+    local_bytes: int
+    local_max_bytes: int
+    local_hit_ratio: float
+    redis_hit_ratio: float
+    overall_hit_ratio: float
 
 
 class HealthResponse(BaseModel):
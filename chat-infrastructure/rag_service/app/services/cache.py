@@ -1,25 +1,122 @@
 from __future__ import annotations
 
+import asyncio
+import copy
 import hashlib
 import json
+import logging
+import math
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Sequence, Tuple
 
 from redis.exceptions import ResponseError
 from redis.asyncio import Redis
 
 from ..config import get_settings
+from .canonicalize import canonicalize_query
+from .codec import CodecError, decode_payload, encode_payload
+
+logger = logging.getLogger(__name__)
 
 _redis_client: Redis | None = None
-_lua_sha: str | None = None
-_SCRIPT_PATH = Path(__file__).resolve().parents[2] / "scripts" / "lua" / "cache_answer.lua"
+_binary_client: Redis | None = None
+_LUA_DIR = Path(__file__).resolve().parents[2] / "scripts" / "lua"
+_CACHE_SCRIPT = "cache_answer.lua"
+_CLEAR_SCRIPT = "clear_rag_cache.lua"
+_script_shas: Dict[str, str] = {}
+
+ANSWER_PREFIX = "rag:answer:"
+GENERATION_PREFIX = "rag:generation:"
+REFRESH_PREFIX = "rag:refresh:"
+# How long one replica owns the background regeneration of a stale answer.
+REFRESH_LOCK_SECONDS = 60
+INVALIDATION_CHANNEL = "rag:cache:invalidate"
+# Scope for answers not tied to one restaurant; they are retrieved across every
+# restaurant's documents, so any restaurant change also bumps this scope.
+GLOBAL_SCOPE = "_all"
+# Source metadata fields bounding how long an answer built from them stays correct.
+TIME_BOUND_FIELDS = ("ends_at", "valid_until")
+
+
+class LocalAnswerCache:
+    """In-process LRU tier bounded by total payload bytes, with a per-entry TTL."""
+
+    def __init__(self, max_bytes: int, ttl_seconds: int) -> None:
+        self.max_bytes = max(max_bytes, 0)
+        self.ttl_seconds = max(ttl_seconds, 0)
+        self.size_bytes = 0
+        self._entries: "OrderedDict[str, Tuple[float, int, Dict[str, Any]]]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and self.ttl_seconds > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, _, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        # Callers may mutate the response they build from it; hits must stay unchanged.
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Dict[str, Any], size: int, ttl_seconds: int) -> None:
+        if not self.enabled or size > self.max_bytes:
+            return
+        self._remove(key)
+        ttl = min(self.ttl_seconds, ttl_seconds) if ttl_seconds > 0 else self.ttl_seconds
+        self._entries[key] = (time.monotonic() + ttl, size, value)
+        self.size_bytes += size
+        while self.size_bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def invalidate_prefix(self, prefix: str) -> int:
+        keys = [key for key in self._entries if key.startswith(prefix)]
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size_bytes = 0
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= entry[1]
+
+
+_local_cache: LocalAnswerCache | None = None
+# scope -> (generation, monotonic time it was read from Redis)
+_generations: Dict[str, Tuple[int, float]] = {}
+_stats: Dict[str, int] = {"lookups": 0, "local_hits": 0, "redis_hits": 0, "misses": 0, "invalidations": 0}
+
+
+def _scope(restaurant_id: str | None) -> str:
+    return restaurant_id or GLOBAL_SCOPE
+
+
+def _scope_prefix(scope: str) -> str:
+    return f"{ANSWER_PREFIX}{scope}:"
+
+
+def _glob_escape(value: str) -> str:
+    """Escape Redis glob metacharacters so ``value`` only matches itself in SCAN MATCH."""
+    return "".join(f"\\{char}" if char in "*?[]\\" else char for char in value)
 
 
-def _build_key(question: str, restaurant_id: str | None) -> str:
-    digest = hashlib.sha256(question.strip().lower().encode("utf-8")).hexdigest()
-    if restaurant_id:
-        return f"rag:answer:{restaurant_id}:{digest}"
-    return f"rag:answer:{digest}"
+def _build_key(question: str, restaurant_id: str | None, generation: int) -> str:
+    digest = hashlib.sha256(canonicalize_query(question).encode("utf-8")).hexdigest()
+    return f"{_scope_prefix(_scope(restaurant_id))}g{generation}:{digest}"
 
 
 def get_client() -> Redis:
@@ -30,70 +127,307 @@ def get_client() -> Redis:
     return _redis_client
 
 
-async def get_cached_answer(question: str, restaurant_id: str | None) -> Optional[Dict[str, Any]]:
-    client = get_client()
-    key = _build_key(question, restaurant_id)
-    data = await client.hgetall(key)
-    if not data:
-        return None
-    if "sources" in data:
+def get_binary_client() -> Redis:
+    """Client without response decoding, for encoded cache values."""
+    global _binary_client
+    if _binary_client is None:
+        settings = get_settings()
+        _binary_client = Redis.from_url(settings.redis_url, decode_responses=False)
+    return _binary_client
+
+
+def decode_cached_fields(data: Dict[bytes, bytes]) -> Optional[Dict[str, Any]]:
+    """Decode a cached answer hash in either the encoded (``v``) or the legacy field layout."""
+    blob = data.get(b"v")
+    if blob is not None:
         try:
-            data["sources"] = json.loads(data["sources"])
-        except json.JSONDecodeError:
-            data["sources"] = []
-    return data
+            value = decode_payload(blob)
+        except CodecError as exc:
+            logger.warning("Discarding unreadable cached answer: %s", exc)
+            return None
+        return value if isinstance(value, dict) else None
+
+    if b"answer" not in data:
+        return None
+    try:
+        sources = json.loads(data.get(b"sources", b"[]"))
+    except json.JSONDecodeError:
+        sources = []
+    return {"answer": data[b"answer"].decode("utf-8"), "sources": sources}
+
+
+def get_local_cache() -> LocalAnswerCache:
+    global _local_cache
+    if _local_cache is None:
+        settings = get_settings()
+        _local_cache = LocalAnswerCache(settings.local_cache_max_bytes, settings.local_cache_ttl_seconds)
+    return _local_cache
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    local = get_local_cache()
+    lookups = _stats["lookups"]
+    redis_lookups = lookups - _stats["local_hits"]
+    return {
+        **_stats,
+        "local_entries": len(local),
+        "local_bytes": local.size_bytes,
+        "local_max_bytes": local.max_bytes,
+        "local_hit_ratio": _stats["local_hits"] / lookups if lookups else 0.0,
+        "redis_hit_ratio": _stats["redis_hits"] / redis_lookups if redis_lookups else 0.0,
+        "overall_hit_ratio": (_stats["local_hits"] + _stats["redis_hits"]) / lookups if lookups else 0.0,
+    }
+
+
+async def get_generation(restaurant_id: str | None) -> int:
+    """Current cache generation for a restaurant, read through a short-lived local copy."""
+    scope = _scope(restaurant_id)
+    local = get_local_cache()
+    cached = _generations.get(scope)
+    if cached is not None and time.monotonic() - cached[1] < local.ttl_seconds:
+        return cached[0]
+    value = await get_client().get(f"{GENERATION_PREFIX}{scope}")
+    generation = int(value or 0)
+    _generations[scope] = (generation, time.monotonic())
+    return generation
+
+
+async def bump_generations(restaurant_ids: Iterable[str | None]) -> Dict[str, int]:
+    """Invalidate every cached answer for the given restaurants in O(1) per restaurant.
+
+    Old keys are left to expire through their TTL.
+    """
+    scopes = sorted({_scope(restaurant_id) for restaurant_id in restaurant_ids} | {GLOBAL_SCOPE})
+    pipe = get_client().pipeline(transaction=False)
+    for scope in scopes:
+        pipe.incr(f"{GENERATION_PREFIX}{scope}")
+    generations = dict(zip(scopes, (int(value) for value in await pipe.execute())))
+    await publish_invalidation(scopes)
+    return generations
+
+
+async def get_cached_answer(
+    question: str, restaurant_id: str | None, generation: int
+) -> Optional[Dict[str, Any]]:
+    _stats["lookups"] += 1
+    key = _build_key(question, restaurant_id, generation)
+    local = get_local_cache()
+    value = local.get(key)
+    if value is not None:
+        _stats["local_hits"] += 1
+        return value
+
+    data = await get_binary_client().hgetall(key)
+    value = decode_cached_fields(data) if data else None
+    if value is None:
+        _stats["misses"] += 1
+        return None
+    if _expired(value):
+        _stats["misses"] += 1
+        return None
+    _stats["redis_hits"] += 1
+    ttl = _local_ttl(value, get_settings().cache_ttl_seconds)
+    if ttl is not None:
+        local.set(key, value, sum(len(field) for field in data.values()), ttl)
+    return value
 
 
 async def set_cached_answer(
     question: str,
     restaurant_id: str | None,
+    generation: int,
     answer: str,
     sources: list[dict[str, Any]],
     ttl_seconds: int,
     session_id: str | None,
+    stale_ttl_seconds: int = 0,
 ) -> None:
-    client = get_client()
-    key = _build_key(question, restaurant_id)
-    await _eval_cache_script(client, key, answer, sources, ttl_seconds, session_id, question)
+    """Cache an answer that is fresh for ``ttl_seconds`` and may be served stale for ``stale_ttl_seconds`` more."""
+    key = _build_key(question, restaurant_id, generation)
+    value: Dict[str, Any] = {"answer": answer, "sources": sources}
+    now = time.time()
+    expires_at = sources_expiry(sources)
+    if expires_at is not None and expires_at <= now:
+        return
+    hard_ttl = ttl_seconds
+    if ttl_seconds > 0:
+        value["fresh_until"] = now + ttl_seconds
+        hard_ttl += max(stale_ttl_seconds, 0)
+    if expires_at is not None:
+        # Neither fresh nor stale hits may outlive a promotion the answer is built from.
+        value["expires_at"] = expires_at
+        value["fresh_until"] = min(value.get("fresh_until", expires_at), expires_at)
+        remaining = math.ceil(expires_at - now)
+        hard_ttl = min(hard_ttl, remaining) if hard_ttl > 0 else remaining
+    blob = encode_payload(value)
+    await _eval_cache_script(get_binary_client(), key, blob, hard_ttl, session_id, question, answer)
+    ttl = _local_ttl(value, hard_ttl)
+    if ttl is not None:
+        get_local_cache().set(key, value, len(blob), ttl)
+
+
+def sources_expiry(sources: Iterable[Dict[str, Any]]) -> Optional[float]:
+    """Earliest ``ends_at``/``valid_until`` among the sources' time-bounded chunks, if any."""
+    bounds = [
+        float(bound)
+        for source in sources
+        for bound in ((source.get("metadata") or {}).get(field) for field in TIME_BOUND_FIELDS)
+        if isinstance(bound, (int, float))
+    ]
+    return min(bounds) if bounds else None
+
+
+def _expired(value: Dict[str, Any]) -> bool:
+    expires_at = value.get("expires_at")
+    return expires_at is not None and expires_at <= time.time()
+
+
+def _local_ttl(value: Dict[str, Any], default: float) -> Optional[float]:
+    """How long the local tier may hold ``value``; None once it is stale.
+
+    Only fresh answers are held locally, and only until they turn stale. Stale hits
+    therefore always come from Redis, so every replica sees a regenerated answer as
+    soon as it is written rather than after the local TTL.
+    """
+    fresh_until = value.get("fresh_until")
+    if fresh_until is None:
+        return default
+    remaining = fresh_until - time.time()
+    return remaining if remaining > 0 else None
+
+
+def is_stale(value: Dict[str, Any]) -> bool:
+    fresh_until = value.get("fresh_until")
+    return fresh_until is not None and fresh_until <= time.time()
+
+
+async def claim_refresh(question: str, restaurant_id: str | None, generation: int) -> bool:
+    """Return True if this caller should regenerate the stale answer; other replicas get False."""
+    lock_key = f"{REFRESH_PREFIX}{_build_key(question, restaurant_id, generation)}"
+    return bool(await get_client().set(lock_key, "1", nx=True, ex=REFRESH_LOCK_SECONDS))
 
 
 async def _eval_cache_script(
     client: Redis,
     key: str,
-    answer: str,
-    sources: list[dict[str, Any]],
+    blob: bytes,
     ttl_seconds: int,
     session_id: str | None,
     question: str,
+    answer: str,
 ) -> None:
-    global _lua_sha
     payload = [
-        answer,
-        json.dumps(sources),
+        blob,
         str(ttl_seconds),
         session_id or "",
         question,
+        encode_payload(answer) if session_id else b"",
     ]
+    await run_script(client, _CACHE_SCRIPT, [key], payload)
+
 
-    if _lua_sha is None:
-        script = _SCRIPT_PATH.read_text(encoding="utf-8")
-        _lua_sha = await client.script_load(script)
+async def run_script(client: Redis, name: str, keys: Sequence[str], args: Sequence[Any]) -> Any:
+    """EVALSHA a script from ``scripts/lua``, loading it on first use or after a Redis restart."""
+    sha = _script_shas.get(name)
+    if sha is None:
+        sha = _script_shas[name] = await client.script_load((_LUA_DIR / name).read_text(encoding="utf-8"))
 
     try:
-        await client.evalsha(_lua_sha, 1, key, *payload)
+        return await client.evalsha(sha, len(keys), *keys, *args)
     except ResponseError as exc:
-        if "NOSCRIPT" in str(exc):
-            script = _SCRIPT_PATH.read_text(encoding="utf-8")
-            _lua_sha = await client.script_load(script)
-            await client.evalsha(_lua_sha, 1, key, *payload)
-        else:
+        if "NOSCRIPT" not in str(exc):
             raise
+        sha = _script_shas[name] = await client.script_load((_LUA_DIR / name).read_text(encoding="utf-8"))
+        return await client.evalsha(sha, len(keys), *keys, *args)
+
+
+async def publish_invalidation(scopes: Iterable[str]) -> None:
+    """Drop local entries for ``scopes`` here and on every replica subscribed to the channel.
+
+    The scope ``"*"`` drops everything.
+    """
+    scopes = sorted(set(scopes))
+    if not scopes:
+        return
+    _invalidate_local(scopes)
+    await get_client().publish(INVALIDATION_CHANNEL, json.dumps({"scopes": scopes}))
 
 
-async def clear_cached_answers(pattern: str = "rag:answer:*") -> int:
+async def iter_clear_cached_answers(
+    pattern: str | None = None,
+    restaurant_id: str | None = None,
+    batch_size: int = 1000,
+) -> AsyncIterator[int]:
+    """Unlink matching answer keys one server-side SCAN step at a time.
+
+    Each step is a single short ``clear_rag_cache.lua`` call, so live traffic is
+    never blocked behind the flush. Yields the running total after every step.
+    """
+    if pattern is None:
+        pattern = f"{_glob_escape(_scope_prefix(restaurant_id))}*" if restaurant_id else f"{ANSWER_PREFIX}*"
     client = get_client()
+    cursor = "0"
+    deleted = 0
+    try:
+        while True:
+            cursor, removed = await run_script(client, _CLEAR_SCRIPT, [pattern], [cursor, batch_size])
+            deleted += int(removed)
+            yield deleted
+            if str(cursor) == "0":
+                break
+    finally:
+        await publish_invalidation([restaurant_id] if restaurant_id else ["*"])
+
+
+async def clear_cached_answers(
+    pattern: str | None = None,
+    restaurant_id: str | None = None,
+    batch_size: int = 1000,
+) -> int:
     deleted = 0
-    async for key in client.scan_iter(match=pattern):
-        await client.delete(key)
-        deleted += 1
+    async for deleted in iter_clear_cached_answers(pattern, restaurant_id, batch_size):
+        pass
     return deleted
+
+
+def _invalidate_local(scopes: Iterable[str]) -> int:
+    local = get_local_cache()
+    dropped = 0
+    for scope in scopes:
+        if scope == "*":
+            dropped += len(local)
+            local.clear()
+            _generations.clear()
+            continue
+        _generations.pop(scope, None)
+        dropped += local.invalidate_prefix(_scope_prefix(scope))
+    return dropped
+
+
+def _apply_invalidation_message(data: str) -> None:
+    try:
+        scopes = json.loads(data).get("scopes", [])
+    except (json.JSONDecodeError, AttributeError):
+        logger.warning("Ignoring malformed cache invalidation message: %r", data)
+        return
+    _stats["invalidations"] += _invalidate_local(scopes)
+
+
+async def run_invalidation_listener(retry_seconds: float = 1.0) -> None:
+    """Apply invalidations published by other replicas to this process' local tier."""
+    while True:
+        pubsub = get_client().pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    _apply_invalidation_message(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:  # pragma: no cover
+            logger.warning("Cache invalidation listener disconnected: %s", exc)
+        finally:
+            await pubsub.aclose()
+        # Invalidations may have been missed while disconnected.
+        _invalidate_local(["*"])
+        await asyncio.sleep(retry_seconds)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import unicodedata
+from functools import lru_cache
+from typing import FrozenSet, List, Tuple
+
+from ..config import get_settings
+
+
+def _fold(text: str) -> List[str]:
+    """NFKC-normalise, casefold and replace punctuation/symbols with spaces, returning tokens."""
+    normalized = unicodedata.normalize("NFKC", text).casefold()
+    folded = "".join(" " if unicodedata.category(ch)[0] in "PSZC" else ch for ch in normalized)
+    return folded.split()
+
+
+@lru_cache(maxsize=8)
+def _vocabulary(fillers: Tuple[str, ...], stopwords: Tuple[str, ...]) -> Tuple[Tuple[Tuple[str, ...], ...], FrozenSet[str]]:
+    phrases = {tuple(_fold(phrase)) for phrase in fillers}
+    # Longest first so "thank you" wins over a bare "thank".
+    ordered = tuple(sorted((phrase for phrase in phrases if phrase), key=len, reverse=True))
+    words = frozenset(token for word in stopwords for token in _fold(word))
+    return ordered, words
+
+
+def _strip_fillers(tokens: List[str], fillers: Tuple[Tuple[str, ...], ...]) -> List[str]:
+    start, end = 0, len(tokens)
+    changed = True
+    while changed and start < end:
+        changed = False
+        for phrase in fillers:
+            size = len(phrase)
+            if end - start >= size and tuple(tokens[start : start + size]) == phrase:
+                start += size
+                changed = True
+            if end - start >= size and tuple(tokens[end - size : end]) == phrase:
+                end -= size
+                changed = True
+    return tokens[start:end]
+
+
+def canonicalize_query(text: str) -> str:
+    """Reduce a customer question to the form used for cache keys and query embeddings.
+
+    Applies Unicode NFKC, casefolding, punctuation/whitespace folding, strips
+    leading/trailing filler phrases (``QUERY_FILLER_PHRASES``) and drops
+    ``QUERY_STOPWORDS``. If nothing meaningful is left the folded text is kept.
+    """
+    settings = get_settings()
+    fillers, stopwords = _vocabulary(
+        tuple(settings.query_filler_phrases_list), tuple(settings.query_stopwords_list)
+    )
+    tokens = _fold(text)
+    core = [token for token in _strip_fillers(tokens, fillers) if token not in stopwords]
+    return " ".join(core or tokens)
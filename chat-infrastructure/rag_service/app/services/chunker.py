@@ -1,30 +1,144 @@
 from __future__ import annotations
 
-from typing import Iterable, List
+import logging
+import re
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
 
+from ..config import get_settings
 
-def sliding_window_chunks(text: str, chunk_size: int, chunk_overlap: int) -> List[str]:
-    """Split text into overlapping chunks to preserve context around boundaries."""
-    tokens = text.split()
-    if not tokens:
+try:  # Optional: only needed unless CHUNK_TOKENIZER_PATH is empty (whitespace "tokens").
+    from tokenizers import Tokenizer
+except ImportError:  # pragma: no cover - optional dependency
+    Tokenizer = None  # type: ignore[assignment,misc]
+
+logger = logging.getLogger(__name__)
+
+# Bump when chunk boundaries change so content hashes force a re-ingest.
+CHUNKER_VERSION = 2
+# Relative CHUNK_TOKENIZER_PATH values are resolved against the service directory.
+SERVICE_ROOT = Path(__file__).resolve().parents[2]
+# [CLS] and [SEP] are added by the embedding model around every chunk.
+SPECIAL_TOKENS_RESERVE = 2
+# A sentence end followed by whitespace, or a line break.
+_BREAK = re.compile(r"[.!?…。！？]['\")\]]*(?=\s)|\n")
+_WORD = re.compile(r"\S+")
+
+Offsets = List[Tuple[int, int]]
+
+
+@dataclass(frozen=True)
+class Chunk:
+    text: str
+    char_start: int
+    char_end: int
+    token_count: int
+
+
+def tokenizer_path() -> Optional[Path]:
+    """Resolved ``CHUNK_TOKENIZER_PATH``, or ``None`` when it is set empty."""
+    configured = get_settings().chunk_tokenizer_path.strip()
+    if not configured:
+        return None
+    return SERVICE_ROOT / Path(configured).expanduser()
+
+
+@lru_cache(maxsize=1)
+def get_tokenizer() -> Optional[Any]:
+    """The embedding model's fast tokenizer, or ``None`` to count whitespace-separated words.
+
+    Whitespace chunking must be chosen explicitly with an empty ``CHUNK_TOKENIZER_PATH``:
+    silently falling back would change every content hash and re-ingest the catalog.
+    """
+    path = tokenizer_path()
+    if path is None:
+        logger.info("CHUNK_TOKENIZER_PATH is empty; chunking on whitespace.")
+        return None
+    if Tokenizer is None:
+        raise RuntimeError(
+            f"CHUNK_TOKENIZER_PATH={path} needs the tokenizers package; install it or set the path empty."
+        )
+    if not path.is_file():
+        raise RuntimeError(f"Chunk tokenizer {path} not found; fix CHUNK_TOKENIZER_PATH or set it empty.")
+    tokenizer = Tokenizer.from_file(str(path))
+    tokenizer.no_truncation()
+    tokenizer.no_padding()
+    return tokenizer
+
+
+def chunker_signature() -> str:
+    """Identifies the chunking scheme; part of every source's content hash."""
+    settings = get_settings()
+    path = tokenizer_path()
+    scheme = path.parent.name if path is not None and get_tokenizer() is not None else "whitespace"
+    return f"v{CHUNKER_VERSION}:{scheme}:{settings.embed_max_tokens}"
+
+
+def _token_offsets(texts: Sequence[str]) -> List[Offsets]:
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return [[match.span() for match in _WORD.finditer(text)] for text in texts]
+    encodings = tokenizer.encode_batch(list(texts), add_special_tokens=False)
+    return [encoding.offsets for encoding in encodings]
+
+
+def _boundaries(text: str, offsets: Offsets) -> List[int]:
+    """Sorted token indices that start a new sentence or line."""
+    starts = [start for start, _ in offsets]
+    found = {bisect_left(starts, match.end()) for match in _BREAK.finditer(text)}
+    return sorted(idx for idx in found if 0 < idx < len(offsets))
+
+
+def _windows(text: str, offsets: Offsets, max_tokens: int, overlap: int) -> List[Chunk]:
+    total = len(offsets)
+    if total == 0:
         return []
+    boundaries = _boundaries(text, offsets)
+    overlap = min(overlap, max_tokens // 2)
 
-    chunks: List[str] = []
+    chunks: List[Chunk] = []
     start = 0
-    while start < len(tokens):
-        end = min(start + chunk_size, len(tokens))
-        chunk = " ".join(tokens[start:end]).strip()
-        if chunk:
-            chunks.append(chunk)
-        if end == len(tokens):
-            break
-        start = max(end - chunk_overlap, start + 1)
-    return chunks
+    while True:
+        end = min(start + max_tokens, total)
+        if end < total:
+            # End on the last sentence/line break in the back half of the window, if any.
+            pos = bisect_right(boundaries, end) - 1
+            if pos >= 0 and boundaries[pos] > start + max_tokens // 2:
+                end = boundaries[pos]
+        char_start, char_end = offsets[start][0], offsets[end - 1][1]
+        chunks.append(Chunk(text[char_start:char_end], char_start, char_end, end - start))
+        if end == total:
+            return chunks
+        next_start = max(end - overlap, start + 1)
+        # Start the overlap on a sentence/line break when one falls inside it.
+        pos = bisect_left(boundaries, next_start)
+        if pos < len(boundaries) and boundaries[pos] < end:
+            next_start = boundaries[pos]
+        start = next_start
+
+
+def chunk_texts(texts: Sequence[str], chunk_size: int, chunk_overlap: int) -> List[List[Chunk]]:
+    """Split many texts at once into windows of at most ``chunk_size`` model tokens.
+
+    Texts are tokenized in a single batch; windows prefer to end and start on sentence
+    or line boundaries and never exceed the embedding model's context window. Chunks
+    keep their character offsets into the source text.
+    """
+    max_tokens = max(min(chunk_size, get_settings().embed_max_tokens - SPECIAL_TOKENS_RESERVE), 1)
+    return [
+        _windows(text, offsets, max_tokens, chunk_overlap)
+        for text, offsets in zip(texts, _token_offsets(texts))
+    ]
+
+
+def sliding_window_chunks(text: str, chunk_size: int, chunk_overlap: int) -> List[str]:
+    """Split text into overlapping chunks to preserve context around boundaries."""
+    return [chunk.text for chunk in chunk_texts([text], chunk_size, chunk_overlap)[0]]
 
 
 def explode_documents(docs: Iterable[str], chunk_size: int, chunk_overlap: int) -> List[str]:
     """Utility to chunk multiple documents, flattening into a single list."""
-    all_chunks: List[str] = []
-    for doc in docs:
-        all_chunks.extend(sliding_window_chunks(doc, chunk_size, chunk_overlap))
-    return all_chunks
+    return [chunk.text for chunks in chunk_texts(list(docs), chunk_size, chunk_overlap) for chunk in chunks]
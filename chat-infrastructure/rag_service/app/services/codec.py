@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any
+
+import msgpack
+
+from ..config import get_settings
+
+try:  # zstd is optional; without it values are stored as plain msgpack.
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+# First byte of every encoded value. Legacy cache values are plain UTF-8 text
+# and never start with these control bytes.
+FORMAT_MSGPACK = 0x01
+FORMAT_MSGPACK_ZSTD = 0x02
+
+
+class CodecError(ValueError):
+    pass
+
+
+@lru_cache()
+def _compressor() -> Any:
+    return zstandard.ZstdCompressor(level=get_settings().cache_compression_level) if zstandard else None
+
+
+@lru_cache()
+def _decompressor() -> Any:
+    return zstandard.ZstdDecompressor() if zstandard else None
+
+
+def compression_available() -> bool:
+    return zstandard is not None
+
+
+def encode_payload(value: Any, compress: bool | None = None) -> bytes:
+    """Pack ``value`` as msgpack behind a one-byte format marker, zstd-compressing large bodies."""
+    settings = get_settings()
+    body = msgpack.packb(value, use_bin_type=True)
+    if compress is None:
+        compress = settings.cache_compression == "zstd" and len(body) >= settings.cache_compression_min_bytes
+    compressor = _compressor() if compress else None
+    if compressor is not None:
+        return bytes([FORMAT_MSGPACK_ZSTD]) + compressor.compress(body)
+    return bytes([FORMAT_MSGPACK]) + body
+
+
+def is_encoded(blob: bytes) -> bool:
+    return bool(blob) and blob[0] in (FORMAT_MSGPACK, FORMAT_MSGPACK_ZSTD)
+
+
+def decode_payload(blob: bytes) -> Any:
+    if not is_encoded(blob):
+        raise CodecError("Value does not carry a known format marker.")
+    body = blob[1:]
+    if blob[0] == FORMAT_MSGPACK_ZSTD:
+        decompressor = _decompressor()
+        if decompressor is None:
+            raise CodecError("Value is zstd-compressed but the zstandard package is not installed.")
+        body = decompressor.decompress(body)
+    try:
+        return msgpack.unpackb(body, raw=False)
+    except (msgpack.ExtraData, msgpack.FormatError, msgpack.StackError, ValueError) as exc:
+        raise CodecError(f"Corrupt cache value: {exc}") from exc
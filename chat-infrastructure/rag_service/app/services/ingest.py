@@ -1,30 +1,410 @@
 from __future__ import annotations
 
-from typing import List
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from itertools import islice
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
+from ..config import get_settings
 from ..schemas import IngestDocument, IngestRequest
-from .chunker import sliding_window_chunks
+from .cache import bump_generations
+from .chunker import chunk_texts, chunker_signature
 from .embedding import embed_texts
-from .vectorstore import ensure_collection, upsert_embeddings
+from .vectorstore import (
+    commit_source_hashes,
+    delete_chunks_from,
+    delete_restaurants_not_in,
+    delete_sources_not_in,
+    ensure_collection,
+    fetch_source_states,
+    upsert_embeddings,
+)
 
+logger = logging.getLogger(__name__)
 
-async def ingest_documents(payload: IngestRequest) -> int:
-    chunks: List[str] = []
-    chunk_payloads: List[dict] = []
+T = TypeVar("T")
 
-    for doc in payload.documents:
-        doc_chunks = sliding_window_chunks(doc.text, payload.chunk_size, payload.chunk_overlap)
-        for idx, chunk in enumerate(doc_chunks):
-            meta = doc.metadata.model_dump(exclude_none=True)
-            meta["chunk_index"] = idx
-            meta["chunk_text"] = chunk
-            chunks.append(chunk)
-            chunk_payloads.append(meta)
+DocumentSource = Union[Iterable[IngestDocument], AsyncIterable[IngestDocument]]
+# (chunk text, point payload, ordinal of the source document in the stream)
+ChunkEntry = Tuple[str, Dict[str, Any], int]
 
-    if not chunks:
-        return 0
+MAX_REPORTED_ERRORS = 20
 
-    embeddings = await embed_texts(chunks)
-    await ensure_collection(vector_size=len(embeddings[0]))
-    await upsert_embeddings(embeddings, chunk_payloads)
-    return len(chunks)
+# "restaurants": a full sync only prunes restaurants that appear in the submission.
+# "catalog": the submission is the whole catalog, so restaurants missing from it are
+# removed as well.
+FullSyncScope = Literal["restaurants", "catalog"]
+
+
+@dataclass
+class IngestStats:
+    documents: int = 0
+    skipped_documents: int = 0
+    invalid_documents: int = 0
+    embedded_chunks: int = 0
+    ingested_chunks: int = 0
+    deleted_chunks: int = 0
+    failed_chunks: int = 0
+    errors: List[str] = field(default_factory=list)
+    started_at: float = field(default_factory=time.monotonic, repr=False)
+
+    def record_error(self, message: str) -> None:
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(message)
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data.pop("started_at")
+        elapsed = max(time.monotonic() - self.started_at, 1e-6)
+        data["elapsed_seconds"] = round(elapsed, 3)
+        data["chunks_per_second"] = round(self.ingested_chunks / elapsed, 2)
+        data["ok"] = self.ok
+        return data
+
+    @property
+    def ok(self) -> bool:
+        """False if any chunk failed to embed or upsert; those sources are retried next sync."""
+        return not self.failed_chunks
+
+
+ProgressCallback = Callable[[IngestStats], Awaitable[None]]
+# Called with (document ordinal, status, details); status is "skipped", "ingested" or "failed".
+DocumentCallback = Callable[[int, str, Dict[str, Any]], None]
+
+
+def content_hash(doc: IngestDocument, chunk_size: int, chunk_overlap: int) -> str:
+    """Fingerprint of everything that determines a source's chunks and payloads."""
+    fingerprint = {
+        "text": doc.text,
+        "metadata": doc.metadata.model_dump(mode="json"),
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "chunker": chunker_signature(),
+    }
+    return hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+async def _with_retries(operation: Callable[[], Awaitable[T]], what: str) -> T:
+    settings = get_settings()
+    attempt = 0
+    while True:
+        try:
+            return await operation()
+        except Exception as exc:  # pragma: no cover - network failures
+            attempt += 1
+            if attempt > settings.ingest_max_retries:
+                raise
+            delay = settings.ingest_retry_backoff_seconds * 2 ** (attempt - 1)
+            logger.warning("%s failed (attempt %s), retrying in %.1fs: %s", what, attempt, delay, exc)
+            await asyncio.sleep(delay)
+
+
+async def prepare_collection() -> None:
+    """Create the collection before concurrent ingests start, sized by a probe embedding."""
+    vectors = await embed_texts(["vector size probe"])
+    await ensure_collection(vector_size=len(vectors[0]))
+
+
+async def _document_batches(documents: DocumentSource, size: int) -> AsyncIterator[List[IngestDocument]]:
+    """Yield documents in batches without materialising the whole source.
+
+    Blocking iterators (e.g. database cursors) are advanced in a worker thread.
+    """
+    if isinstance(documents, AsyncIterable):
+        batch: List[IngestDocument] = []
+        async for doc in documents:
+            batch.append(doc)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+        return
+
+    if isinstance(documents, Sequence):
+        for start in range(0, len(documents), size):
+            yield list(documents[start : start + size])
+        return
+
+    iterator = iter(documents)
+    while True:
+        batch = await asyncio.to_thread(lambda: list(islice(iterator, size)))
+        if not batch:
+            return
+        yield batch
+
+
+async def iter_ndjson_lines(stream: AsyncIterable[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    """Split a byte stream into numbered, non-blank NDJSON lines (1-based)."""
+    buffer = b""
+    line_number = 0
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield line_number, line
+    if buffer.strip():
+        yield line_number + 1, buffer
+
+
+async def _run_stages(stages: Sequence[Awaitable[None]]) -> None:
+    """Run pipeline stages concurrently; the first failure cancels the rest."""
+    tasks = [asyncio.ensure_future(stage) for stage in stages]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            if task.exception() is not None:
+                raise task.exception()  # type: ignore[misc]
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def ingest_stream(
+    documents: DocumentSource,
+    chunk_size: int,
+    chunk_overlap: int,
+    full_sync: bool = False,
+    on_progress: Optional[ProgressCallback] = None,
+    on_document: Optional[DocumentCallback] = None,
+    stats: Optional[IngestStats] = None,
+    full_sync_scope: FullSyncScope = "restaurants",
+) -> IngestStats:
+    """Chunk, embed and upsert documents as a bounded pipeline.
+
+    Documents are pulled in batches, unchanged sources are skipped, changed ones are
+    chunked and handed to embedding workers, and embedded chunks are upserted in
+    fixed-size batches. Bounded queues between the stages keep memory flat no matter
+    how large the source is. A source's ``content_hash`` is committed only after every
+    one of its chunks has been stored, so failed sources are not skipped next time.
+    With ``full_sync`` every other source of the submitted restaurants is removed at
+    the end, unless the caller counted invalid documents in ``stats`` (their sources
+    are unknown and would otherwise be deleted). With ``full_sync_scope="catalog"``
+    every source of restaurants absent from the submission is removed too.
+    """
+    settings = get_settings()
+    stats = stats or IngestStats()
+    embed_workers = max(settings.ingest_embed_concurrency, 1)
+    embed_batch_size = max(settings.ingest_embed_batch_size, 1)
+    upsert_batch_size = max(settings.ingest_upsert_batch_size, 1)
+
+    embed_queue: asyncio.Queue[Optional[List[ChunkEntry]]] = asyncio.Queue(maxsize=embed_workers * 2)
+    upsert_queue: asyncio.Queue[Optional[Tuple[List[List[float]], List[ChunkEntry]]]] = asyncio.Queue(
+        maxsize=embed_workers * 2
+    )
+
+    submitted_sources: Set[str] = set()
+    submitted_restaurants: Set[Optional[str]] = set()
+    touched_restaurants: Set[Optional[str]] = set()
+    # Chunks of each source still awaiting an upsert, and hashes of sources with none left.
+    pending_chunks: Dict[str, int] = {}
+    completed_hashes: Dict[str, str] = {}
+    new_hashes: Dict[str, str] = {}
+    finished_embedders = 0
+    ordinal = 0
+
+    async def report() -> None:
+        if on_progress is not None:
+            await on_progress(stats)
+
+    def notify(ordinals: Iterable[int], status: str, **details: Any) -> None:
+        if on_document is not None:
+            for position in ordinals:
+                on_document(position, status, details)
+
+    def fail(entries: List[ChunkEntry], stage: str, exc: Exception) -> None:
+        stats.failed_chunks += len(entries)
+        stats.record_error(f"{stage}: {exc}")
+        notify(sorted({position for _, _, position in entries}), "failed", error=str(exc))
+
+    async def prepare(batch: List[IngestDocument]) -> List[ChunkEntry]:
+        nonlocal ordinal
+        stats.documents += len(batch)
+        hashes = {
+            doc.metadata.source_id: content_hash(doc, chunk_size, chunk_overlap)
+            for doc in batch
+            if doc.metadata.source_id
+        }
+        existing = await _with_retries(lambda: fetch_source_states(hashes), "Fetching source states")
+
+        entries: List[ChunkEntry] = []
+        first_orphan_index: Dict[str, int] = {}
+        changed: List[Tuple[int, IngestDocument]] = []
+        for doc in batch:
+            position, ordinal = ordinal, ordinal + 1
+            source_id = doc.metadata.source_id
+            submitted_restaurants.add(doc.metadata.restaurant_id)
+            if source_id:
+                submitted_sources.add(source_id)
+            previous = existing.get(source_id) if source_id else None
+            if previous and previous.get("content_hash") == hashes[source_id]:
+                stats.skipped_documents += 1
+                notify([position], "skipped")
+                continue
+            changed.append((position, doc))
+
+        # Tokenizing is CPU-bound; the fast tokenizer batches it off the event loop.
+        chunked = await asyncio.to_thread(
+            chunk_texts, [doc.text for _, doc in changed], chunk_size, chunk_overlap
+        )
+        for (position, doc), doc_chunks in zip(changed, chunked):
+            source_id = doc.metadata.source_id
+            previous = existing.get(source_id) if source_id else None
+            for idx, chunk in enumerate(doc_chunks):
+                meta = doc.metadata.model_dump(exclude_none=True)
+                meta["chunk_index"] = idx
+                meta["chunk_text"] = chunk.text
+                meta["char_start"] = chunk.char_start
+                meta["char_end"] = chunk.char_end
+                # Recorded so snapshots can name the model their vectors came from.
+                meta["embed_model"] = settings.ollama_embed_model
+                if source_id:
+                    # Chunk 0 gets its hash from commit_source_hashes once the whole source is stored.
+                    if idx:
+                        meta["content_hash"] = hashes[source_id]
+                    meta["chunk_count"] = len(doc_chunks)
+                entries.append((chunk.text, meta, position))
+            if source_id and doc_chunks:
+                pending_chunks[source_id] = pending_chunks.get(source_id, 0) + len(doc_chunks)
+                new_hashes[source_id] = hashes[source_id]
+            if previous:
+                first_orphan_index[source_id] = len(doc_chunks)
+                stats.deleted_chunks += max(int(previous.get("chunk_count") or 0) - len(doc_chunks), 0)
+            touched_restaurants.add(doc.metadata.restaurant_id)
+            notify([position], "ingested", chunks=len(doc_chunks))
+
+        if first_orphan_index:
+            # Orphans sit above the new chunk count, so this never races the upserts.
+            await _with_retries(lambda: delete_chunks_from(first_orphan_index), "Deleting orphaned chunks")
+        return entries
+
+    async def produce() -> None:
+        pending: List[ChunkEntry] = []
+        async for batch in _document_batches(documents, max(settings.ingest_document_batch_size, 1)):
+            pending.extend(await prepare(batch))
+            while len(pending) >= embed_batch_size:
+                await embed_queue.put(pending[:embed_batch_size])
+                pending = pending[embed_batch_size:]
+        if pending:
+            await embed_queue.put(pending)
+        for _ in range(embed_workers):
+            await embed_queue.put(None)
+
+    async def embed() -> None:
+        nonlocal finished_embedders
+        while (group := await embed_queue.get()) is not None:
+            texts = [text for text, _, _ in group]
+            try:
+                vectors = await _with_retries(lambda: embed_texts(texts), "Embedding batch")
+            except Exception as exc:
+                fail(group, "embed", exc)
+                continue
+            stats.embedded_chunks += len(group)
+            await upsert_queue.put((vectors, group))
+        finished_embedders += 1
+        if finished_embedders == embed_workers:
+            await upsert_queue.put(None)
+
+    async def upsert() -> None:
+        collection_ready = False
+        vectors: List[List[float]] = []
+        entries: List[ChunkEntry] = []
+
+        def acknowledge(batch_entries: List[ChunkEntry]) -> None:
+            for _, meta, _ in batch_entries:
+                source_id = meta.get("source_id")
+                if source_id not in pending_chunks:
+                    continue
+                pending_chunks[source_id] -= 1
+                if not pending_chunks[source_id]:
+                    del pending_chunks[source_id]
+                    completed_hashes[source_id] = new_hashes.pop(source_id)
+
+        async def commit() -> None:
+            hashes = dict(completed_hashes)
+            completed_hashes.clear()
+            await _with_retries(lambda: commit_source_hashes(hashes), "Committing source hashes")
+
+        async def flush(batch_vectors: List[List[float]], batch_entries: List[ChunkEntry]) -> None:
+            nonlocal collection_ready
+            if not collection_ready:
+                await ensure_collection(vector_size=len(batch_vectors[0]))
+                collection_ready = True
+            payloads = [meta for _, meta, _ in batch_entries]
+            try:
+                await _with_retries(lambda: upsert_embeddings(batch_vectors, payloads, wait=False), "Upserting batch")
+            except Exception as exc:
+                fail(batch_entries, "upsert", exc)
+            else:
+                stats.ingested_chunks += len(batch_entries)
+                acknowledge(batch_entries)
+                if len(completed_hashes) >= upsert_batch_size:
+                    await commit()
+            await report()
+
+        while (item := await upsert_queue.get()) is not None:
+            vectors.extend(item[0])
+            entries.extend(item[1])
+            while len(entries) >= upsert_batch_size:
+                await flush(vectors[:upsert_batch_size], entries[:upsert_batch_size])
+                del vectors[:upsert_batch_size], entries[:upsert_batch_size]
+        if entries:
+            await flush(vectors, entries)
+        if completed_hashes:
+            await commit()
+
+    await _run_stages([produce(), *(embed() for _ in range(embed_workers)), upsert()])
+
+    if full_sync and stats.invalid_documents:
+        stats.record_error(f"full_sync skipped: {stats.invalid_documents} invalid documents")
+    elif full_sync:
+        tombstoned = await delete_sources_not_in(submitted_sources, submitted_restaurants)
+        if tombstoned:
+            stats.deleted_chunks += tombstoned
+            touched_restaurants |= submitted_restaurants
+        if full_sync_scope == "catalog":
+            removed, removed_restaurants = await delete_restaurants_not_in(
+                restaurant_id for restaurant_id in submitted_restaurants if restaurant_id
+            )
+            stats.deleted_chunks += removed
+            touched_restaurants |= removed_restaurants
+
+    if touched_restaurants:
+        await bump_generations(touched_restaurants)
+    await report()
+    return stats
+
+
+async def ingest_documents(payload: IngestRequest, on_progress: Optional[ProgressCallback] = None) -> IngestStats:
+    """Ingest an in-memory request; see :func:`ingest_stream`."""
+    return await ingest_stream(
+        payload.documents,
+        payload.chunk_size,
+        payload.chunk_overlap,
+        full_sync=payload.full_sync,
+        on_progress=on_progress,
+        full_sync_scope=payload.full_sync_scope,
+    )
@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional, Set
+
+from pydantic import ValidationError
+
+from ..config import get_settings
+from ..schemas import IngestDocument
+from .cache import get_client, run_script
+from .ingest import FullSyncScope, IngestStats, ingest_stream, prepare_collection
+
+logger = logging.getLogger(__name__)
+
+JOB_PREFIX = "rag:ingest:job:"
+JOB_QUEUE = "rag:ingest:queue"
+# Jobs claimed by a worker stay here until they finish, so a crash cannot lose them.
+JOB_PROCESSING = "rag:ingest:processing"
+# Documents are buffered in Redis in pages of this many lines.
+UPLOAD_PAGE_SIZE = 500
+# Seconds a worker blocks on the queue before checking again.
+QUEUE_POLL_SECONDS = 5
+# A running job's lease is renewed every third of this; a claimed job whose lease
+# has lapsed belongs to a dead worker and is requeued by the reaper.
+JOB_LEASE_SECONDS = 60
+_REQUEUE_SCRIPT = "requeue_ingest_job.lua"
+
+STATUS_UPLOADING = "uploading"
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+
+
+def _job_key(job_id: str) -> str:
+    return f"{JOB_PREFIX}{job_id}"
+
+
+def _documents_key(job_id: str) -> str:
+    return f"{JOB_PREFIX}{job_id}:documents"
+
+
+def _lease_key(job_id: str) -> str:
+    return f"{JOB_PREFIX}{job_id}:lease"
+
+
+async def create_job(
+    lines: AsyncIterable[str],
+    chunk_size: int,
+    chunk_overlap: int,
+    full_sync: bool = False,
+    full_sync_scope: FullSyncScope = "restaurants",
+) -> Dict[str, Any]:
+    """Buffer one JSON document per line in Redis and queue the job for a worker."""
+    client = get_client()
+    ttl = get_settings().ingest_job_ttl_seconds
+    job_id = uuid.uuid4().hex
+    job_key, documents_key = _job_key(job_id), _documents_key(job_id)
+    await client.hset(
+        job_key,
+        mapping={
+            "status": STATUS_UPLOADING,
+            "created_at": time.time(),
+            "chunk_size": chunk_size,
+            "chunk_overlap": chunk_overlap,
+            "full_sync": int(full_sync),
+            "full_sync_scope": full_sync_scope,
+        },
+    )
+    await client.expire(job_key, ttl)
+
+    total = 0
+    page: List[str] = []
+    try:
+        async for line in lines:
+            page.append(line)
+            if len(page) >= UPLOAD_PAGE_SIZE:
+                await client.rpush(documents_key, *page)
+                total += len(page)
+                page = []
+        if page:
+            await client.rpush(documents_key, *page)
+            total += len(page)
+    except BaseException:
+        await client.delete(documents_key)
+        await client.hset(job_key, mapping={"status": STATUS_FAILED, "finished_at": time.time()})
+        raise
+
+    pipe = client.pipeline(transaction=True)
+    pipe.expire(documents_key, ttl)
+    pipe.hset(job_key, mapping={"status": STATUS_QUEUED, "documents_total": total})
+    pipe.rpush(JOB_QUEUE, job_id)
+    await pipe.execute()
+    return {"job_id": job_id, "status": STATUS_QUEUED, "documents_total": total}
+
+
+async def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    data = await get_client().hgetall(_job_key(job_id))
+    if not data:
+        return None
+
+    def _float(name: str) -> Optional[float]:
+        return float(data[name]) if data.get(name) else None
+
+    return {
+        "job_id": job_id,
+        "status": data.get("status", STATUS_QUEUED),
+        "created_at": _float("created_at"),
+        "started_at": _float("started_at"),
+        "finished_at": _float("finished_at"),
+        "documents_total": int(data.get("documents_total") or 0),
+        "progress": json.loads(data["progress"]) if data.get("progress") else None,
+        "error": data.get("error"),
+    }
+
+
+async def _job_documents(job_id: str, stats: IngestStats) -> AsyncIterator[IngestDocument]:
+    client = get_client()
+    documents_key = _documents_key(job_id)
+    page_size = max(get_settings().ingest_document_batch_size, 1)
+    start = 0
+    while True:
+        lines = await client.lrange(documents_key, start, start + page_size - 1)
+        if not lines:
+            return
+        for offset, line in enumerate(lines, start=start + 1):
+            try:
+                yield IngestDocument.model_validate_json(line)
+            except ValidationError as exc:
+                stats.invalid_documents += 1
+                stats.record_error(f"line {offset}: {exc.errors(include_url=False)[0]['msg']}")
+        start += len(lines)
+
+
+async def _keep_lease(job_id: str) -> None:
+    client = get_client()
+    while True:
+        await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+        await client.set(_lease_key(job_id), 1, ex=JOB_LEASE_SECONDS)
+
+
+async def _run_job(job_id: str) -> None:
+    heartbeat = asyncio.create_task(_keep_lease(job_id))
+    try:
+        await _process_job(job_id)
+    finally:
+        heartbeat.cancel()
+        await asyncio.gather(heartbeat, return_exceptions=True)
+
+
+async def _process_job(job_id: str) -> None:
+    client = get_client()
+    job_key = _job_key(job_id)
+    job = await client.hgetall(job_key)
+    if not job:
+        logger.warning("Ingest job %s expired before it was picked up.", job_id)
+        await client.lrem(JOB_PROCESSING, 1, job_id)
+        return
+
+    stats = IngestStats()
+
+    async def save_progress(current: IngestStats) -> None:
+        await client.hset(job_key, mapping={"progress": json.dumps(current.as_dict()), "updated_at": time.time()})
+
+    await client.hset(job_key, mapping={"status": STATUS_RUNNING, "started_at": time.time()})
+    try:
+        await ingest_stream(
+            _job_documents(job_id, stats),
+            int(job["chunk_size"]),
+            int(job["chunk_overlap"]),
+            full_sync=job.get("full_sync") == "1",
+            full_sync_scope=job.get("full_sync_scope") or "restaurants",
+            on_progress=save_progress,
+            stats=stats,
+        )
+    except asyncio.CancelledError:
+        # Shutting down: hand the job back; unchanged sources are skipped on the rerun.
+        pipe = client.pipeline(transaction=True)
+        pipe.hset(job_key, "status", STATUS_QUEUED)
+        pipe.lrem(JOB_PROCESSING, 1, job_id)
+        pipe.lpush(JOB_QUEUE, job_id)
+        pipe.delete(_lease_key(job_id))
+        await pipe.execute()
+        raise
+    except Exception as exc:
+        logger.exception("Ingest job %s failed", job_id)
+        outcome = {"status": STATUS_FAILED, "error": str(exc)}
+    else:
+        if stats.ok:
+            outcome = {"status": STATUS_SUCCEEDED}
+        else:
+            outcome = {"status": STATUS_FAILED, "error": f"{stats.failed_chunks} chunks failed to ingest"}
+
+    pipe = client.pipeline(transaction=True)
+    pipe.hset(job_key, mapping={**outcome, "progress": json.dumps(stats.as_dict()), "finished_at": time.time()})
+    pipe.expire(job_key, get_settings().ingest_job_ttl_seconds)
+    pipe.delete(_documents_key(job_id), _lease_key(job_id))
+    pipe.lrem(JOB_PROCESSING, 1, job_id)
+    await pipe.execute()
+
+
+async def run_job_worker(retry_seconds: float = 1.0) -> None:
+    """Process queued ingest jobs one at a time until cancelled.
+
+    The number of workers started per process caps concurrent ingest jobs in that
+    process, so embedding work cannot crowd out its query traffic. A claimed job is
+    moved to a processing list and leased until it finishes; see :func:`run_job_reaper`.
+    """
+    client = get_client()
+    while True:
+        try:
+            job_id = await client.blmove(JOB_QUEUE, JOB_PROCESSING, QUEUE_POLL_SECONDS, "LEFT", "RIGHT")
+            if job_id is not None:
+                await client.set(_lease_key(job_id), 1, ex=JOB_LEASE_SECONDS)
+                await _run_job(job_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:  # pragma: no cover - requires a live Redis
+            logger.warning("Ingest job worker error: %s", exc)
+            await asyncio.sleep(retry_seconds)
+
+
+async def requeue_expired_jobs(suspects: Set[str]) -> Set[str]:
+    """Requeue claimed jobs that were already unleased in the previous pass.
+
+    ``suspects`` are the unleased jobs seen last time; jobs first seen unleased now are
+    returned for the next pass. Waiting one pass covers the moment between a worker
+    claiming a job and taking its lease.
+    """
+    client = get_client()
+    unleased: Set[str] = set()
+    for job_id in await client.lrange(JOB_PROCESSING, 0, -1):
+        if await client.exists(_lease_key(job_id)):
+            continue
+        if job_id not in suspects:
+            unleased.add(job_id)
+            continue
+        keys = [JOB_PROCESSING, JOB_QUEUE, _lease_key(job_id), _job_key(job_id)]
+        if await run_script(client, _REQUEUE_SCRIPT, keys, [job_id, STATUS_QUEUED]):
+            logger.warning("Requeued ingest job %s; its worker stopped renewing the lease.", job_id)
+    return unleased
+
+
+async def run_job_reaper(retry_seconds: float = 1.0) -> None:
+    """Requeue jobs of crashed workers, checking from startup every lease period until cancelled."""
+    suspects: Set[str] = set()
+    while True:
+        try:
+            suspects = await requeue_expired_jobs(suspects)
+            await asyncio.sleep(JOB_LEASE_SECONDS)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:  # pragma: no cover - requires a live Redis
+            logger.warning("Ingest job reaper error: %s", exc)
+            await asyncio.sleep(retry_seconds)
+
+
+async def run_job_workers(count: int) -> None:
+    """Run ``count`` job workers and the reaper until cancelled.
+
+    The collection is created once up front so the workers never race to create it.
+    """
+    try:
+        await prepare_collection()
+    except Exception as exc:  # pragma: no cover - requires live services
+        logger.warning("Could not prepare the collection before starting ingest workers: %s", exc)
+    await asyncio.gather(run_job_reaper(), *(run_job_worker() for _ in range(count)))
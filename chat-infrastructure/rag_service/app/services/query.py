@@ -1,35 +1,88 @@
 from __future__ import annotations
 
-from typing import List, Tuple
+import asyncio
+import logging
+import time
+from typing import Dict, List, Tuple
 
 from ..config import get_settings
 from ..schemas import RagQueryRequest, SourceChunk
-from .cache import get_cached_answer, set_cached_answer
+from .cache import claim_refresh, get_cached_answer, get_generation, is_stale, set_cached_answer
+from .canonicalize import canonicalize_query
 from .embedding import embed_texts
 from .generator import generate_answer
 from .vectorstore import search
 from qdrant_client.http import models as qm
 
+logger = logging.getLogger(__name__)
 
-async def answer_question(request: RagQueryRequest) -> Tuple[str, List[SourceChunk], bool]:
+# Background regenerations of stale answers, keyed by (canonical question, restaurant, generation).
+_refresh_tasks: Dict[Tuple[str, str | None, int], asyncio.Task] = {}
+
+
+def _active_window_conditions(now: float) -> List[qm.Condition]:
+    """Match chunks whose validity window contains ``now``; chunks without window fields always match."""
+
+    def _open_or(field: str, bound: qm.Range) -> qm.Filter:
+        return qm.Filter(
+            should=[
+                qm.IsEmptyCondition(is_empty=qm.PayloadField(key=field)),
+                qm.FieldCondition(key=field, range=bound),
+            ]
+        )
+
+    return [
+        _open_or("starts_at", qm.Range(lte=now)),
+        _open_or("ends_at", qm.Range(gt=now)),
+        _open_or("valid_until", qm.Range(gt=now)),
+    ]
+
+
+async def answer_question(request: RagQueryRequest) -> Tuple[str, List[SourceChunk], bool, bool]:
+    """Return ``(answer, sources, cached, stale)``.
+
+    Stale cached answers are served immediately while one background task regenerates them.
+    """
     settings = get_settings()
-    cached = await get_cached_answer(request.question, request.restaurant_id)
+    # Read once so an answer built from pre-ingest context is never stored under a newer generation.
+    generation = await get_generation(request.restaurant_id)
+    cached = await get_cached_answer(request.question, request.restaurant_id, generation)
     if cached:
         sources = [SourceChunk(**source) for source in cached.get("sources", [])]
-        return cached.get("answer", ""), sources, True
+        stale = is_stale(cached)
+        if stale:
+            _schedule_refresh(request, generation)
+        return cached.get("answer", ""), sources, True, stale
+
+    answer, sources = await _build_answer(request)
+    await set_cached_answer(
+        request.question,
+        request.restaurant_id,
+        generation,
+        answer,
+        [source.model_dump() for source in sources],
+        settings.cache_ttl_seconds,
+        request.session_id,
+        settings.cache_stale_ttl_seconds,
+    )
+    return answer, sources, False, False
 
-    question_embedding = (await embed_texts([request.question]))[0]
+
+async def _build_answer(request: RagQueryRequest) -> Tuple[str, List[SourceChunk]]:
+    settings = get_settings()
+    question_embedding = (await embed_texts([canonicalize_query(request.question)]))[0]
     top_k = request.top_k or settings.max_result_chunks
-    query_filter = None
+    conditions: List[qm.Condition] = []
     if request.restaurant_id:
-        query_filter = qm.Filter(
-            must=[
-                qm.FieldCondition(
-                    key="restaurant_id",
-                    match=qm.MatchValue(value=request.restaurant_id),
-                )
-            ]
+        conditions.append(
+            qm.FieldCondition(
+                key="restaurant_id",
+                match=qm.MatchValue(value=request.restaurant_id),
+            )
         )
+    # Every search, whatever the wording: expired or upcoming promotions never reach the prompt.
+    conditions.extend(_active_window_conditions(time.time()))
+    query_filter = qm.Filter(must=conditions)
     results = await search(question_embedding, top_k, query_filter)
 
     context_snippets: List[str] = []
@@ -55,12 +108,33 @@ async def answer_question(request: RagQueryRequest) -> Tuple[str, List[SourceChu
 
     context = "\n\n".join(context_snippets)
     answer = await generate_answer(request.question, context)
-    await set_cached_answer(
-        request.question,
-        request.restaurant_id,
-        answer,
-        [source.model_dump() for source in sources],
-        settings.cache_ttl_seconds,
-        request.session_id,
-    )
-    return answer, sources, False
+    return answer, sources
+
+
+def _schedule_refresh(request: RagQueryRequest, generation: int) -> None:
+    task_key = (canonicalize_query(request.question), request.restaurant_id, generation)
+    if task_key in _refresh_tasks:
+        return
+    task = asyncio.create_task(_refresh(request, generation))
+    _refresh_tasks[task_key] = task
+    task.add_done_callback(lambda _: _refresh_tasks.pop(task_key, None))
+
+
+async def _refresh(request: RagQueryRequest, generation: int) -> None:
+    settings = get_settings()
+    try:
+        if not await claim_refresh(request.question, request.restaurant_id, generation):
+            return
+        answer, sources = await _build_answer(request)
+        await set_cached_answer(
+            request.question,
+            request.restaurant_id,
+            generation,
+            answer,
+            [source.model_dump() for source in sources],
+            settings.cache_ttl_seconds,
+            None,
+            settings.cache_stale_ttl_seconds,
+        )
+    except Exception:  # pragma: no cover
+        logger.exception("Background refresh of a stale answer failed")
@@ -2,16 +2,30 @@ from __future__ import annotations
 
 import asyncio
 import hashlib
-from typing import Any, Dict, Iterable, List, Optional, Sequence
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
 from uuid import UUID, uuid4
 
 from qdrant_client import QdrantClient
 from qdrant_client.http import models as qm
+from qdrant_client.http.exceptions import UnexpectedResponse
 
 from ..config import get_settings
 
 _client: QdrantClient | None = None
 
+# Validity window fields are range-indexed so query-time "currently active"
+# filters do not scan every payload; the others back restaurant filters and
+# per-source chunk cleanup during incremental ingest.
+PAYLOAD_INDEXES: Dict[str, qm.PayloadSchemaType] = {
+    "starts_at": qm.PayloadSchemaType.FLOAT,
+    "ends_at": qm.PayloadSchemaType.FLOAT,
+    "valid_until": qm.PayloadSchemaType.FLOAT,
+    "restaurant_id": qm.PayloadSchemaType.KEYWORD,
+    "source_id": qm.PayloadSchemaType.KEYWORD,
+    "chunk_index": qm.PayloadSchemaType.INTEGER,
+}
+
 
 def get_client() -> QdrantClient:
     global _client
@@ -21,26 +35,119 @@ def get_client() -> QdrantClient:
     return _client
 
 
+def _collection_missing(exc: UnexpectedResponse) -> bool:
+    """Whether Qdrant refused the request because the collection does not exist yet."""
+    return exc.status_code == 404
+
+
+def resolve_alias(client: QdrantClient, alias: str) -> Optional[str]:
+    """Name of the collection ``alias`` points at, or ``None`` if it is not an alias."""
+    for description in client.get_aliases().aliases:
+        if description.alias_name == alias:
+            return description.collection_name
+    return None
+
+
+def collection_versions(client: QdrantClient, alias: str) -> List[Tuple[int, str]]:
+    """``(version, name)`` of every ``{alias}-v{N}`` collection, oldest first."""
+    pattern = re.compile(rf"{re.escape(alias)}-v(\d+)")
+    versions = []
+    for description in client.get_collections().collections:
+        match = pattern.fullmatch(description.name)
+        if match:
+            versions.append((int(match.group(1)), description.name))
+    return sorted(versions)
+
+
+def _ensure_payload_indexes(client: QdrantClient, collection: str, indexed: Set[str]) -> None:
+    for field, schema in PAYLOAD_INDEXES.items():
+        if field in indexed:
+            continue
+        client.create_payload_index(collection_name=collection, field_name=field, field_schema=schema)
+
+
+def _create_collection(client: QdrantClient, name: str, vector_size: int) -> None:
+    client.create_collection(
+        collection_name=name,
+        vectors_config=qm.VectorParams(size=vector_size, distance=qm.Distance.COSINE),
+    )
+    _ensure_payload_indexes(client, name, set())
+
+
+def create_versioned_collection(client: QdrantClient, alias: str, vector_size: int) -> str:
+    """Create the next ``{alias}-v{N}`` collection with its payload indexes and return its name."""
+    versions = collection_versions(client, alias)
+    name = f"{alias}-v{versions[-1][0] + 1 if versions else 1}"
+    _create_collection(client, name, vector_size)
+    return name
+
+
+def switch_alias(client: QdrantClient, alias: str, collection: str) -> None:
+    """Point ``alias`` at ``collection`` in one atomic alias update."""
+    operations: List[Any] = []
+    if resolve_alias(client, alias) is not None:
+        operations.append(qm.DeleteAliasOperation(delete_alias=qm.DeleteAlias(alias_name=alias)))
+    operations.append(
+        qm.CreateAliasOperation(create_alias=qm.CreateAlias(collection_name=collection, alias_name=alias))
+    )
+    client.update_collection_aliases(change_aliases_operations=operations)
+
+
+def _create_alias_if_unset(client: QdrantClient, alias: str, collection: str) -> None:
+    if resolve_alias(client, alias) is not None:
+        return
+    try:
+        client.update_collection_aliases(
+            change_aliases_operations=[
+                qm.CreateAliasOperation(create_alias=qm.CreateAlias(collection_name=collection, alias_name=alias))
+            ]
+        )
+    except Exception:
+        # Another caller created it first.
+        if resolve_alias(client, alias) is None:
+            raise
+
+
 async def ensure_collection(vector_size: int) -> None:
+    """Make sure the configured collection (or the collection behind that alias) exists.
+
+    On a fresh node the first versioned collection is created behind an alias with
+    the configured name, so later rebuilds can swap it without downtime. Existing
+    collections are never recreated; only missing payload indexes are added. Safe to
+    race: every caller settles on ``{alias}-v1``, creates it only if absent and points
+    the alias at it only while the alias is unset.
+    """
     settings = get_settings()
     client = get_client()
+    name = settings.qdrant_collection
 
     def _ensure() -> None:
-        try:
-            client.get_collection(settings.qdrant_collection)
-        except Exception:
-            client.recreate_collection(
-                collection_name=settings.qdrant_collection,
-                vectors_config=qm.VectorParams(
-                    size=vector_size, distance=qm.Distance.COSINE
-                ),
-            )
+        target = resolve_alias(client, name) or name
+        if not client.collection_exists(target):
+            target = f"{name}-v1"
+            if not client.collection_exists(target):
+                try:
+                    _create_collection(client, target, vector_size)
+                except Exception:
+                    # Another ingest created it first.
+                    if not client.collection_exists(target):
+                        raise
+            _create_alias_if_unset(client, name, target)
+            target = resolve_alias(client, name) or target
+        info = client.get_collection(target)
+        _ensure_payload_indexes(client, target, set((info.payload_schema or {}).keys()))
 
     await asyncio.to_thread(_ensure)
 
 
+def point_id(source_id: str, chunk_index: int) -> str:
+    """Deterministic point ID so re-ingesting a source overwrites its chunks in place."""
+    content_key = f"{source_id}:{chunk_index}"
+    return str(UUID(bytes=hashlib.md5(content_key.encode()).digest(), version=4))
+
+
 async def upsert_embeddings(
-    embeddings: Sequence[Sequence[float]], payloads: Sequence[Dict[str, Any]]
+    embeddings: Sequence[Sequence[float]], payloads: Sequence[Dict[str, Any]], wait: bool = True
 ) -> None:
     settings = get_settings()
     client = get_client()
@@ -48,30 +155,17 @@ async def upsert_embeddings(
     def _upsert() -> None:
         points = []
         for embedding, payload in zip(embeddings, payloads, strict=True):
-            # Use source_id with chunk_index as ID for proper upsert behavior
             source_id = payload.get("source_id")
             chunk_index = payload.get("chunk_index", 0)
-
-            if source_id:
-                # Create deterministic UUID from source_id:chunk_index
-                # This ensures same content always gets same ID for proper upsert
-                content_key = f"{source_id}:{chunk_index}"
-                # Generate UUID5 from content_key for Qdrant compatibility
-                point_id = str(
-                    UUID(bytes=hashlib.md5(content_key.encode()).digest(), version=4)
-                )
-            else:
-                point_id = str(uuid4())
-
             points.append(
                 qm.PointStruct(
-                    id=point_id,
+                    id=point_id(source_id, chunk_index) if source_id else str(uuid4()),
                     vector=embedding,
                     payload=payload,
                 )
             )
 
-        client.upsert(collection_name=settings.qdrant_collection, points=points)
+        client.upsert(collection_name=settings.qdrant_collection, points=points, wait=wait)
 
     await asyncio.to_thread(_upsert)
 
@@ -92,3 +186,269 @@ async def search(
         )
 
     return await asyncio.to_thread(_search)
+
+
+async def fetch_source_states(source_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """Return ``{source_id: {"content_hash", "chunk_count"}}`` read from each source's first chunk."""
+    settings = get_settings()
+    client = get_client()
+    ids = {point_id(source_id, 0): source_id for source_id in source_ids}
+    if not ids:
+        return {}
+
+    def _retrieve() -> Dict[str, Dict[str, Any]]:
+        try:
+            points = client.retrieve(
+                collection_name=settings.qdrant_collection,
+                ids=list(ids),
+                with_payload=["source_id", "content_hash", "chunk_count"],
+                with_vectors=False,
+            )
+        except UnexpectedResponse as exc:
+            # Collection not created yet: nothing has been ingested.
+            if _collection_missing(exc):
+                return {}
+            raise
+        states: Dict[str, Dict[str, Any]] = {}
+        for point in points:
+            payload = point.payload or {}
+            source_id = payload.get("source_id") or ids.get(str(point.id))
+            if source_id:
+                states[source_id] = payload
+        return states
+
+    return await asyncio.to_thread(_retrieve)
+
+
+async def commit_source_hashes(hashes: Dict[str, str]) -> None:
+    """Record ``content_hash`` on each source's first chunk once all its chunks are stored.
+
+    :func:`fetch_source_states` reads the hash from there, so a source whose upsert
+    failed or was interrupted keeps no matching hash and is re-ingested next time.
+    Waits until the update (and every write queued before it) has been applied.
+    """
+    settings = get_settings()
+    client = get_client()
+    if not hashes:
+        return
+    operations = [
+        qm.SetPayloadOperation(
+            set_payload=qm.SetPayload(payload={"content_hash": digest}, points=[point_id(source_id, 0)])
+        )
+        for source_id, digest in hashes.items()
+    ]
+
+    def _commit() -> None:
+        client.batch_update_points(
+            collection_name=settings.qdrant_collection, update_operations=operations, wait=True
+        )
+
+    await asyncio.to_thread(_commit)
+
+
+async def delete_chunks_from(first_orphan_index: Dict[str, int]) -> None:
+    """Delete every chunk of each source whose ``chunk_index`` is at or beyond the given index."""
+    settings = get_settings()
+    client = get_client()
+    if not first_orphan_index:
+        return
+
+    selector = qm.Filter(
+        should=[
+            qm.Filter(
+                must=[
+                    qm.FieldCondition(key="source_id", match=qm.MatchValue(value=source_id)),
+                    qm.FieldCondition(key="chunk_index", range=qm.Range(gte=start)),
+                ]
+            )
+            for source_id, start in first_orphan_index.items()
+        ]
+    )
+
+    def _delete() -> None:
+        client.delete(
+            collection_name=settings.qdrant_collection,
+            points_selector=qm.FilterSelector(filter=selector),
+        )
+
+    await asyncio.to_thread(_delete)
+
+
+async def delete_sources_not_in(keep_source_ids: Iterable[str], restaurant_ids: Iterable[str | None]) -> int:
+    """Tombstone sources of the given restaurants that are not in ``keep_source_ids``.
+
+    ``None`` in ``restaurant_ids`` covers points without a restaurant. Points that
+    never had a ``source_id`` are left alone. Returns the number of chunks deleted.
+    """
+    settings = get_settings()
+    client = get_client()
+    keep = sorted(set(keep_source_ids))
+    scopes = set(restaurant_ids)
+    named = sorted(scope for scope in scopes if scope)
+    scope_conditions: List[qm.Condition] = []
+    if named:
+        scope_conditions.append(qm.FieldCondition(key="restaurant_id", match=qm.MatchAny(any=named)))
+    if None in scopes:
+        scope_conditions.append(qm.IsEmptyCondition(is_empty=qm.PayloadField(key="restaurant_id")))
+    if not scope_conditions:
+        return 0
+
+    must_not: List[qm.Condition] = [qm.IsEmptyCondition(is_empty=qm.PayloadField(key="source_id"))]
+    if keep:
+        must_not.append(qm.FieldCondition(key="source_id", match=qm.MatchAny(any=keep)))
+    selector = qm.Filter(should=scope_conditions, must_not=must_not)
+
+    def _delete() -> int:
+        try:
+            orphaned = client.count(
+                collection_name=settings.qdrant_collection, count_filter=selector, exact=True
+            ).count
+        except UnexpectedResponse as exc:
+            if _collection_missing(exc):
+                return 0
+            raise
+        if orphaned:
+            client.delete(
+                collection_name=settings.qdrant_collection,
+                points_selector=qm.FilterSelector(filter=selector),
+            )
+        return orphaned
+
+    return await asyncio.to_thread(_delete)
+
+
+async def delete_restaurants_not_in(keep_restaurant_ids: Iterable[str]) -> Tuple[int, Set[str]]:
+    """Tombstone every source of restaurants not in ``keep_restaurant_ids``.
+
+    For catalog-wide syncs: a restaurant that vanished from the source of truth
+    leaves no documents behind to scope a per-restaurant sync. Points without a
+    restaurant or a ``source_id`` are left alone. Returns the number of chunks
+    deleted and the restaurants they belonged to.
+    """
+    settings = get_settings()
+    client = get_client()
+    keep = sorted(set(keep_restaurant_ids))
+    must_not: List[qm.Condition] = [
+        qm.IsEmptyCondition(is_empty=qm.PayloadField(key="source_id")),
+        qm.IsEmptyCondition(is_empty=qm.PayloadField(key="restaurant_id")),
+    ]
+    if keep:
+        must_not.append(qm.FieldCondition(key="restaurant_id", match=qm.MatchAny(any=keep)))
+    selector = qm.Filter(must_not=must_not)
+    first_chunks = qm.Filter(
+        must=[qm.FieldCondition(key="chunk_index", match=qm.MatchValue(value=0))], must_not=must_not
+    )
+
+    def _delete() -> Tuple[int, Set[str]]:
+        try:
+            doomed = client.count(
+                collection_name=settings.qdrant_collection, count_filter=selector, exact=True
+            ).count
+        except UnexpectedResponse as exc:
+            if _collection_missing(exc):
+                return 0, set()
+            raise
+        if not doomed:
+            return 0, set()
+        removed: Set[str] = set()
+        offset = None
+        while True:
+            points, offset = client.scroll(
+                collection_name=settings.qdrant_collection,
+                scroll_filter=first_chunks,
+                limit=1000,
+                offset=offset,
+                with_payload=["restaurant_id"],
+                with_vectors=False,
+            )
+            removed.update(str((point.payload or {})["restaurant_id"]) for point in points)
+            if offset is None:
+                break
+        client.delete(
+            collection_name=settings.qdrant_collection,
+            points_selector=qm.FilterSelector(filter=selector),
+        )
+        return doomed, removed
+
+    return await asyncio.to_thread(_delete)
+
+
+async def delete_sources(
+    source_ids: Iterable[str] = (), restaurant_ids: Iterable[str] = ()
+) -> int:
+    """Delete every chunk of the given sources and of the given restaurants.
+
+    Returns the number of chunks deleted.
+    """
+    settings = get_settings()
+    client = get_client()
+    sources = sorted(set(source_ids))
+    restaurants = sorted(set(restaurant_ids))
+    conditions: List[qm.Condition] = []
+    if sources:
+        conditions.append(qm.FieldCondition(key="source_id", match=qm.MatchAny(any=sources)))
+    if restaurants:
+        conditions.append(qm.FieldCondition(key="restaurant_id", match=qm.MatchAny(any=restaurants)))
+    if not conditions:
+        return 0
+    selector = qm.Filter(should=conditions)
+
+    def _delete() -> int:
+        try:
+            doomed = client.count(
+                collection_name=settings.qdrant_collection, count_filter=selector, exact=True
+            ).count
+        except UnexpectedResponse as exc:
+            if _collection_missing(exc):
+                return 0
+            raise
+        if doomed:
+            client.delete(
+                collection_name=settings.qdrant_collection,
+                points_selector=qm.FilterSelector(filter=selector),
+            )
+        return doomed
+
+    return await asyncio.to_thread(_delete)
+
+
+async def list_sources(
+    prefix: str = "", restaurant_ids: Optional[Iterable[str]] = None, page_size: int = 1000
+) -> Dict[str, Optional[str]]:
+    """Return ``{source_id: restaurant_id}`` for stored sources whose id starts with ``prefix``.
+
+    Only first chunks are scrolled, without vectors.
+    """
+    settings = get_settings()
+    client = get_client()
+    must: List[qm.Condition] = [qm.FieldCondition(key="chunk_index", match=qm.MatchValue(value=0))]
+    if restaurant_ids is not None:
+        must.append(qm.FieldCondition(key="restaurant_id", match=qm.MatchAny(any=sorted(set(restaurant_ids)))))
+    scroll_filter = qm.Filter(must=must)
+
+    def _scroll() -> Dict[str, Optional[str]]:
+        sources: Dict[str, Optional[str]] = {}
+        offset = None
+        while True:
+            try:
+                points, offset = client.scroll(
+                    collection_name=settings.qdrant_collection,
+                    scroll_filter=scroll_filter,
+                    limit=page_size,
+                    offset=offset,
+                    with_payload=["source_id", "restaurant_id"],
+                    with_vectors=False,
+                )
+            except UnexpectedResponse as exc:
+                if _collection_missing(exc):
+                    return sources
+                raise
+            for point in points:
+                payload = point.payload or {}
+                source_id = payload.get("source_id")
+                if source_id and source_id.startswith(prefix):
+                    sources[source_id] = payload.get("restaurant_id")
+            if offset is None:
+                return sources
+
+    return await asyncio.to_thread(_scroll)
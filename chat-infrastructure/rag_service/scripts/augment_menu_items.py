@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import argparse
-import json
 from pathlib import Path
+from typing import Any, Dict, Iterator
+
+from menu_io import iter_items, read_exported_at, write_items
 
 
 ENRICHMENTS = {
@@ -323,21 +325,27 @@ ENRICHMENTS = {
 
 
 def enrich_items(input_path: Path, output_path: Path) -> None:
-    data = json.loads(input_path.read_text(encoding="utf-8"))
-    for item in data.get("items", []):
-        extra = ENRICHMENTS.get(item["menu_item_id"])
-        if not extra:
-            continue
-        item.update(extra)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
-    print(f"Enriched {len(ENRICHMENTS)} menu items → {output_path}")
+    """Stream items from ``input_path`` to ``output_path``; either may be a JSON document or (compressed) JSONL."""
+    enriched = 0
+
+    def enrich(items: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        nonlocal enriched
+        for item in items:
+            extra = ENRICHMENTS.get(item["menu_item_id"])
+            if extra:
+                item.update(extra)
+                enriched += 1
+            yield item
+
+    # The output is replaced only once complete, so it may be the input itself.
+    count = write_items(output_path, enrich(iter_items(input_path)), exported_at=read_exported_at(input_path))
+    print(f"Enriched {enriched} of {count} menu items → {output_path}")
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Augment exported menu items with tags and allergen metadata.")
-    parser.add_argument("--input", required=True, help="Path to menu_items.json")
-    parser.add_argument("--output", required=True, help="Path to write enriched JSON")
+    parser.add_argument("--input", required=True, help="Path to menu_items.json or menu_items.jsonl[.gz|.zst]")
+    parser.add_argument("--output", required=True, help="Path to write enriched items; .jsonl[.gz|.zst] streams them")
     return parser.parse_args()
 
 
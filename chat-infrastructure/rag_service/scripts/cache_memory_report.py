@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+import redis
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.config import get_settings  # noqa: E402
+from app.services.cache import decode_cached_fields  # noqa: E402
+from app.services.codec import decode_payload, encode_payload, is_encoded  # noqa: E402
+
+
+def legacy_size(value: Dict[str, Any]) -> int:
+    """Bytes the value took in the original answer + sources JSON layout."""
+    return len(value.get("answer", "").encode("utf-8")) + len(json.dumps(value.get("sources", [])).encode("utf-8"))
+
+
+def _summary(values: List[int]) -> Dict[str, float]:
+    return {"count": len(values), "avg_bytes": sum(values) / len(values) if values else 0.0, "total_bytes": sum(values)}
+
+
+def sample_answers(client: redis.Redis, pattern: str, limit: int) -> Dict[str, Any]:
+    memory: Dict[str, List[int]] = {"legacy": [], "encoded": []}
+    value_sizes: Dict[str, List[int]] = {"legacy": [], "msgpack": [], "msgpack_zstd": []}
+    sampled = 0
+    for key in client.scan_iter(match=pattern, count=1000, _type="hash"):
+        if sampled >= limit:
+            break
+        data = client.hgetall(key)
+        value = decode_cached_fields(data) if data else None
+        if value is None:
+            continue
+        sampled += 1
+        layout = "encoded" if b"v" in data else "legacy"
+        memory[layout].append(client.memory_usage(key, samples=0) or 0)
+        value_sizes["legacy"].append(legacy_size(value))
+        value_sizes["msgpack"].append(len(encode_payload(value, compress=False)))
+        value_sizes["msgpack_zstd"].append(len(encode_payload(value, compress=True)))
+    return {
+        "sampled_keys": sampled,
+        "memory_usage_per_key": {layout: _summary(values) for layout, values in memory.items()},
+        "value_bytes_per_key": {fmt: _summary(values) for fmt, values in value_sizes.items()},
+    }
+
+
+def sample_streams(client: redis.Redis, pattern: str, limit: int) -> Dict[str, Any]:
+    entries = 0
+    memory = 0
+    legacy_bytes = 0
+    encoded_bytes = 0
+    streams = 0
+    for key in client.scan_iter(match=pattern, count=1000, _type="stream"):
+        if streams >= limit:
+            break
+        streams += 1
+        memory += client.memory_usage(key, samples=0) or 0
+        for _, fields in client.xrange(key):
+            entries += 1
+            blob = fields.get(b"v")
+            if blob is not None and is_encoded(blob):
+                answer = decode_payload(blob)
+                encoded_bytes += len(blob)
+            else:
+                answer = fields.get(b"answer", b"").decode("utf-8")
+                encoded_bytes += len(encode_payload(answer))
+            legacy_bytes += len(answer.encode("utf-8"))
+    return {
+        "sampled_streams": streams,
+        "entries": entries,
+        "memory_usage_per_entry": memory / entries if entries else 0.0,
+        "answer_bytes_per_entry": {
+            "legacy": legacy_bytes / entries if entries else 0.0,
+            "encoded": encoded_bytes / entries if entries else 0.0,
+        },
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Compare Redis bytes per cached answer and session entry for the legacy and encoded formats."
+    )
+    parser.add_argument("--redis-url", default=get_settings().redis_url)
+    parser.add_argument("--answer-pattern", default="rag:answer:*")
+    parser.add_argument("--session-pattern", default="rag:session:*")
+    parser.add_argument("--sample", type=int, default=1000, help="Maximum keys/streams to sample for each pattern.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    client = redis.Redis.from_url(args.redis_url, decode_responses=False)
+    report = {
+        "answers": sample_answers(client, args.answer_pattern, args.sample),
+        "sessions": sample_streams(client, args.session_pattern, args.sample),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,85 +1,246 @@
+from __future__ import annotations
+
+import argparse
 import json
-import os
 import sys
-from sentence_transformers import SentenceTransformer, util
-from tqdm import tqdm
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from generate_similarity_pairs import TagIndex, canonical_text
+from menu_io import load_items
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_MODEL = PROJECT_ROOT / "models" / "menu-similarity-model"
+DEFAULT_PAIRS = PROJECT_ROOT / "data" / "menu_similarity_pairs.jsonl"
+# Upper bound on similarity-matrix cells held at once while ranking the catalog.
+RANK_BLOCK_CELLS = 1 << 25
+
+
+def load_pairs(path: Path) -> List[Dict[str, Any]]:
+    with path.open(encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+class TextTable:
+    """Unique texts, so every distinct text is encoded exactly once."""
+
+    def __init__(self) -> None:
+        self.texts: List[str] = []
+        self._rows: Dict[str, int] = {}
+
+    def add(self, text: str) -> int:
+        row = self._rows.get(text)
+        if row is None:
+            row = self._rows[text] = len(self.texts)
+            self.texts.append(text)
+        return row
+
+
+def encode(model: SentenceTransformer, texts: Sequence[str], batch_size: int) -> Dict[str, Any]:
+    started = time.perf_counter()
+    vectors = model.encode(
+        list(texts),
+        batch_size=batch_size,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=True,
+    ).astype(np.float32)
+    seconds = time.perf_counter() - started
+    return {
+        "vectors": vectors,
+        "stats": {
+            "texts": len(texts),
+            "seconds": round(seconds, 3),
+            "items_per_second": round(len(texts) / seconds, 1) if seconds else None,
+        },
+    }
+
+
+def triplet_metrics(vectors: np.ndarray, anchors: np.ndarray, positives: np.ndarray, negatives: np.ndarray) -> Dict[str, Any]:
+    """Accuracy and cosine margins of all triplets in one vectorized pass (vectors are unit length)."""
+    sim_pos = np.einsum("ij,ij->i", vectors[anchors], vectors[positives])
+    sim_neg = np.einsum("ij,ij->i", vectors[anchors], vectors[negatives])
+    margin = sim_pos - sim_neg
+    return {
+        "triplets": int(len(anchors)),
+        "accuracy": float((margin > 0).mean()),
+        "avg_positive_similarity": float(sim_pos.mean()),
+        "avg_negative_similarity": float(sim_neg.mean()),
+        "avg_margin": float(margin.mean()),
+        "margin_p10": float(np.percentile(margin, 10)),
+        "margin_p50": float(np.percentile(margin, 50)),
+    }
+
+
+def retrieval_metrics(
+    vectors: np.ndarray,
+    catalog_rows: np.ndarray,
+    anchors: Sequence[int],
+    relevant: Callable[[int], np.ndarray],
+    ks: Sequence[int],
+) -> Dict[str, Any]:
+    """Recall@k and MRR of ranking the whole catalog for every anchor.
+
+    ``anchors`` are catalog positions and ``relevant`` gives the catalog positions
+    that count as hits for one; the anchor itself is never a result. Recall@k is the
+    share of the top k that are hits, out of at most k, so anchors with many relevant
+    items can still reach 1.0. Anchors with nothing relevant are skipped.
+    """
+    catalog = vectors[catalog_rows]
+    top = min(max(ks), max(len(catalog) - 1, 1))
+    recalls = {k: [] for k in ks}
+    reciprocal_ranks: List[float] = []
+    block_size = max(1, RANK_BLOCK_CELLS // max(len(catalog), 1))
+    for start in range(0, len(anchors), block_size):
+        block = list(anchors[start : start + block_size])
+        scores = catalog[block] @ catalog.T
+        scores[np.arange(len(block)), block] = -np.inf
+        for row, anchor in enumerate(block):
+            hits = np.zeros(len(catalog), dtype=bool)
+            hits[relevant(anchor)] = True
+            hits[anchor] = False
+            total = int(hits.sum())
+            if not total:
+                continue
+            ranked = np.argpartition(-scores[row], top - 1)[:top]
+            ranked = ranked[np.argsort(-scores[row, ranked])]
+            for k in ks:
+                recalls[k].append(float(hits[ranked[:k]].sum()) / min(k, total))
+            # 1-based rank of the best-scoring hit among all other catalog items.
+            best = scores[row, hits].max()
+            reciprocal_ranks.append(1.0 / float((scores[row] > best).sum() + 1))
+    queries = len(reciprocal_ranks)
+    metrics: Dict[str, Any] = {"catalog_size": int(len(catalog)), "queries": queries}
+    for k in ks:
+        metrics[f"recall@{k}"] = float(np.mean(recalls[k])) if queries else 0.0
+    metrics["mrr"] = float(np.mean(reciprocal_ranks)) if queries else 0.0
+    return metrics
+
+
+def evaluate_model(
+    model_path: str,
+    data_path: Path,
+    items_path: Optional[Path] = None,
+    batch_size: int = 128,
+    ks: Sequence[int] = (1, 5, 10),
+) -> Dict[str, Any]:
+    """Score a model on triplets and on catalog retrieval; returns the report.
+
+    With ``items_path`` every item in it is ranked for each triplet anchor, and a hit
+    is any item sharing a tag with the anchor, the same rule the pair generator uses
+    for positives. Without it only the items named in the triplets are ranked and a
+    hit is one of the anchor's sampled positives, which says more about the sampler
+    than about catalog retrieval; the report names the rule under ``relevance``.
+    """
+    pairs = load_pairs(data_path)
+    if not pairs:
+        raise SystemExit(f"No triplets in {data_path}.")
+
+    table = TextTable()
+    anchors = np.array([table.add(pair["anchor"]) for pair in pairs])
+    positives = np.array([table.add(pair["positive"]) for pair in pairs])
+    negatives = np.array([table.add(pair["negative"]) for pair in pairs])
+
+    item_rows: Dict[str, int] = {}
+    if items_path is not None:
+        items = load_items(items_path)
+        for item in items:
+            item_rows.setdefault(str(item["menu_item_id"]), table.add(canonical_text(item)))
+        index = TagIndex(items)
+        position = {str(item["menu_item_id"]): idx for idx, item in enumerate(items)}
+        relevance = "shared_tags"
+
+        def relevant(anchor: int) -> np.ndarray:
+            return index.candidates(anchor, sharing=True)
+
+    else:
+        for pair in pairs:
+            for role in ("anchor", "positive", "negative"):
+                item_rows.setdefault(str(pair[f"{role}_id"]), table.add(pair[role]))
+        position = {item_id: idx for idx, item_id in enumerate(item_rows)}
+        sampled: Dict[int, Set[int]] = defaultdict(set)
+        for pair in pairs:
+            sampled[position[str(pair["anchor_id"])]].add(position[str(pair["positive_id"])])
+        relevance = "sampled_positives"
+
+        def relevant(anchor: int) -> np.ndarray:
+            return np.fromiter(sampled[anchor], dtype=np.int64)
+
+    query_anchors = sorted({position[str(pair["anchor_id"])] for pair in pairs if str(pair["anchor_id"]) in position})
 
-def evaluate_model(model_path, data_path):
     print(f"Loading model from {model_path}...")
-    try:
-        model = SentenceTransformer(model_path)
-    except Exception as e:
-        print(f"Error loading model: {e}")
-        return
-
-    print(f"Loading data from {data_path}...")
-    pairs = []
-    with open(data_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            if line.strip():
-                pairs.append(json.loads(line))
-
-    print(f"Evaluating on {len(pairs)} pairs...")
-    
-    correct_count = 0
-    total_margin = 0
-    total_pos_sim = 0
-    total_neg_sim = 0
-    total_count = 0
-
-    # Pre-compute embeddings if possible, or just process one by one
-    # For 300 items, one by one is fast enough
-    
-    for pair in tqdm(pairs):
-        anchor_text = pair['anchor']
-        positive_text = pair['positive']
-        negative_text = pair['negative']
-
-        # Encode
-        embeddings = model.encode([anchor_text, positive_text, negative_text], convert_to_tensor=True)
-        anchor_emb = embeddings[0]
-        pos_emb = embeddings[1]
-        neg_emb = embeddings[2]
-
-        # Cosine similarity
-        sim_pos = util.cos_sim(anchor_emb, pos_emb).item()
-        sim_neg = util.cos_sim(anchor_emb, neg_emb).item()
-
-        if sim_pos > sim_neg:
-            correct_count += 1
-        
-        total_margin += (sim_pos - sim_neg)
-        total_pos_sim += sim_pos
-        total_neg_sim += sim_neg
-        total_count += 1
-
-    accuracy = correct_count / total_count if total_count > 0 else 0
-    avg_margin = total_margin / total_count if total_count > 0 else 0
-    avg_pos_sim = total_pos_sim / total_count if total_count > 0 else 0
-    avg_neg_sim = total_neg_sim / total_count if total_count > 0 else 0
-
-    print(f"\nResults:")
-    print(f"Total Pairs: {total_count}")
-    print(f"Correct Predictions: {correct_count}")
-    print(f"Accuracy: {accuracy:.4f}")
-    print(f"Average Positive Similarity: {avg_pos_sim:.4f}")
-    print(f"Average Negative Similarity: {avg_neg_sim:.4f}")
-    print(f"Average Margin (Pos - Neg): {avg_margin:.4f}")
+    model = SentenceTransformer(model_path)
+    print(f"Encoding {len(table.texts)} unique texts for {len(pairs)} triplets...")
+    encoded = encode(model, table.texts, batch_size)
+    vectors = encoded["vectors"]
 
-if __name__ == "__main__":
-    # Resolve paths relative to script location
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.dirname(script_dir)
-    
-    model_dir = os.path.join(project_root, "models", "menu-similarity-model")
-    data_file = os.path.join(project_root, "data", "menu_similarity_pairs.jsonl")
-
-    if not os.path.exists(model_dir):
+    return {
+        "model": str(model_path),
+        "pairs": str(data_path),
+        "items": str(items_path) if items_path else None,
+        "evaluated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "encode": encoded["stats"],
+        "triplet": triplet_metrics(vectors, anchors, positives, negatives),
+        "retrieval": {
+            "relevance": relevance,
+            **retrieval_metrics(vectors, np.array(list(item_rows.values())), query_anchors, relevant, ks),
+        },
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Evaluate a menu similarity model on triplets and catalog retrieval.")
+    parser.add_argument("--model-path", default=str(DEFAULT_MODEL), help="Sentence-transformer model directory.")
+    parser.add_argument("--pairs", default=str(DEFAULT_PAIRS), help="JSONL triplets from generate_similarity_pairs.py.")
+    parser.add_argument("--items", help="Optional menu_items_enriched.json[l]; its whole catalog is ranked for retrieval.")
+    parser.add_argument("--batch-size", type=int, default=128, help="Encoding batch size.")
+    parser.add_argument("--k", type=int, action="append", help="Recall cut-offs (default 1, 5 and 10).")
+    parser.add_argument("--report", help="JSON report path (default: eval_report.json in the model directory).")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    model_dir = Path(args.model_path)
+    if not model_dir.exists():
         print(f"Model directory not found: {model_dir}")
         sys.exit(1)
-
-    if not os.path.exists(data_file):
-        print(f"Data file not found: {data_file}")
+    data_path = Path(args.pairs)
+    if not data_path.exists():
+        print(f"Data file not found: {data_path}")
         sys.exit(1)
 
-    evaluate_model(model_dir, data_file)
\ No newline at end of file
+    report = evaluate_model(
+        args.model_path,
+        data_path,
+        Path(args.items) if args.items else None,
+        args.batch_size,
+        sorted(set(args.k or [1, 5, 10])),
+    )
+    triplet, retrieval, stats = report["triplet"], report["retrieval"], report["encode"]
+    print("\nResults:")
+    print(f"Total Pairs: {triplet['triplets']}")
+    print(f"Accuracy: {triplet['accuracy']:.4f}")
+    print(f"Average Positive Similarity: {triplet['avg_positive_similarity']:.4f}")
+    print(f"Average Negative Similarity: {triplet['avg_negative_similarity']:.4f}")
+    print(f"Average Margin (Pos - Neg): {triplet['avg_margin']:.4f}")
+    recalls = ", ".join(f"{name}: {value:.4f}" for name, value in retrieval.items() if name.startswith("recall@"))
+    print(
+        f"Retrieval over {retrieval['catalog_size']} items ({retrieval['relevance']}): "
+        f"{recalls}, MRR: {retrieval['mrr']:.4f}"
+    )
+    print(f"Encoding: {stats['texts']} texts at {stats['items_per_second']} items/s")
+
+    report_path = Path(args.report) if args.report else model_dir / "eval_report.json"
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Wrote report to {report_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,7 @@ import json
 import os
 import sys
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 
 from dotenv import load_dotenv
 import mysql.connector
@@ -18,6 +18,8 @@ MONOREPO_ROOT = PROJECT_ROOT.parent
 if str(RAG_ROOT) not in sys.path:
     sys.path.insert(0, str(RAG_ROOT))
 
+from menu_io import write_items, write_jsonl  # noqa: E402
+
 
 DEFAULT_ENV_PATHS = [
     RAG_ROOT / ".env",
@@ -61,7 +63,30 @@ def connect_database(config: Dict[str, Any]):
     return mysql.connector.connect(**config)
 
 
-def fetch_menu_items(cursor: MySQLCursorDict, restaurant_ids: Optional[List[str]]) -> List[Dict[str, Any]]:
+def _menu_item(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "menu_item_id": record["id"],
+        "restaurant_id": record["restaurant_id"],
+        "restaurant_name": record["restaurant_name"],
+        "category_id": record["category_id"],
+        "category_name": record["category_name"],
+        "sku": record["sku"],
+        "name": record["name"],
+        "description": record.get("description"),
+        "image_url": record.get("image_url"),
+        "price_cents": int(record.get("price_cents") or 0),
+        "prep_time_seconds": record.get("prep_time_seconds"),
+        "is_available": bool(record.get("is_available", True)),
+    }
+
+
+def iter_menu_items(
+    cursor: MySQLCursorDict, restaurant_ids: Optional[List[str]], batch_size: int = 1000
+) -> Iterator[Dict[str, Any]]:
+    """Stream menu items from an unbuffered cursor, ``batch_size`` rows at a time.
+
+    Rows stay on the server until fetched, so memory does not grow with the catalog.
+    """
     query = """
         SELECT
             mi.id,
@@ -88,41 +113,31 @@ def fetch_menu_items(cursor: MySQLCursorDict, restaurant_ids: Optional[List[str]
         params.extend(restaurant_ids)
 
     cursor.execute(query, params)
-    rows: List[Dict[str, Any]] = []
-    for record in cursor.fetchall():
-        rows.append(
-            {
-                "menu_item_id": record["id"],
-                "restaurant_id": record["restaurant_id"],
-                "restaurant_name": record["restaurant_name"],
-                "category_id": record["category_id"],
-                "category_name": record["category_name"],
-                "sku": record["sku"],
-                "name": record["name"],
-                "description": record.get("description"),
-                "image_url": record.get("image_url"),
-                "price_cents": int(record.get("price_cents") or 0),
-                "prep_time_seconds": record.get("prep_time_seconds"),
-                "is_available": bool(record.get("is_available", True)),
-            }
-        )
-    return rows
+    while True:
+        records = cursor.fetchmany(batch_size)
+        if not records:
+            break
+        for record in records:
+            yield _menu_item(record)
 
 
-def write_output(data: List[Dict[str, Any]], output_path: Optional[str]) -> None:
-    payload = {
-        "exported_at": os.getenv("EXPORT_TIMESTAMP") or None,
-        "count": len(data),
-        "items": data,
-    }
-    text = json.dumps(payload, indent=2, ensure_ascii=False)
+def write_output(items: Iterator[Dict[str, Any]], output_path: Optional[str], jsonl: bool) -> int:
+    """Write to ``output_path`` (format and compression from its suffix) or stdout; returns the count.
+
+    JSONL output streams straight from the cursor; a JSON document collects the items first.
+    """
     if output_path:
         path = Path(output_path)
-        path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_text(text, encoding="utf-8")
-        print(f"Wrote {len(data)} menu items to {path}")
-    else:
-        print(text)
+        count = write_items(path, items, exported_at=os.getenv("EXPORT_TIMESTAMP") or None)
+        print(f"Wrote {count} menu items to {path}")
+        return count
+    if jsonl:
+        return write_jsonl(sys.stdout, items)
+    data = list(items)
+    if data:
+        payload = {"exported_at": os.getenv("EXPORT_TIMESTAMP") or None, "count": len(data), "items": data}
+        print(json.dumps(payload, indent=2, ensure_ascii=False))
+    return len(data)
 
 
 def parse_args() -> argparse.Namespace:
@@ -141,8 +156,13 @@ def parse_args() -> argparse.Namespace:
     )
     parser.add_argument(
         "--output",
-        help="If provided, write JSON to this file. Otherwise prints to stdout.",
+        help=(
+            "If provided, write to this file. Otherwise prints to stdout. A .jsonl path streams one item "
+            "per line; add .gz or .zst to compress (e.g. data/menu_items.jsonl.zst)."
+        ),
     )
+    parser.add_argument("--jsonl", action="store_true", help="Print JSONL instead of a JSON document to stdout.")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows fetched from the database per round trip.")
     return parser.parse_args()
 
 
@@ -152,12 +172,11 @@ def main() -> None:
     config = get_db_config(args)
     connection = connect_database(config)
     try:
-        cursor = connection.cursor(dictionary=True)
-        rows = fetch_menu_items(cursor, args.restaurant_id or None)
-        if not rows:
-            print("No menu items matched the provided filters.")
-            return
-        write_output(rows, args.output)
+        cursor = connection.cursor(dictionary=True, buffered=False)
+        items = iter_menu_items(cursor, args.restaurant_id or None, args.batch_size)
+        count = write_output(items, args.output, args.jsonl)
+        if not count:
+            print("No menu items matched the provided filters.", file=sys.stderr if args.jsonl else sys.stdout)
     finally:
         connection.close()
 
@@ -1,15 +1,32 @@
+"""Build (anchor, positive, negative) triplets from a menu export for similarity training.
+
+Positives and negatives are sampled from the whole catalog, so the export is loaded
+into memory in full, even when it is JSONL.
+"""
+
 from __future__ import annotations
 
 import argparse
 import json
 import random
+from multiprocessing import Pool
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
 
+from menu_io import load_items
 
-def load_items(path: Path) -> List[Dict[str, Any]]:
-    raw = json.loads(path.read_text(encoding="utf-8"))
-    return raw.get("items", [])
+# Random draws per wanted sample before falling back to an exact scan of the anchor's candidates.
+MAX_REJECTIONS = 8
+# Anchors handed to a worker at a time.
+ANCHOR_CHUNK = 256
+# Distinct tag sets whose candidate lists are kept per process.
+CANDIDATE_CACHE_SIZE = 4096
+# Nearest neighbours fetched per hard-negative slot; most close neighbours share a tag.
+MINING_OVERFETCH = 4
+# Upper bound on similarity-matrix cells (float32) held at once while mining.
+MINING_BLOCK_CELLS = 1 << 25
 
 
 def canonical_text(item: Dict[str, Any]) -> str:
@@ -35,52 +52,268 @@ def canonical_text(item: Dict[str, Any]) -> str:
     return " ".join(pieces)
 
 
+def item_tags(item: Dict[str, Any]) -> Set[str]:
+    tags = set(item.get("dietary_tags") or []) | {item.get("spice_level")} | set(item.get("allergens") or [])
+    tags.discard(None)
+    return tags
+
+
 def share_tags(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
-    a_tags = set(a.get("dietary_tags") or []) | {a.get("spice_level")} | set(a.get("allergens") or [])
-    b_tags = set(b.get("dietary_tags") or []) | {b.get("spice_level")} | set(b.get("allergens") or [])
-    a_tags.discard(None)
-    b_tags.discard(None)
-    return len(a_tags & b_tags) > 0
+    return bool(item_tags(a) & item_tags(b))
+
+
+class TagIndex:
+    """Tag sets of the whole catalog as integer bitsets plus an inverted tag index.
+
+    ``masks`` answer "do these two items share a tag" in O(1); the postings give
+    every item carrying a tag, for exact candidate scans.
+    """
+
+    def __init__(self, items: List[Dict[str, Any]]) -> None:
+        vocabulary: Dict[str, int] = {}
+        postings: List[List[int]] = []
+        self.masks: List[int] = []
+        self.tags: List[List[int]] = []
+        for idx, item in enumerate(items):
+            tag_ids = [vocabulary.setdefault(tag, len(vocabulary)) for tag in sorted(item_tags(item))]
+            mask = 0
+            for tag_id in tag_ids:
+                if tag_id == len(postings):
+                    postings.append([])
+                postings[tag_id].append(idx)
+                mask |= 1 << tag_id
+            self.masks.append(mask)
+            self.tags.append(tag_ids)
+        self.postings = [np.asarray(items_with_tag, dtype=np.int64) for items_with_tag in postings]
+        self._pools: Dict[Tuple[int, bool], np.ndarray] = {}
+
+    def candidates(self, anchor: int, sharing: bool) -> np.ndarray:
+        """Items that do (or do not) share a tag with ``anchor``; may include the anchor itself.
+
+        Cached per tag set, since many items of a catalog carry the same tags.
+        """
+        key = (self.masks[anchor], sharing)
+        pool = self._pools.get(key)
+        if pool is None:
+            selected = np.zeros(len(self.masks), dtype=bool)
+            for tag_id in self.tags[anchor]:
+                selected[self.postings[tag_id]] = True
+            pool = np.flatnonzero(selected if sharing else ~selected)
+            if len(self._pools) >= CANDIDATE_CACHE_SIZE:
+                self._pools.clear()
+            self._pools[key] = pool
+        return pool
+
+    def sample(self, anchor: int, sharing: bool, count: int, rng: random.Random) -> List[int]:
+        """Draw ``count`` items uniformly (with replacement) from the anchor's candidates.
+
+        Rejection sampling against the bitsets is O(1) per draw when candidates are
+        common; rare candidate sets fall back to the inverted index. Returns an empty
+        list when there are no candidates.
+        """
+        total = len(self.masks)
+        target = self.masks[anchor]
+        picks: List[int] = []
+        misses = 0
+        while len(picks) < count and misses <= MAX_REJECTIONS * count:
+            idx = int(rng.random() * total)
+            if idx != anchor and bool(self.masks[idx] & target) == sharing:
+                picks.append(idx)
+            else:
+                misses += 1
+        if len(picks) < count:
+            pool = self.candidates(anchor, sharing)
+            if not len(pool) or (len(pool) == 1 and pool[0] == anchor):
+                return []
+            while len(picks) < count:
+                idx = int(pool[rng.randrange(len(pool))])
+                if idx != anchor:
+                    picks.append(idx)
+        return picks
+
+
+def load_item_vectors(
+    items: List[Dict[str, Any]], vectors_path: Optional[Path], model_path: Optional[str], batch_size: int
+) -> np.ndarray:
+    """Unit-length float32 embeddings in item order; zero rows for items the artifact lacks.
+
+    Read from a ``vector_artifact`` file when given, otherwise the catalog is encoded
+    once with the sentence-transformer at ``model_path``.
+    """
+    if vectors_path is not None:
+        from vector_artifact import load_artifact
+
+        artifact = load_artifact(vectors_path)
+        vectors = np.zeros((len(items), artifact.vectors.shape[1]), dtype=np.float32)
+        for idx, item in enumerate(items):
+            try:
+                vectors[idx] = artifact.vector(str(item["menu_item_id"]))
+            except KeyError:
+                continue
+    else:
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(model_path)
+        vectors = model.encode(
+            [canonical_text(item) for item in items],
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=True,
+        ).astype(np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def mine_hard_negatives(vectors: np.ndarray, index: TagIndex, pool_size: int) -> np.ndarray:
+    """For every item, the ``pool_size`` most similar items sharing none of its tags.
+
+    Returns an ``(items, pool_size)`` int32 matrix, nearest first, padded with -1.
+    Similarities are computed block by block against the whole catalog; when the
+    nearest neighbours all share a tag, the anchor's full negative set is ranked.
+    """
+    total = len(vectors)
+    result = np.full((total, pool_size), -1, dtype=np.int32)
+    valid = vectors.any(axis=1)
+    fetch = min(pool_size * MINING_OVERFETCH, total - 1)
+    if fetch <= 0:
+        return result
+    block_size = max(1, min(1024, MINING_BLOCK_CELLS // total))
+    for start in range(0, total, block_size):
+        sims = vectors[start : start + block_size] @ vectors.T
+        sims[:, ~valid] = -np.inf
+        nearest = np.argpartition(-sims, fetch - 1, axis=1)[:, :fetch]
+        for row in range(len(sims)):
+            anchor = start + row
+            if not valid[anchor]:
+                continue
+            scores = sims[row]
+            target = index.masks[anchor]
+            ranked = nearest[row][np.argsort(-scores[nearest[row]])]
+            picked = [
+                int(idx) for idx in ranked if idx != anchor and valid[idx] and not index.masks[idx] & target
+            ][:pool_size]
+            if len(picked) < pool_size:
+                negatives = index.candidates(anchor, sharing=False)
+                negatives = negatives[valid[negatives] & (negatives != anchor)]
+                picked = negatives[np.argsort(-scores[negatives])[:pool_size]].tolist()
+            result[anchor, : len(picked)] = picked
+    return result
+
+
+_state: Dict[str, Any] = {}
+
+
+def _init_state(
+    items: List[Dict[str, Any]],
+    per_item: int,
+    seed: Optional[int],
+    hard_negatives: Optional[np.ndarray] = None,
+) -> None:
+    _state.update(
+        ids=[item["menu_item_id"] for item in items],
+        texts=[canonical_text(item) for item in items],
+        index=TagIndex(items),
+        per_item=per_item,
+        seed=seed,
+        hard_negatives=hard_negatives,
+    )
+
+
+def _anchor_lines(anchors: range) -> List[str]:
+    ids, texts, index, per_item = _state["ids"], _state["texts"], _state["index"], _state["per_item"]
+    lines: List[str] = []
+    for anchor in anchors:
+        # Seeded per anchor so the output does not depend on --workers.
+        rng = random.Random(f"{_state['seed']}:{anchor}")
+        positives = index.sample(anchor, True, per_item, rng)
+        hard = _state["hard_negatives"][anchor] if _state["hard_negatives"] is not None else None
+        if hard is not None and hard[0] >= 0:
+            hard = hard[hard >= 0]
+            negatives = [int(hard[rng.randrange(len(hard))]) for _ in positives]
+        else:
+            negatives = index.sample(anchor, False, per_item, rng) if positives else []
+        for positive, negative in zip(positives, negatives):
+            pair = {
+                "anchor_id": ids[anchor],
+                "positive_id": ids[positive],
+                "negative_id": ids[negative],
+                "anchor": texts[anchor],
+                "positive": texts[positive],
+                "negative": texts[negative],
+            }
+            lines.append(json.dumps(pair, ensure_ascii=False) + "\n")
+    return lines
+
+
+def iter_pair_lines(
+    items: List[Dict[str, Any]],
+    per_item: int,
+    seed: Optional[int],
+    workers: int = 1,
+    hard_negatives: Optional[np.ndarray] = None,
+) -> Iterator[List[str]]:
+    """Yield JSONL triplet lines anchor chunk by anchor chunk, in item order.
+
+    A positive shares at least one tag (dietary tag, spice level or allergen) with
+    its anchor, a negative shares none; anchors lacking either are skipped. With
+    ``hard_negatives`` (see ``mine_hard_negatives``) negatives are drawn from the
+    anchor's mined pool instead of uniformly.
+    """
+    chunks = [range(start, min(start + ANCHOR_CHUNK, len(items))) for start in range(0, len(items), ANCHOR_CHUNK)]
+    if workers <= 1:
+        _init_state(items, per_item, seed, hard_negatives)
+        for chunk in chunks:
+            yield _anchor_lines(chunk)
+        return
+    with Pool(workers, initializer=_init_state, initargs=(items, per_item, seed, hard_negatives)) as pool:
+        yield from pool.imap(_anchor_lines, chunks)
 
 
 def build_pairs(items: List[Dict[str, Any]], per_item: int, seed: Optional[int]) -> List[Dict[str, Any]]:
-    rng = random.Random(seed)
-    pairs: List[Dict[str, Any]] = []
-    for anchor in items:
-        positives = [item for item in items if item["menu_item_id"] != anchor["menu_item_id"] and share_tags(anchor, item)]
-        negatives = [item for item in items if item["menu_item_id"] != anchor["menu_item_id"] and not share_tags(anchor, item)]
-        if not positives or not negatives:
-            continue
-        for _ in range(per_item):
-            positive = rng.choice(positives)
-            negative = rng.choice(negatives)
-            pairs.append(
-                {
-                    "anchor_id": anchor["menu_item_id"],
-                    "positive_id": positive["menu_item_id"],
-                    "negative_id": negative["menu_item_id"],
-                    "anchor": canonical_text(anchor),
-                    "positive": canonical_text(positive),
-                    "negative": canonical_text(negative),
-                }
-            )
-    return pairs
-
-
-def write_pairs(pairs: List[Dict[str, Any]], path: Path) -> None:
+    return [json.loads(line) for lines in iter_pair_lines(items, per_item, seed) for line in lines]
+
+
+def write_pairs(
+    items: List[Dict[str, Any]],
+    path: Path,
+    per_item: int,
+    seed: Optional[int],
+    workers: int = 1,
+    hard_negatives: Optional[np.ndarray] = None,
+) -> int:
+    """Stream triplets to ``path`` as they are generated; returns how many were written."""
     path.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
     with path.open("w", encoding="utf-8") as handle:
-        for pair in pairs:
-            handle.write(json.dumps(pair, ensure_ascii=False) + "\n")
-    print(f"Wrote {len(pairs)} triplets to {path}")
+        for lines in iter_pair_lines(items, per_item, seed, workers, hard_negatives):
+            handle.writelines(lines)
+            written += len(lines)
+    return written
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Generate similarity triplets from enriched menu data.")
-    parser.add_argument("--input", required=True, help="Path to menu_items_enriched.json")
+    parser.add_argument("--input", required=True, help="Path to menu_items_enriched.json or .jsonl[.gz|.zst]")
     parser.add_argument("--output", required=True, help="Path to JSONL file with triplets.")
     parser.add_argument("--pairs-per-item", type=int, default=5, help="Triplets to create per anchor item.")
     parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=1, help="Processes generating triplets in parallel.")
+
+    # Hard-negative mining
+    parser.add_argument(
+        "--hard-negatives",
+        action="store_true",
+        help="Pick negatives among the items closest in embedding space that share no tags with the anchor.",
+    )
+    parser.add_argument("--vectors", help="Vector artifact (.npy from sync_menu_vectors.py --vector-output) to mine with.")
+    parser.add_argument("--model-path", help="Sentence-transformer to encode the catalog with when --vectors is not given.")
+    parser.add_argument("--encode-batch-size", type=int, default=64, help="Batch size when encoding with --model-path.")
+    parser.add_argument(
+        "--hard-negative-pool",
+        type=int,
+        default=10,
+        help="Nearest tag-disjoint items per anchor that negatives are drawn from.",
+    )
     return parser.parse_args()
 
 
@@ -89,10 +322,21 @@ def main() -> None:
     items = load_items(Path(args.input))
     if not items:
         raise SystemExit("No items found in input file.")
-    pairs = build_pairs(items, args.pairs_per_item, args.seed)
-    if not pairs:
+    hard_negatives = None
+    if args.hard_negatives:
+        if not args.vectors and not args.model_path:
+            raise SystemExit("--hard-negatives needs --vectors or --model-path.")
+        vectors = load_item_vectors(
+            items, Path(args.vectors) if args.vectors else None, args.model_path, args.encode_batch_size
+        )
+        hard_negatives = mine_hard_negatives(vectors, TagIndex(items), args.hard_negative_pool)
+        print(f"Mined hard negatives for {int((hard_negatives[:, 0] >= 0).sum())} of {len(items)} items.")
+    output = Path(args.output)
+    written = write_pairs(items, output, args.pairs_per_item, args.seed, args.workers, hard_negatives)
+    if not written:
+        output.unlink(missing_ok=True)
         raise SystemExit("Unable to build any triplets. Check that items share tags.")
-    write_pairs(pairs, Path(args.output))
+    print(f"Wrote {written} triplets to {output}")
 
 
 if __name__ == "__main__":
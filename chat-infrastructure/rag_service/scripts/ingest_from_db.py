@@ -2,19 +2,25 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import multiprocessing
 import os
 import sys
+import time
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 import json
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timezone
 from decimal import Decimal
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional
+from itertools import groupby
+from queue import Empty, Full, Queue
+from threading import Event, Thread
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
 
 from dotenv import load_dotenv
-import mysql.connector
 from mysql.connector.cursor import MySQLCursorDict
+from mysql.connector.pooling import MySQLConnectionPool
 
 RAG_ROOT = Path(__file__).resolve().parents[1]
 PROJECT_ROOT = RAG_ROOT.parents[1]
@@ -22,8 +28,10 @@ MONOREPO_ROOT = PROJECT_ROOT.parent
 if str(RAG_ROOT) not in sys.path:
     sys.path.insert(0, str(RAG_ROOT))
 
-from app.schemas import DocumentMetadata, IngestDocument, IngestRequest  # noqa: E402
-from app.services.ingest import ingest_documents  # noqa: E402
+from app.schemas import DocumentMetadata, IngestDocument  # noqa: E402
+from app.services.cache import bump_generations  # noqa: E402
+from app.services.ingest import FullSyncScope, IngestStats, ingest_stream, prepare_collection  # noqa: E402
+from app.services.vectorstore import delete_restaurants_not_in, delete_sources, list_sources  # noqa: E402
 
 
 DEFAULT_ENV_PATHS = [
@@ -34,6 +42,28 @@ DEFAULT_ENV_PATHS = [
     MONOREPO_ROOT / "be" / ".env",
 ]
 
+# Tables whose updated_at high-water marks drive incremental runs.
+WATERMARK_TABLES = ("restaurants", "menu_categories", "menu_items", "promotions", "vouchers", "voucher_tiers")
+EPOCH = datetime(1970, 1, 1)
+DEFAULT_FETCH_BATCH_SIZE = 500
+# Upper bound on ids per IN (...) list.
+TIER_LOOKUP_CHUNK = 1000
+# Documents buffered between the DB fetchers and ingestion.
+DOCUMENT_QUEUE_SIZE = 1000
+# stream_documents reads on three pooled connections while run_ingestion holds a fourth.
+MIN_DB_POOL_SIZE = 4
+# Minimum seconds between progress lines of a shard.
+SHARD_PROGRESS_INTERVAL = 10.0
+STAT_COUNTERS = (
+    "documents",
+    "skipped_documents",
+    "invalid_documents",
+    "embedded_chunks",
+    "ingested_chunks",
+    "deleted_chunks",
+    "failed_chunks",
+)
+
 
 def _maybe_parse_json(value: Any) -> Any:
     if isinstance(value, (dict, list)) or value is None:
@@ -72,6 +102,7 @@ class MenuItemRow:
     price_cents: int
     prep_time_seconds: Optional[int]
     is_available: bool
+    category_active: bool = True
 
 
 @dataclass
@@ -143,11 +174,104 @@ def get_db_config(args: argparse.Namespace) -> Dict[str, Any]:
     return config
 
 
-def connect_database(config: Dict[str, Any]):
-    return mysql.connector.connect(**config)
+def create_pool(config: Dict[str, Any], size: int) -> MySQLConnectionPool:
+    return MySQLConnectionPool(pool_name="rag_ingest", pool_size=max(size, 1), **config)
+
+
+def iter_rows(
+    cursor: MySQLCursorDict, query: str, params: Sequence[Any], batch_size: int = DEFAULT_FETCH_BATCH_SIZE
+) -> Iterator[Dict[str, Any]]:
+    """Stream a query's rows in ``batch_size`` pages from an unbuffered cursor.
+
+    The result set must be fully consumed before the cursor runs another query.
+    """
+    cursor.execute(query, list(params))
+    while True:
+        records = cursor.fetchmany(batch_size)
+        if not records:
+            return
+        yield from records
+
+
+def _in_clause(column: str, values: Sequence[Any], params: List[Any]) -> str:
+    params.extend(values)
+    return f" AND {column} IN ({', '.join(['%s'] * len(values))})"
+
+
+def _restaurant_row(record: Dict[str, Any]) -> RestaurantRow:
+    return RestaurantRow(
+        id=record["id"],
+        name=record["name"],
+        timezone=record.get("timezone") or "UTC",
+        status=record.get("status") or "UNKNOWN",
+        address=_maybe_parse_json(record.get("address")),
+        business_hours=_maybe_parse_json(record.get("business_hours")),
+    )
 
 
-def fetch_restaurants(cursor: MySQLCursorDict, restaurant_ids: Optional[List[str]]) -> Dict[str, RestaurantRow]:
+def _menu_item_row(record: Dict[str, Any]) -> MenuItemRow:
+    return MenuItemRow(
+        id=record["id"],
+        restaurant_id=record["restaurant_id"],
+        restaurant_name=record["restaurant_name"],
+        category_id=record["category_id"],
+        category_name=record["category_name"],
+        sku=record["sku"],
+        name=record["name"],
+        description=record.get("description"),
+        price_cents=record.get("price_cents") or 0,
+        prep_time_seconds=record.get("prep_time_seconds"),
+        is_available=bool(record.get("is_available", True)),
+        category_active=bool(record.get("category_active", True)),
+    )
+
+
+def _promotion_row(record: Dict[str, Any]) -> PromotionRow:
+    return PromotionRow(
+        id=record["id"],
+        restaurant_id=record["restaurant_id"],
+        restaurant_name=record["restaurant_name"],
+        name=record["name"],
+        headline=record.get("headline"),
+        description=record.get("description"),
+        starts_at=record.get("starts_at"),
+        ends_at=record.get("ends_at"),
+        status=record.get("status") or "UNKNOWN",
+    )
+
+
+def _voucher_row(record: Dict[str, Any], prefix: str = "") -> VoucherRow:
+    return VoucherRow(
+        id=record[f"{prefix}id"],
+        promotion_id=record.get(f"{prefix}promotion_id"),
+        restaurant_id=record[f"{prefix}restaurant_id"],
+        code=record[f"{prefix}code"],
+        name=record[f"{prefix}name"],
+        description=record.get(f"{prefix}description"),
+        discount_type=record.get(f"{prefix}discount_type") or "",
+        allow_stack_with_points=bool(record.get(f"{prefix}allow_stack_with_points", True)),
+        valid_from=record.get(f"{prefix}valid_from"),
+        valid_until=record.get(f"{prefix}valid_until"),
+        terms_url=record.get(f"{prefix}terms_url"),
+    )
+
+
+def _voucher_tier_row(record: Dict[str, Any], prefix: str = "") -> VoucherTierRow:
+    return VoucherTierRow(
+        voucher_id=record[f"{prefix}voucher_id"],
+        min_spend_cents=record.get(f"{prefix}min_spend_cents"),
+        discount_percent=record.get(f"{prefix}discount_percent"),
+        max_discount_cents=record.get(f"{prefix}max_discount_cents"),
+        sort_order=record.get(f"{prefix}sort_order") or 0,
+    )
+
+
+def iter_restaurants(
+    cursor: MySQLCursorDict,
+    restaurant_ids: Optional[List[str]],
+    changed_since: Optional[datetime] = None,
+    batch_size: int = DEFAULT_FETCH_BATCH_SIZE,
+) -> Iterator[RestaurantRow]:
     query = """
         SELECT id, name, timezone, status, address, business_hours
         FROM restaurants
@@ -155,28 +279,31 @@ def fetch_restaurants(cursor: MySQLCursorDict, restaurant_ids: Optional[List[str
     """
     params: List[Any] = []
     if restaurant_ids:
-        placeholders = ", ".join(["%s"] * len(restaurant_ids))
-        query += f" AND id IN ({placeholders})"
-        params.extend(restaurant_ids)
-
-    cursor.execute(query, params)
-    rows: Dict[str, RestaurantRow] = {}
-    for record in cursor.fetchall():
-        address = _maybe_parse_json(record.get("address"))
-        business_hours = _maybe_parse_json(record.get("business_hours"))
-
-        rows[record["id"]] = RestaurantRow(
-            id=record["id"],
-            name=record["name"],
-            timezone=record.get("timezone") or "UTC",
-            status=record.get("status") or "UNKNOWN",
-            address=address,
-            business_hours=business_hours,
-        )
-    return rows
+        query += _in_clause("id", restaurant_ids, params)
+    if changed_since is not None:
+        query += " AND updated_at >= %s"
+        params.append(changed_since)
+
+    for record in iter_rows(cursor, query, params, batch_size):
+        yield _restaurant_row(record)
+
 
+def fetch_restaurants(
+    cursor: MySQLCursorDict, restaurant_ids: Optional[List[str]], changed_since: Optional[datetime] = None
+) -> Dict[str, RestaurantRow]:
+    return {row.id: row for row in iter_restaurants(cursor, restaurant_ids, changed_since)}
 
-def fetch_menu_items(cursor: MySQLCursorDict, restaurant_ids: Optional[List[str]]) -> List[MenuItemRow]:
+
+def iter_menu_items(
+    cursor: MySQLCursorDict,
+    restaurant_ids: Optional[List[str]],
+    marks: Optional[Dict[str, datetime]] = None,
+    batch_size: int = DEFAULT_FETCH_BATCH_SIZE,
+) -> Iterator[MenuItemRow]:
+    """Stream menu items of active categories, or with ``marks`` every item changed since them.
+
+    Incremental fetches keep items of inactive categories so their vectors can be removed.
+    """
     query = """
         SELECT
             mi.id,
@@ -188,42 +315,39 @@ def fetch_menu_items(cursor: MySQLCursorDict, restaurant_ids: Optional[List[str]
             mi.sku,
             mc.id AS category_id,
             mc.name AS category_name,
+            mc.is_active AS category_active,
             r.id AS restaurant_id,
             r.name AS restaurant_name
         FROM menu_items mi
         INNER JOIN menu_categories mc ON mc.id = mi.category_id
         INNER JOIN restaurants r ON r.id = mc.restaurant_id
         WHERE r.deleted_at IS NULL
-          AND mc.is_active = TRUE
     """
     params: List[Any] = []
+    if marks is None:
+        query += " AND mc.is_active = TRUE"
+    else:
+        query += " AND (mi.updated_at >= %s OR mc.updated_at >= %s)"
+        params.extend([marks["menu_items"], marks["menu_categories"]])
     if restaurant_ids:
-        placeholders = ", ".join(["%s"] * len(restaurant_ids))
-        query += f" AND r.id IN ({placeholders})"
-        params.extend(restaurant_ids)
-
-    cursor.execute(query, params)
-    rows: List[MenuItemRow] = []
-    for record in cursor.fetchall():
-        rows.append(
-            MenuItemRow(
-                id=record["id"],
-                restaurant_id=record["restaurant_id"],
-                restaurant_name=record["restaurant_name"],
-                category_id=record["category_id"],
-                category_name=record["category_name"],
-                sku=record["sku"],
-                name=record["name"],
-                description=record.get("description"),
-                price_cents=record.get("price_cents") or 0,
-                prep_time_seconds=record.get("prep_time_seconds"),
-                is_available=bool(record.get("is_available", True)),
-            )
-        )
-    return rows
+        query += _in_clause("r.id", restaurant_ids, params)
 
+    for record in iter_rows(cursor, query, params, batch_size):
+        yield _menu_item_row(record)
 
-def fetch_promotions(cursor: MySQLCursorDict, restaurant_ids: Optional[List[str]]) -> List[PromotionRow]:
+
+def fetch_menu_items(
+    cursor: MySQLCursorDict,
+    restaurant_ids: Optional[List[str]],
+    marks: Optional[Dict[str, datetime]] = None,
+    batch_size: int = DEFAULT_FETCH_BATCH_SIZE,
+) -> List[MenuItemRow]:
+    return list(iter_menu_items(cursor, restaurant_ids, marks, batch_size))
+
+
+def fetch_promotions(
+    cursor: MySQLCursorDict, restaurant_ids: Optional[List[str]], promotion_ids: Optional[List[str]] = None
+) -> List[PromotionRow]:
     query = """
         SELECT
             p.id,
@@ -241,30 +365,15 @@ def fetch_promotions(cursor: MySQLCursorDict, restaurant_ids: Optional[List[str]
     """
     params: List[Any] = []
     if restaurant_ids:
-        placeholders = ", ".join(["%s"] * len(restaurant_ids))
-        query += f" AND p.restaurant_id IN ({placeholders})"
-        params.extend(restaurant_ids)
-
-    cursor.execute(query, params)
-    rows: List[PromotionRow] = []
-    for record in cursor.fetchall():
-        rows.append(
-            PromotionRow(
-                id=record["id"],
-                restaurant_id=record["restaurant_id"],
-                restaurant_name=record["restaurant_name"],
-                name=record["name"],
-                headline=record.get("headline"),
-                description=record.get("description"),
-                starts_at=record.get("starts_at"),
-                ends_at=record.get("ends_at"),
-                status=record.get("status") or "UNKNOWN",
-            )
-        )
-    return rows
+        query += _in_clause("p.restaurant_id", restaurant_ids, params)
+    if promotion_ids is not None:
+        query += _in_clause("p.id", promotion_ids, params)
+    return [_promotion_row(record) for record in iter_rows(cursor, query, params)]
 
 
-def fetch_vouchers(cursor: MySQLCursorDict, restaurant_ids: Optional[List[str]]) -> List[VoucherRow]:
+def fetch_vouchers(
+    cursor: MySQLCursorDict, restaurant_ids: Optional[List[str]], promotion_ids: Optional[List[str]] = None
+) -> List[VoucherRow]:
     query = """
         SELECT
             v.id,
@@ -279,65 +388,209 @@ def fetch_vouchers(cursor: MySQLCursorDict, restaurant_ids: Optional[List[str]])
             v.valid_until,
             v.terms_url
         FROM vouchers v
+        WHERE 1 = 1
     """
     params: List[Any] = []
     if restaurant_ids:
-        placeholders = ", ".join(["%s"] * len(restaurant_ids))
-        query += f" WHERE v.restaurant_id IN ({placeholders})"
-        params.extend(restaurant_ids)
-
-    cursor.execute(query, params)
-    rows: List[VoucherRow] = []
-    for record in cursor.fetchall():
-        rows.append(
-            VoucherRow(
-                id=record["id"],
-                promotion_id=record.get("promotion_id"),
-                restaurant_id=record["restaurant_id"],
-                code=record["code"],
-                name=record["name"],
-                description=record.get("description"),
-                discount_type=record.get("discount_type") or "",
-                allow_stack_with_points=bool(record.get("allow_stack_with_points", True)),
-                valid_from=record.get("valid_from"),
-                valid_until=record.get("valid_until"),
-                terms_url=record.get("terms_url"),
-            )
-        )
-    return rows
+        query += _in_clause("v.restaurant_id", restaurant_ids, params)
+    if promotion_ids is not None:
+        query += _in_clause("v.promotion_id", promotion_ids, params)
+    return [_voucher_row(record) for record in iter_rows(cursor, query, params)]
 
 
 def fetch_voucher_tiers(cursor: MySQLCursorDict, voucher_ids: Iterable[str]) -> Dict[str, List[VoucherTierRow]]:
+    """Tiers of the given vouchers, looked up in bounded ``IN`` lists."""
     tiers: Dict[str, List[VoucherTierRow]] = defaultdict(list)
     ids = list(voucher_ids)
-    if not ids:
-        return tiers
+    for start in range(0, len(ids), TIER_LOOKUP_CHUNK):
+        params: List[Any] = []
+        query = """
+            SELECT
+                voucher_id,
+                min_spend_cents,
+                discount_percent,
+                max_discount_cents,
+                sort_order
+            FROM voucher_tiers
+            WHERE 1 = 1
+        """
+        query += _in_clause("voucher_id", ids[start : start + TIER_LOOKUP_CHUNK], params)
+        query += " ORDER BY voucher_id, sort_order ASC"
+        for record in iter_rows(cursor, query, params):
+            tiers[record["voucher_id"]].append(_voucher_tier_row(record))
+    return tiers
+
+
+PromotionBundle = Tuple[PromotionRow, List[VoucherRow], Dict[str, List[VoucherTierRow]]]
 
-    placeholders = ", ".join(["%s"] * len(ids))
-    query = f"""
+
+def iter_promotion_bundles(
+    cursor: MySQLCursorDict, restaurant_ids: Optional[List[str]], batch_size: int = DEFAULT_FETCH_BATCH_SIZE
+) -> Iterator[PromotionBundle]:
+    """Stream each promotion with its vouchers and voucher tiers from a single ordered join."""
+    query = """
         SELECT
-            voucher_id,
-            min_spend_cents,
-            discount_percent,
-            max_discount_cents,
-            sort_order
-        FROM voucher_tiers
-        WHERE voucher_id IN ({placeholders})
-        ORDER BY voucher_id, sort_order ASC
+            p.id,
+            p.restaurant_id,
+            r.name AS restaurant_name,
+            p.name,
+            p.headline,
+            p.description,
+            p.starts_at,
+            p.ends_at,
+            p.status,
+            v.id AS v_id,
+            v.promotion_id AS v_promotion_id,
+            v.restaurant_id AS v_restaurant_id,
+            v.code AS v_code,
+            v.name AS v_name,
+            v.description AS v_description,
+            v.discount_type AS v_discount_type,
+            v.allow_stack_with_points AS v_allow_stack_with_points,
+            v.valid_from AS v_valid_from,
+            v.valid_until AS v_valid_until,
+            v.terms_url AS v_terms_url,
+            vt.voucher_id AS t_voucher_id,
+            vt.min_spend_cents AS t_min_spend_cents,
+            vt.discount_percent AS t_discount_percent,
+            vt.max_discount_cents AS t_max_discount_cents,
+            vt.sort_order AS t_sort_order
+        FROM promotions p
+        INNER JOIN restaurants r ON r.id = p.restaurant_id
+        LEFT JOIN vouchers v ON v.promotion_id = p.id
+        LEFT JOIN voucher_tiers vt ON vt.voucher_id = v.id
+        WHERE r.deleted_at IS NULL
+    """
+    params: List[Any] = []
+    if restaurant_ids:
+        query += _in_clause("p.restaurant_id", restaurant_ids, params)
+    query += " ORDER BY p.id, v.id, vt.sort_order"
+
+    records = iter_rows(cursor, query, params, batch_size)
+    for _, group in groupby(records, key=lambda record: record["id"]):
+        promotion: Optional[PromotionRow] = None
+        vouchers: Dict[str, VoucherRow] = {}
+        tiers: Dict[str, List[VoucherTierRow]] = defaultdict(list)
+        for record in group:
+            promotion = promotion or _promotion_row(record)
+            if record.get("v_id") and record["v_id"] not in vouchers:
+                vouchers[record["v_id"]] = _voucher_row(record, prefix="v_")
+            if record.get("t_voucher_id"):
+                tiers[record["t_voucher_id"]].append(_voucher_tier_row(record, prefix="t_"))
+        if promotion is not None:
+            yield promotion, list(vouchers.values()), tiers
+
+
+def fetch_deleted_restaurant_ids(cursor: MySQLCursorDict, since: datetime) -> List[str]:
+    return [record["id"] for record in iter_rows(cursor, "SELECT id FROM restaurants WHERE deleted_at >= %s", [since])]
+
+
+def fetch_changed_promotion_ids(
+    cursor: MySQLCursorDict, restaurant_ids: Optional[List[str]], marks: Dict[str, datetime]
+) -> List[str]:
+    """Promotions whose own row, or one of their vouchers or voucher tiers, changed."""
+    query = """
+        SELECT DISTINCT p.id
+        FROM promotions p
+        LEFT JOIN vouchers v ON v.promotion_id = p.id
+        LEFT JOIN voucher_tiers vt ON vt.voucher_id = v.id
+        WHERE (p.updated_at >= %s OR v.updated_at >= %s OR vt.updated_at >= %s)
     """
+    params: List[Any] = [marks["promotions"], marks["vouchers"], marks["voucher_tiers"]]
+    if restaurant_ids:
+        query += _in_clause("p.restaurant_id", restaurant_ids, params)
+    return [record["id"] for record in iter_rows(cursor, query, params)]
+
+
+def fetch_live_source_ids(cursor: MySQLCursorDict, restaurant_ids: Optional[List[str]]) -> Set[str]:
+    """Source ids of every menu item and promotion that still exists (ids only)."""
+    queries = {
+        "menu-item": """
+            SELECT mi.id
+            FROM menu_items mi
+            INNER JOIN menu_categories mc ON mc.id = mi.category_id
+            WHERE 1 = 1
+        """,
+        "promotion": "SELECT p.id FROM promotions p WHERE 1 = 1",
+    }
+    scope_columns = {"menu-item": "mc.restaurant_id", "promotion": "p.restaurant_id"}
+    live: Set[str] = set()
+    for kind, query in queries.items():
+        params: List[Any] = []
+        if restaurant_ids:
+            query += _in_clause(scope_columns[kind], restaurant_ids, params)
+        live.update(f"{kind}:{record['id']}" for record in iter_rows(cursor, query, params))
+    return live
 
-    cursor.execute(query, ids)
-    for record in cursor.fetchall():
-        tiers[record["voucher_id"]].append(
-            VoucherTierRow(
-                voucher_id=record["voucher_id"],
-                min_spend_cents=record.get("min_spend_cents"),
-                discount_percent=record.get("discount_percent"),
-                max_discount_cents=record.get("max_discount_cents"),
-                sort_order=record.get("sort_order") or 0,
-            )
-        )
-    return tiers
+
+def fetch_promotion_children(cursor: MySQLCursorDict, restaurant_ids: Optional[List[str]]) -> Dict[str, List[Any]]:
+    """``{promotion_id: [restaurant_id, vouchers, voucher tiers]}`` for every promotion.
+
+    Vouchers and tiers are deleted outright without touching their promotion, so a
+    changed count is the only trace such a deletion leaves between incremental runs.
+    """
+    query = """
+        SELECT p.id, p.restaurant_id, COUNT(DISTINCT v.id) AS vouchers, COUNT(vt.id) AS tiers
+        FROM promotions p
+        LEFT JOIN vouchers v ON v.promotion_id = p.id
+        LEFT JOIN voucher_tiers vt ON vt.voucher_id = v.id
+        WHERE 1 = 1
+    """
+    params: List[Any] = []
+    if restaurant_ids:
+        query += _in_clause("p.restaurant_id", restaurant_ids, params)
+    query += " GROUP BY p.id, p.restaurant_id"
+    return {
+        record["id"]: [record["restaurant_id"], int(record["vouchers"]), int(record["tiers"])]
+        for record in iter_rows(cursor, query, params)
+    }
+
+
+def fetch_restaurant_weights(cursor: MySQLCursorDict, restaurant_ids: Optional[List[str]]) -> Dict[str, int]:
+    """Live restaurants with their number of menu items in active categories."""
+    query = """
+        SELECT r.id, COUNT(mi.id) AS items
+        FROM restaurants r
+        LEFT JOIN menu_categories mc ON mc.restaurant_id = r.id AND mc.is_active = TRUE
+        LEFT JOIN menu_items mi ON mi.category_id = mc.id
+        WHERE r.deleted_at IS NULL
+    """
+    params: List[Any] = []
+    if restaurant_ids:
+        query += _in_clause("r.id", restaurant_ids, params)
+    query += " GROUP BY r.id"
+    return {record["id"]: int(record["items"]) for record in iter_rows(cursor, query, params)}
+
+
+def fetch_high_water_marks(cursor: MySQLCursorDict) -> Dict[str, Optional[datetime]]:
+    """Latest ``updated_at`` per table (restaurants also count soft deletes)."""
+    marks: Dict[str, Optional[datetime]] = {}
+    for table in WATERMARK_TABLES:
+        column = "GREATEST(updated_at, COALESCE(deleted_at, updated_at))" if table == "restaurants" else "updated_at"
+        cursor.execute(f"SELECT MAX({column}) AS mark FROM {table}")
+        record = cursor.fetchone()
+        marks[table] = record["mark"] if record else None
+    return marks
+
+
+def load_state(path: Path) -> Tuple[Dict[str, datetime], Dict[str, List[Any]]]:
+    """High-water marks and promotion children counts (see :func:`fetch_promotion_children`)."""
+    if not path.exists():
+        return {}, {}
+    data = json.loads(path.read_text(encoding="utf-8"))
+    marks = {table: datetime.fromisoformat(value) for table, value in data.get("marks", {}).items() if value}
+    return marks, data.get("promotion_children", {})
+
+
+def save_state(
+    path: Path, marks: Dict[str, Optional[datetime]], promotion_children: Dict[str, List[Any]]
+) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {
+        "marks": {table: mark.isoformat() if mark else None for table, mark in marks.items()},
+        "promotion_children": promotion_children,
+    }
+    path.write_text(json.dumps(data, indent=2), encoding="utf-8")
 
 
 def fmt_money_cents(cents: Optional[int]) -> Optional[str]:
@@ -360,6 +613,23 @@ def fmt_datetime(dt: Optional[datetime]) -> Optional[str]:
     return str(dt)
 
 
+def to_epoch(dt: Optional[datetime]) -> Optional[float]:
+    """Convert a DB datetime to a Unix timestamp; naive values are stored in UTC."""
+    if not isinstance(dt, datetime):
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def latest_voucher_expiry(vouchers: List[VoucherRow]) -> Optional[float]:
+    """Return when the last attached voucher expires, or None if any voucher is open ended."""
+    expiries = [to_epoch(voucher.valid_until) for voucher in vouchers]
+    if not expiries or any(expiry is None for expiry in expiries):
+        return None
+    return max(expiries)
+
+
 def format_address(address: Optional[dict]) -> str:
     if not address:
         return ""
@@ -437,7 +707,7 @@ def build_restaurant_documents(restaurants: Dict[str, RestaurantRow]) -> List[In
 def build_menu_documents(menu_items: List[MenuItemRow]) -> List[IngestDocument]:
     documents: List[IngestDocument] = []
     for item in menu_items:
-        if not item.is_available:
+        if not item.is_available or not item.category_active:
             continue
 
         price = fmt_money_cents(item.price_cents)
@@ -534,52 +804,374 @@ def build_promotion_documents(
                 "promotion_id": promo.id,
                 "restaurant_name": promo.restaurant_name,
             },
+            starts_at=to_epoch(promo.starts_at),
+            ends_at=to_epoch(promo.ends_at),
+            valid_until=latest_voucher_expiry(attached_vouchers),
         )
         documents.append(IngestDocument(text=text, metadata=metadata))
     return documents
 
 
-async def run_ingestion(args: argparse.Namespace) -> None:
-    load_env_files([Path(path) for path in args.env_file] if args.env_file else None)
-    config = get_db_config(args)
+def build_documents(
+    cursor: MySQLCursorDict,
+    restaurants: Dict[str, RestaurantRow],
+    menu_items: List[MenuItemRow],
+    promotions: List[PromotionRow],
+    vouchers_list: List[VoucherRow],
+) -> List[IngestDocument]:
+    voucher_by_promo: Dict[str, List[VoucherRow]] = defaultdict(list)
+    for voucher in vouchers_list:
+        if voucher.promotion_id:
+            voucher_by_promo[voucher.promotion_id].append(voucher)
+
+    tiers = fetch_voucher_tiers(cursor, [voucher.id for voucher in vouchers_list])
+
+    documents: List[IngestDocument] = []
+    documents.extend(build_restaurant_documents(restaurants))
+    documents.extend(build_menu_documents(menu_items))
+    documents.extend(build_promotion_documents(promotions, voucher_by_promo, tiers))
+    return documents
+
+
+def iter_restaurant_documents(
+    cursor: MySQLCursorDict, restaurant_ids: Optional[List[str]], batch_size: int
+) -> Iterator[IngestDocument]:
+    for restaurant in iter_restaurants(cursor, restaurant_ids, batch_size=batch_size):
+        yield from build_restaurant_documents({restaurant.id: restaurant})
+
+
+def iter_menu_documents(
+    cursor: MySQLCursorDict, restaurant_ids: Optional[List[str]], batch_size: int
+) -> Iterator[IngestDocument]:
+    for item in iter_menu_items(cursor, restaurant_ids, batch_size=batch_size):
+        yield from build_menu_documents([item])
+
+
+def iter_promotion_documents(
+    cursor: MySQLCursorDict, restaurant_ids: Optional[List[str]], batch_size: int
+) -> Iterator[IngestDocument]:
+    for promotion, vouchers, tiers in iter_promotion_bundles(cursor, restaurant_ids, batch_size):
+        yield from build_promotion_documents([promotion], {promotion.id: vouchers}, tiers)
+
 
-    connection = connect_database(config)
+def stream_documents(
+    pool: MySQLConnectionPool, restaurant_ids: Optional[List[str]], batch_size: int
+) -> Iterator[IngestDocument]:
+    """Yield every document of the given restaurants as the rows stream in.
+
+    Restaurants, menu items and promotions are fetched concurrently, each on its own
+    pooled connection, into a bounded queue, so memory depends on the batch size
+    rather than on the size of the database.
+    """
+    producers: List[Callable[[MySQLCursorDict], Iterator[IngestDocument]]] = [
+        lambda cursor: iter_restaurant_documents(cursor, restaurant_ids, batch_size),
+        lambda cursor: iter_menu_documents(cursor, restaurant_ids, batch_size),
+        lambda cursor: iter_promotion_documents(cursor, restaurant_ids, batch_size),
+    ]
+    queue: Queue = Queue(maxsize=DOCUMENT_QUEUE_SIZE)
+    stop = Event()
+    finished = object()
+
+    def put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=0.5)
+                return True
+            except Full:
+                continue
+        return False
+
+    def run(producer: Callable[[MySQLCursorDict], Iterator[IngestDocument]]) -> None:
+        outcome: Any = finished
+        try:
+            connection = pool.get_connection()
+            try:
+                for document in producer(connection.cursor(dictionary=True)):
+                    if not put(document):
+                        return
+            finally:
+                connection.close()
+        except Exception as exc:  # surfaced to the consumer below
+            outcome = exc
+        put(outcome)
+
+    threads = [Thread(target=run, args=(producer,), daemon=True) for producer in producers]
+    for thread in threads:
+        thread.start()
+    remaining = len(threads)
     try:
-        cursor = connection.cursor(dictionary=True)
+        while remaining:
+            try:
+                item = queue.get(timeout=0.5)
+            except Empty:
+                continue
+            if item is finished:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        stop.set()
+
+
+async def ingest(
+    documents: Iterable[IngestDocument],
+    args: argparse.Namespace,
+    full_sync: bool,
+    on_progress: Optional[Callable[[IngestStats], Awaitable[None]]] = None,
+    full_sync_scope: FullSyncScope = "restaurants",
+) -> IngestStats:
+    return await ingest_stream(
+        documents,
+        args.chunk_size,
+        args.chunk_overlap,
+        full_sync=full_sync,
+        on_progress=on_progress,
+        full_sync_scope=full_sync_scope,
+    )
 
-        restaurant_ids = args.restaurant_id or None
-        restaurants = fetch_restaurants(cursor, restaurant_ids)
-        if not restaurants:
-            print("No restaurants found that match the provided filters.")
-            return
 
-        menu_items = fetch_menu_items(cursor, restaurant_ids)
-        promotions = fetch_promotions(cursor, restaurant_ids)
+def shard_restaurants(weights: Dict[str, int], shards: int) -> List[List[str]]:
+    """Split restaurants into at most ``shards`` groups of similar total size.
+
+    Largest restaurants are placed first, each on the currently lightest shard. A
+    restaurant without menu items still counts as one document.
+    """
+    buckets: List[Tuple[int, List[str]]] = [(0, []) for _ in range(max(shards, 1))]
+    for restaurant_id, items in sorted(weights.items(), key=lambda entry: (-entry[1], entry[0])):
+        index = min(range(len(buckets)), key=lambda idx: buckets[idx][0])
+        load, members = buckets[index]
+        members.append(restaurant_id)
+        buckets[index] = (load + items + 1, members)
+    return [members for _, members in buckets if members]
+
+
+def format_stats(stats: IngestStats) -> str:
+    return (
+        f"{stats.documents} documents, {stats.ingested_chunks} chunks ingested, "
+        f"{stats.skipped_documents} unchanged, {stats.failed_chunks} failed"
+    )
 
-        vouchers_list = fetch_vouchers(cursor, restaurant_ids)
-        voucher_by_promo: Dict[str, List[VoucherRow]] = defaultdict(list)
-        for voucher in vouchers_list:
-            if voucher.promotion_id:
-                voucher_by_promo[voucher.promotion_id].append(voucher)
 
-        tiers = fetch_voucher_tiers(cursor, [voucher.id for voucher in vouchers_list])
+async def _ingest_shard(
+    label: str, restaurant_ids: List[str], config: Dict[str, Any], args: argparse.Namespace
+) -> Dict[str, Any]:
+    pool = create_pool(config, args.db_pool_size)
+    last_report = time.monotonic()
 
-        documents: List[IngestDocument] = []
-        documents.extend(build_restaurant_documents(restaurants))
-        documents.extend(build_menu_documents(menu_items))
-        documents.extend(build_promotion_documents(promotions, voucher_by_promo, tiers))
+    async def report(stats: IngestStats) -> None:
+        nonlocal last_report
+        if time.monotonic() - last_report >= SHARD_PROGRESS_INTERVAL:
+            last_report = time.monotonic()
+            print(f"[{label}] {format_stats(stats)}", flush=True)
 
-        if not documents:
-            print("No documents generated from database content.")
-            return
+    documents = stream_documents(pool, restaurant_ids, args.fetch_batch_size)
+    stats = await ingest(documents, args, full_sync=args.full_sync, on_progress=report)
+    print(f"[{label}] finished: {format_stats(stats)} in {stats.as_dict()['elapsed_seconds']}s", flush=True)
+    return stats.as_dict()
 
-        payload = IngestRequest(
-            documents=documents,
-            chunk_size=args.chunk_size,
-            chunk_overlap=args.chunk_overlap,
-        )
-        inserted = await ingest_documents(payload)
-        print(f"Ingested {inserted} chunks from {len(documents)} documents.")
+
+def run_shard(label: str, restaurant_ids: List[str], config: Dict[str, Any], args: argparse.Namespace) -> Dict[str, Any]:
+    """Process entry point: ingest one shard with its own DB pool and service clients."""
+    return asyncio.run(_ingest_shard(label, restaurant_ids, config, args))
+
+
+async def run_sharded(
+    cursor: MySQLCursorDict, restaurant_ids: Optional[List[str]], config: Dict[str, Any], args: argparse.Namespace
+) -> Optional[IngestStats]:
+    """Ingest restaurants in ``args.workers`` processes; returns the merged stats.
+
+    Shards hold disjoint restaurants, so each can run its own full sync. A full sync
+    of the whole catalog then removes restaurants that are no longer live, once every
+    shard has succeeded. Raises if any shard failed, after the others have finished.
+    """
+    weights = fetch_restaurant_weights(cursor, restaurant_ids)
+    shards = shard_restaurants(weights, args.workers)
+    if not shards:
+        return None
+    print(f"Ingesting {sum(map(len, shards))} restaurants in {len(shards)} shards.", flush=True)
+    # Created here, before the shards start, so they never race to create it.
+    await prepare_collection()
+
+    merged = IngestStats()
+    loop = asyncio.get_running_loop()
+    # Spawned rather than forked: the parent holds DB and HTTP connections.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=len(shards), mp_context=context) as executor:
+        futures = [
+            loop.run_in_executor(executor, run_shard, f"shard {idx}/{len(shards)}", members, config, args)
+            for idx, members in enumerate(shards, start=1)
+        ]
+        results = await asyncio.gather(*futures, return_exceptions=True)
+
+    failures = []
+    for idx, result in enumerate(results, start=1):
+        if isinstance(result, BaseException):
+            failures.append(f"shard {idx}: {result}")
+            continue
+        for name in STAT_COUNTERS:
+            setattr(merged, name, getattr(merged, name) + result[name])
+        for error in result["errors"]:
+            merged.record_error(error)
+    if failures:
+        raise RuntimeError(f"{len(failures)} of {len(shards)} shards failed: " + "; ".join(failures))
+    if args.full_sync and not restaurant_ids:
+        removed, removed_restaurants = await delete_restaurants_not_in(weights)
+        merged.deleted_chunks += removed
+        if removed_restaurants:
+            await bump_generations(removed_restaurants)
+    return merged
+
+
+async def run_incremental(
+    pool: MySQLConnectionPool,
+    cursor: MySQLCursorDict,
+    restaurant_ids: Optional[List[str]],
+    marks: Dict[str, datetime],
+    promotion_children: Tuple[Dict[str, List[Any]], Dict[str, List[Any]]],
+    args: argparse.Namespace,
+) -> Tuple[int, IngestStats, IngestStats, int]:
+    """Re-ingest only what changed since ``marks`` and remove vectors of deleted or unavailable rows.
+
+    A changed restaurant is rebuilt whole (its name appears in every document) with a
+    full sync of that restaurant; otherwise only changed menu items and promotions are
+    rebuilt. ``promotion_children`` holds the (previous, current) children counts:
+    promotions that vanished are removed and those whose counts changed are rebuilt.
+    Menu items deleted outright leave no trace and are only found by
+    ``--reconcile-deletes``, which compares every stored source with the database.
+    Returns (documents built, rebuild stats, update stats, chunks deleted).
+    """
+    rebuilt = fetch_restaurants(cursor, restaurant_ids, changed_since=marks["restaurants"])
+    removed_restaurants = [
+        restaurant_id
+        for restaurant_id in fetch_deleted_restaurant_ids(cursor, marks["restaurants"])
+        if not restaurant_ids or restaurant_id in restaurant_ids
+    ]
+    changed_items = [
+        item
+        for item in fetch_menu_items(cursor, restaurant_ids, marks, batch_size=args.fetch_batch_size)
+        if item.restaurant_id not in rebuilt
+    ]
+    previous_children, current_children = promotion_children
+    regrouped = {
+        promotion_id
+        for promotion_id, counts in current_children.items()
+        if promotion_id in previous_children and previous_children[promotion_id][1:] != counts[1:]
+    }
+    promotion_ids = sorted(set(fetch_changed_promotion_ids(cursor, restaurant_ids, marks)) | regrouped)
+    promotions = fetch_promotions(cursor, restaurant_ids, promotion_ids) if promotion_ids else []
+    promotions = [promo for promo in promotions if promo.restaurant_id not in rebuilt]
+    vouchers_list = fetch_vouchers(cursor, restaurant_ids, [promo.id for promo in promotions]) if promotions else []
+    update_documents = build_documents(cursor, {}, changed_items, promotions, vouchers_list)
+
+    # Unavailable items, and rows deleted outright (only restaurants are soft-deleted).
+    stale_sources: Dict[str, Optional[str]] = {
+        f"menu-item:{item.id}": item.restaurant_id
+        for item in changed_items
+        if not item.is_available or not item.category_active
+    }
+    stale_sources.update(
+        (f"promotion:{promotion_id}", owner)
+        for promotion_id, (owner, *_) in previous_children.items()
+        if promotion_id not in current_children and (not restaurant_ids or owner in restaurant_ids)
+    )
+    if args.reconcile_deletes:
+        # O(catalog): reads every live id and scrolls every stored source.
+        live_sources = fetch_live_source_ids(cursor, restaurant_ids)
+        for prefix in ("menu-item:", "promotion:"):
+            stored = await list_sources(prefix, restaurant_ids)
+            stale_sources.update(
+                (source_id, owner) for source_id, owner in stored.items() if source_id not in live_sources
+            )
+
+    deleted = await delete_sources(stale_sources, removed_restaurants)
+    if deleted:
+        await bump_generations(set(removed_restaurants) | set(stale_sources.values()))
+
+    rebuild_documents = stream_documents(pool, sorted(rebuilt), args.fetch_batch_size) if rebuilt else []
+    rebuild_stats = await ingest(rebuild_documents, args, full_sync=True)
+    update_stats = await ingest(update_documents, args, full_sync=False)
+    return rebuild_stats.documents + len(update_documents), rebuild_stats, update_stats, deleted
+
+
+async def run_ingestion(args: argparse.Namespace) -> None:
+    load_env_files([Path(path) for path in args.env_file] if args.env_file else None)
+    if args.db_pool_size < MIN_DB_POOL_SIZE:
+        raise SystemExit(f"--db-pool-size must be at least {MIN_DB_POOL_SIZE}, got {args.db_pool_size}.")
+    config = get_db_config(args)
+    state_path = Path(args.state_file) if args.state_file else None
+
+    pool = create_pool(config, args.db_pool_size)
+    connection = pool.get_connection()
+    try:
+        cursor = connection.cursor(dictionary=True)
+        restaurant_ids = args.restaurant_id or None
+        # Taken before reading so rows changed during the run are picked up next time.
+        next_marks = fetch_high_water_marks(cursor) if state_path else {}
+        children = fetch_promotion_children(cursor, restaurant_ids) if state_path else {}
+
+        marks, previous_children = load_state(state_path) if state_path else ({}, {})
+        if args.since:
+            since = datetime.fromisoformat(args.since)
+            marks = {table: since for table in WATERMARK_TABLES}
+
+        if marks:
+            marks = {table: marks.get(table, EPOCH) for table in WATERMARK_TABLES}
+            documents, rebuild_stats, update_stats, deleted = await run_incremental(
+                pool, cursor, restaurant_ids, marks, (previous_children, children), args
+            )
+            print(
+                f"Incremental sync: {documents} documents rebuilt "
+                f"({rebuild_stats.ingested_chunks + update_stats.ingested_chunks} chunks ingested, "
+                f"{rebuild_stats.skipped_documents + update_stats.skipped_documents} unchanged), "
+                f"{deleted + rebuild_stats.deleted_chunks + update_stats.deleted_chunks} stale chunks removed."
+            )
+            failed_chunks = rebuild_stats.failed_chunks + update_stats.failed_chunks
+        elif args.workers > 1:
+            sharded_stats = await run_sharded(cursor, restaurant_ids, config, args)
+            if sharded_stats is None or not sharded_stats.documents:
+                print("No documents generated from database content.")
+                return
+            summary = sharded_stats.as_dict()
+            print(
+                f"Ingested {sharded_stats.ingested_chunks} chunks from {sharded_stats.documents} documents "
+                f"({sharded_stats.skipped_documents} unchanged, {sharded_stats.deleted_chunks} stale chunks removed) "
+                f"in {summary['elapsed_seconds']}s, {summary['chunks_per_second']} chunks/s."
+            )
+            failed_chunks = sharded_stats.failed_chunks
+        else:
+            documents = stream_documents(pool, restaurant_ids, args.fetch_batch_size)
+            stats = await ingest(
+                documents,
+                args,
+                full_sync=args.full_sync,
+                full_sync_scope="restaurants" if restaurant_ids else "catalog",
+            )
+            if not stats.documents:
+                print("No documents generated from database content.")
+                return
+            print(
+                f"Ingested {stats.ingested_chunks} chunks from {stats.documents} documents "
+                f"({stats.skipped_documents} unchanged, {stats.deleted_chunks} stale chunks removed)."
+            )
+            failed_chunks = stats.failed_chunks
+
+        if failed_chunks:
+            # Failed sources keep no content hash; keeping the old marks makes the next run retry them.
+            raise SystemExit(f"{failed_chunks} chunks failed to ingest; rerun to retry them.")
+        if state_path:
+            if restaurant_ids:
+                # Keep the counts of restaurants outside this run.
+                children = {
+                    **{
+                        promotion_id: counts
+                        for promotion_id, counts in previous_children.items()
+                        if counts[0] not in restaurant_ids
+                    },
+                    **children,
+                }
+            save_state(state_path, next_marks, children)
     finally:
         connection.close()
 
@@ -605,6 +1197,47 @@ def parse_args() -> argparse.Namespace:
     )
     parser.add_argument("--chunk-size", type=int, default=400, help="Token window size for chunking.")
     parser.add_argument("--chunk-overlap", type=int, default=80, help="Token overlap between chunks.")
+    parser.add_argument(
+        "--full-sync",
+        action="store_true",
+        help="Remove vectors of sources that no longer exist in the database. Without --restaurant-id this "
+        "also removes every restaurant that was deleted or is no longer exported.",
+    )
+    parser.add_argument(
+        "--since",
+        help="Only sync rows changed at or after this ISO timestamp (DB time, UTC), plus deletions.",
+    )
+    parser.add_argument(
+        "--reconcile-deletes",
+        action="store_true",
+        help="With an incremental run, compare every stored menu item and promotion with the database to "
+        "remove rows deleted outright. Reads the whole catalog, so run it periodically (e.g. nightly).",
+    )
+    parser.add_argument(
+        "--state-file",
+        help="JSON file holding per-table updated_at high-water marks. When it exists only changes since "
+        "the last run are synced; it is rewritten after every successful run.",
+    )
+    parser.add_argument(
+        "--fetch-batch-size",
+        type=int,
+        default=DEFAULT_FETCH_BATCH_SIZE,
+        help="Rows pulled per round trip from the streaming database cursors.",
+    )
+    parser.add_argument(
+        "--db-pool-size",
+        type=int,
+        default=MIN_DB_POOL_SIZE,
+        help=f"Database connections to pool (minimum {MIN_DB_POOL_SIZE}); restaurants, menu items and promotions "
+        "are read concurrently while the run holds one more.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes for a full (non-incremental) run; restaurants are split into this many shards "
+        "balanced by menu size, each with its own database pool and embedding client.",
+    )
     return parser.parse_args()
 
 
@@ -1,20 +1,23 @@
 -- KEYS[1] = cache key
--- ARGV[1] = answer
--- ARGV[2] = sources JSON
--- ARGV[3] = ttl seconds
--- ARGV[4] = session id (optional)
--- ARGV[5] = question
+-- ARGV[1] = encoded answer payload (see app/services/codec.py)
+-- ARGV[2] = ttl seconds
+-- ARGV[3] = session id (optional)
+-- ARGV[4] = question
+-- ARGV[5] = encoded answer for the session stream
+--
+-- Values written before the encoded format used separate 'answer' and
+-- 'sources' fields; readers still accept those.
 
-redis.call('HSET', KEYS[1], 'answer', ARGV[1], 'sources', ARGV[2])
+redis.call('HSET', KEYS[1], 'v', ARGV[1])
 
-local ttl = tonumber(ARGV[3])
+local ttl = tonumber(ARGV[2])
 if ttl and ttl > 0 then
   redis.call('EXPIRE', KEYS[1], ttl)
 end
 
-if ARGV[4] and ARGV[4] ~= '' then
-  local stream_key = 'rag:session:' .. ARGV[4]
-  redis.call('XADD', stream_key, '*', 'question', ARGV[5], 'answer', ARGV[1])
+if ARGV[3] and ARGV[3] ~= '' then
+  local stream_key = 'rag:session:' .. ARGV[3]
+  redis.call('XADD', stream_key, '*', 'question', ARGV[4], 'v', ARGV[5])
   redis.call('XTRIM', stream_key, 'MAXLEN', '~', 200)
 end
 
@@ -1,19 +1,44 @@
 -- Args:
 --   KEYS[1] - pattern for keys to delete (supports glob-style, e.g., "rag:answer:*")
+--   ARGV[1] - optional SCAN cursor. When provided, only one SCAN step runs so the
+--             script never blocks Redis for long; call again with the returned
+--             cursor until it is "0".
+--   ARGV[2] - optional SCAN COUNT hint per step (default 1000).
 --
 -- Returns:
---   Number of keys deleted.
+--   Stepped mode (ARGV[1] given): { next_cursor, keys_unlinked_in_this_step }.
+--   Full mode (no ARGV): number of keys unlinked.
+--
+-- UNLINK reclaims memory in a background thread, unlike DEL.
+
+local count = tonumber(ARGV[2]) or 1000
+
+local function unlink_all(keys)
+    local removed = 0
+    -- unpack() is limited by the Lua stack, so unlink in slices.
+    for i = 1, #keys, 1000 do
+        local last = math.min(i + 999, #keys)
+        removed = removed + redis.call("UNLINK", unpack(keys, i, last))
+    end
+    return removed
+end
+
+local function step(cursor)
+    local scan_result = redis.call("SCAN", cursor, "MATCH", KEYS[1], "COUNT", count)
+    return scan_result[1], unlink_all(scan_result[2])
+end
+
+if ARGV[1] then
+    local next_cursor, removed = step(ARGV[1])
+    return { next_cursor, removed }
+end
 
 local cursor = "0"
 local deleted = 0
 repeat
-    local scan_result = redis.call("SCAN", cursor, "MATCH", KEYS[1], "COUNT", 100)
-    cursor = scan_result[1]
-    local keys = scan_result[2]
-    if #keys > 0 then
-        redis.call("DEL", unpack(keys))
-        deleted = deleted + #keys
-    end
+    local removed
+    cursor, removed = step(cursor)
+    deleted = deleted + removed
 until cursor == "0"
 
 return deleted
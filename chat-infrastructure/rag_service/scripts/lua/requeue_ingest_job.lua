@@ -0,0 +1,24 @@
+-- KEYS[1] = processing list of claimed ingest jobs
+-- KEYS[2] = ingest job queue
+-- KEYS[3] = the job's lease key
+-- KEYS[4] = the job's record
+-- ARGV[1] = job id
+-- ARGV[2] = status to record for a requeued job
+--
+-- Hands a claimed job back to the front of the queue unless its worker still
+-- holds the lease. Returns 1 if the job was requeued, 0 otherwise.
+
+if redis.call('EXISTS', KEYS[3]) == 1 then
+  return 0
+end
+
+if redis.call('LREM', KEYS[1], 1, ARGV[1]) == 1 then
+  redis.call('LPUSH', KEYS[2], ARGV[1])
+  -- An expired record stays gone; the worker that picks the job up drops it.
+  if redis.call('EXISTS', KEYS[4]) == 1 then
+    redis.call('HSET', KEYS[4], 'status', ARGV[2])
+  end
+  return 1
+end
+
+return 0
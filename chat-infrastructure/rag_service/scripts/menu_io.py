@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import gzip
+import json
+import os
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional
+
+try:  # zstd is optional; only needed for .zst files.
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+# Menu exports are either one JSON document ({"exported_at", "count", "items"}) or
+# JSONL with one item per line. Either may be compressed, picked by file suffix.
+JSONL_SUFFIXES = (".jsonl", ".ndjson")
+COMPRESSED_SUFFIXES = (".gz", ".zst")
+
+
+def _format_suffix(path: Path) -> str:
+    suffixes = path.suffixes
+    if suffixes and suffixes[-1] in COMPRESSED_SUFFIXES:
+        suffixes = suffixes[:-1]
+    return suffixes[-1] if suffixes else ""
+
+
+def is_jsonl(path: Path) -> bool:
+    return _format_suffix(path) in JSONL_SUFFIXES
+
+
+def open_text(path: Path, mode: str = "r", compression_of: Optional[Path] = None) -> IO[str]:
+    """Open ``path`` for text reading (``"r"``) or writing (``"w"``), (de)compressing ``.gz``/``.zst``.
+
+    The compression follows ``compression_of`` when given, e.g. for a temporary file.
+    """
+    suffix = (compression_of or path).suffix
+    if suffix == ".gz":
+        return gzip.open(path, f"{mode}t", encoding="utf-8")
+    if suffix == ".zst":
+        if zstandard is None:
+            raise SystemExit(f"{path} is zstd-compressed but the zstandard package is not installed.")
+        return zstandard.open(path, f"{mode}t", encoding="utf-8")
+    return path.open(mode, encoding="utf-8")
+
+
+def iter_items(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield menu items one at a time; JSONL files are never fully loaded."""
+    with open_text(path) as handle:
+        if is_jsonl(path):
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from json.load(handle).get("items", [])
+
+
+def load_items(path: Path) -> List[Dict[str, Any]]:
+    return list(iter_items(path))
+
+
+def read_exported_at(path: Path) -> Optional[str]:
+    """The ``exported_at`` of a JSON document; JSONL files carry none."""
+    if is_jsonl(path):
+        return None
+    with open_text(path) as handle:
+        return json.load(handle).get("exported_at")
+
+
+def write_items(path: Path, items: Iterable[Dict[str, Any]], exported_at: Optional[str] = None) -> int:
+    """Write ``items`` in the format ``path`` implies; returns how many were written.
+
+    JSONL is streamed item by item. A JSON document needs its count up front, so the
+    items are collected first; ``exported_at`` goes into its header. The file is
+    written beside ``path`` and moved into place at the end, so ``items`` may still be
+    streaming from ``path`` itself.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    try:
+        with open_text(tmp, "w", compression_of=path) as handle:
+            if is_jsonl(path):
+                count = write_jsonl(handle, items)
+            else:
+                data = list(items)
+                payload = {"exported_at": exported_at, "count": len(data), "items": data}
+                handle.write(json.dumps(payload, indent=2, ensure_ascii=False))
+                count = len(data)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return count
+
+
+def write_jsonl(handle: IO[str], items: Iterable[Dict[str, Any]]) -> int:
+    count = 0
+    for item in items:
+        handle.write(json.dumps(item, ensure_ascii=False) + "\n")
+        count += 1
+    return count
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from qdrant_client import QdrantClient  # noqa: E402
+
+from app.config import get_settings  # noqa: E402
+from app.services.cache import clear_cached_answers  # noqa: E402
+from app.services.embedding import embed_texts  # noqa: E402
+from app.services.vectorstore import (  # noqa: E402
+    collection_versions,
+    create_versioned_collection,
+    get_client,
+    resolve_alias,
+    switch_alias,
+)
+
+DEFAULT_SAMPLE_QUERIES = [
+    "What are your opening hours?",
+    "Do you have vegetarian dishes?",
+    "Are there any promotions right now?",
+]
+# Points whose own vector must come back among the top hits of the new collection.
+SELF_CHECK_POINTS = 20
+SELF_CHECK_TOP_K = 10
+# Duplicate vectors may outrank a point's own id, but the best score is still ~1.0.
+SELF_CHECK_MIN_SCORE = 0.999
+
+
+def point_count(client: QdrantClient, collection: str) -> int:
+    return client.count(collection_name=collection, exact=True).count
+
+
+def verify_collection(
+    client: QdrantClient,
+    collection: str,
+    baseline: Optional[str],
+    min_ratio: float,
+    sample_queries: List[str],
+) -> List[str]:
+    """Return the problems that should stop ``collection`` from going live.
+
+    Also warms the collection up: the sample queries and self-lookups run against it
+    before any customer query does.
+    """
+    problems: List[str] = []
+    count = point_count(client, collection)
+    baseline_count = point_count(client, baseline) if baseline else 0
+    print(f"{collection}: {count} points" + (f" ({baseline}: {baseline_count})" if baseline else ""))
+    if count == 0:
+        return [f"{collection} is empty"]
+    if count < baseline_count * min_ratio:
+        problems.append(f"{collection} has {count} points, below {min_ratio:.0%} of the live {baseline_count}")
+
+    if sample_queries:
+        vectors = asyncio.run(embed_texts(sample_queries))
+        for query, vector in zip(sample_queries, vectors):
+            hits = client.search(collection_name=collection, query_vector=vector, limit=5, with_payload=False)
+            if not hits:
+                problems.append(f"no results for sample query {query!r}")
+
+    points, _ = client.scroll(collection_name=collection, limit=SELF_CHECK_POINTS, with_vectors=True)
+    for point in points:
+        hits = client.search(
+            collection_name=collection, query_vector=point.vector, limit=SELF_CHECK_TOP_K, with_payload=False
+        )
+        found = any(str(hit.id) == str(point.id) for hit in hits)
+        if not found and not (hits and hits[0].score >= SELF_CHECK_MIN_SCORE):
+            problems.append(f"point {point.id} is not among its own {SELF_CHECK_TOP_K} nearest neighbours")
+    return problems
+
+
+def check_legacy(client: QdrantClient, alias: str, migrate_legacy: bool) -> bool:
+    """Whether ``alias`` is still a plain collection; refuses to go on without ``migrate_legacy``."""
+    legacy = resolve_alias(client, alias) is None and client.collection_exists(alias)
+    if legacy and not migrate_legacy:
+        raise SystemExit(
+            f"'{alias}' is a plain collection, not an alias. Re-run with --migrate-legacy to delete it "
+            "and replace it with an alias (search is unavailable for the moment in between)."
+        )
+    return legacy
+
+
+def go_live(client: QdrantClient, alias: str, collection: str, migrate_legacy: bool) -> None:
+    if check_legacy(client, alias, migrate_legacy):
+        client.delete_collection(alias)
+    switch_alias(client, alias, collection)
+    print(f"Alias '{alias}' now points at {collection}.")
+    try:
+        cleared = asyncio.run(clear_cached_answers())
+        print(f"Cleared {cleared} cached answers.")
+    except Exception as exc:  # pragma: no cover - requires a live Redis
+        print(f"Warning: could not clear cached answers: {exc}")
+
+
+def prune(client: QdrantClient, alias: str, keep: int) -> None:
+    """Drop the oldest versions beyond the newest ``keep``; the live one is always kept."""
+    live = resolve_alias(client, alias)
+    versions = [name for _, name in collection_versions(client, alias)]
+    for name in versions[: max(len(versions) - keep, 0)]:
+        if name != live:
+            client.delete_collection(name)
+            print(f"Deleted old collection {name}.")
+
+
+def cmd_status(client: QdrantClient, alias: str, args: argparse.Namespace) -> None:
+    live = resolve_alias(client, alias)
+    if live is None and client.collection_exists(alias):
+        print(f"'{alias}' is a plain collection with {point_count(client, alias)} points (not blue/green yet).")
+    for _, name in collection_versions(client, alias):
+        marker = "*" if name == live else " "
+        print(f"{marker} {name}: {point_count(client, name)} points")
+
+
+def cmd_build(client: QdrantClient, alias: str, args: argparse.Namespace) -> None:
+    if not args.no_switch:
+        check_legacy(client, alias, args.migrate_legacy)
+    live = resolve_alias(client, alias) or (alias if client.collection_exists(alias) else None)
+    vector_size = len(asyncio.run(embed_texts(["vector size probe"]))[0])
+    collection = create_versioned_collection(client, alias, vector_size)
+    print(f"Building {collection} ({vector_size} dimensions) while {live or 'nothing'} serves traffic.")
+
+    ingest_args = [arg for arg in args.ingest_args if arg != "--"]
+    command = [sys.executable, str(ROOT / "scripts" / "ingest_from_db.py"), "--workers", str(args.workers), *ingest_args]
+    result = subprocess.run(command, env={**os.environ, "QDRANT_COLLECTION": collection})
+    if result.returncode != 0:
+        if not args.keep_failed:
+            client.delete_collection(collection)
+        raise SystemExit(f"Ingest into {collection} failed with exit code {result.returncode}.")
+
+    problems = verify_collection(client, collection, live, args.min_ratio, args.sample_query or DEFAULT_SAMPLE_QUERIES)
+    if problems:
+        raise SystemExit(f"{collection} failed verification; alias left on {live}:\n- " + "\n- ".join(problems))
+    if args.no_switch:
+        print(f"{collection} verified; switch with: rebuild_collection.py switch {collection}")
+        return
+    go_live(client, alias, collection, args.migrate_legacy)
+    if args.keep:
+        prune(client, alias, args.keep)
+
+
+def cmd_switch(client: QdrantClient, alias: str, args: argparse.Namespace) -> None:
+    if not client.collection_exists(args.collection):
+        raise SystemExit(f"Collection {args.collection} does not exist.")
+    live = resolve_alias(client, alias)
+    if not args.force:
+        problems = verify_collection(client, args.collection, live, args.min_ratio, args.sample_query or [])
+        if problems:
+            raise SystemExit(f"{args.collection} failed verification:\n- " + "\n- ".join(problems))
+    go_live(client, alias, args.collection, args.migrate_legacy)
+
+
+def cmd_rollback(client: QdrantClient, alias: str, args: argparse.Namespace) -> None:
+    live = resolve_alias(client, alias)
+    if live is None:
+        raise SystemExit(f"'{alias}' is not an alias; nothing to roll back.")
+    versions = collection_versions(client, alias)
+    current = next((version for version, name in versions if name == live), None)
+    older = [name for version, name in versions if current is not None and version < current]
+    if not older:
+        raise SystemExit(f"No collection older than {live} to roll back to.")
+    go_live(client, alias, older[-1], migrate_legacy=False)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Blue/green rebuilds of the Qdrant collection behind the QDRANT_COLLECTION alias."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("status", help="List versioned collections; '*' marks the live one.")
+
+    def add_verify_options(sub: argparse.ArgumentParser) -> None:
+        sub.add_argument(
+            "--min-ratio",
+            type=float,
+            default=0.95,
+            help="Minimum point count relative to the live collection (default 0.95).",
+        )
+        sub.add_argument(
+            "--sample-query",
+            action="append",
+            default=[],
+            help="Query that must return results before switching (can be passed multiple times).",
+        )
+        sub.add_argument(
+            "--migrate-legacy",
+            action="store_true",
+            help="Replace a plain collection named like the alias (pre blue/green deployments).",
+        )
+
+    build = subparsers.add_parser("build", help="Ingest into a new collection, verify it and switch the alias.")
+    add_verify_options(build)
+    build.add_argument("--workers", type=int, default=1, help="Ingest processes (see ingest_from_db.py --workers).")
+    build.add_argument("--no-switch", action="store_true", help="Verify the new collection but leave the alias.")
+    build.add_argument("--keep-failed", action="store_true", help="Keep the new collection if ingest fails.")
+    build.add_argument(
+        "--keep",
+        type=int,
+        default=2,
+        help="Versions to keep after switching, live one included (0 keeps all).",
+    )
+    build.add_argument(
+        "ingest_args",
+        nargs=argparse.REMAINDER,
+        help="Extra ingest_from_db.py arguments, after '--' (e.g. -- --env-file ../.env).",
+    )
+
+    switch = subparsers.add_parser("switch", help="Verify an existing collection and point the alias at it.")
+    switch.add_argument("collection", help="Collection to make live.")
+    switch.add_argument("--force", action="store_true", help="Skip verification.")
+    add_verify_options(switch)
+
+    subparsers.add_parser("rollback", help="Point the alias back at the previous version.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    alias = get_settings().qdrant_collection
+    commands = {"status": cmd_status, "build": cmd_build, "switch": cmd_switch, "rollback": cmd_rollback}
+    commands[args.command](get_client(), alias, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import redis
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.config import get_settings  # noqa: E402
+from app.services.canonicalize import canonicalize_query  # noqa: E402
+
+
+def legacy_key(question: str) -> str:
+    """Cache key normalisation used before the canonicalizer."""
+    return question.strip().lower()
+
+
+def load_questions(client: redis.Redis, pattern: str, page_size: int) -> Tuple[List[Tuple[int, str]], int]:
+    """Read every (timestamp_ms, question) from the session streams, oldest first."""
+    entries: List[Tuple[int, str]] = []
+    streams = 0
+    for stream_key in client.scan_iter(match=pattern, count=1000, _type="stream"):
+        streams += 1
+        start = "-"
+        while True:
+            page = client.xrange(stream_key, min=start, max="+", count=page_size)
+            for entry_id, fields in page:
+                question = fields.get(b"question")
+                if question:
+                    entries.append((int(entry_id.split(b"-", 1)[0]), question.decode("utf-8")))
+            if len(page) < page_size:
+                break
+            start = b"(" + page[-1][0]
+    entries.sort(key=lambda entry: entry[0])
+    return entries, streams
+
+
+def simulate(entries: List[Tuple[int, str]], keyer: Callable[[str], str], ttl_seconds: int) -> Dict[str, float]:
+    """Replay questions through a TTL cache keyed by ``keyer`` and count hits."""
+    expires: Dict[str, int] = {}
+    hits = 0
+    ttl_ms = ttl_seconds * 1000
+    for timestamp, question in entries:
+        key = keyer(question)
+        expiry = expires.get(key)
+        if expiry is not None and (ttl_ms <= 0 or timestamp < expiry):
+            hits += 1
+            continue
+        expires[key] = timestamp + ttl_ms
+    total = len(entries)
+    return {
+        "requests": total,
+        "distinct_keys": len(expires),
+        "hits": hits,
+        "hit_rate": hits / total if total else 0.0,
+    }
+
+
+def merged_examples(entries: List[Tuple[int, str]], limit: int) -> List[Dict[str, object]]:
+    """Canonical keys that absorbed the most distinct legacy keys."""
+    variants: Dict[str, Counter] = defaultdict(Counter)
+    for _, question in entries:
+        variants[canonicalize_query(question)][legacy_key(question)] += 1
+    ranked = sorted(variants.items(), key=lambda item: len(item[1]), reverse=True)
+    return [
+        {"canonical": canonical, "variants": [text for text, _ in counter.most_common(5)], "variant_count": len(counter)}
+        for canonical, counter in ranked[:limit]
+        if len(counter) > 1
+    ]
+
+
+def parse_args() -> argparse.Namespace:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(
+        description="Replay rag:session:* streams and compare answer-cache hit rates before/after canonicalization."
+    )
+    parser.add_argument("--redis-url", default=settings.redis_url)
+    parser.add_argument("--pattern", default="rag:session:*", help="Stream key pattern to replay.")
+    parser.add_argument(
+        "--ttl",
+        type=int,
+        default=settings.cache_ttl_seconds,
+        help="Simulated cache TTL in seconds (0 = never expire). Defaults to CACHE_TTL_SECONDS.",
+    )
+    parser.add_argument("--page-size", type=int, default=1000, help="XRANGE page size.")
+    parser.add_argument("--examples", type=int, default=10, help="Number of merged-key examples to show.")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    # Stream entries carry binary encoded answers, so responses are decoded per field.
+    client = redis.Redis.from_url(args.redis_url, decode_responses=False)
+    entries, streams = load_questions(client, args.pattern, args.page_size)
+    if not entries:
+        raise SystemExit(f"No questions found in streams matching '{args.pattern}'.")
+
+    report = {
+        "streams": streams,
+        "ttl_seconds": args.ttl,
+        "before": simulate(entries, legacy_key, args.ttl),
+        "after": simulate(entries, canonicalize_query, args.ttl),
+        "merged_examples": merged_examples(entries, args.examples),
+    }
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+
+    before, after = report["before"], report["after"]
+    print(f"Replayed {before['requests']} questions from {streams} session streams (ttl={args.ttl}s).")
+    print(f"Before: {before['distinct_keys']} keys, {before['hits']} hits, hit rate {before['hit_rate']:.2%}")
+    print(f"After:  {after['distinct_keys']} keys, {after['hits']} hits, hit rate {after['hit_rate']:.2%}")
+    print(f"Saved LLM calls: {after['hits'] - before['hits']}")
+    for example in report["merged_examples"]:
+        print(f"  {example['canonical']!r} <- {example['variant_count']} variants, e.g. {example['variants']}")
+
+
+if __name__ == "__main__":
+    main()
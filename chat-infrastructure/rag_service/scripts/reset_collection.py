@@ -4,6 +4,8 @@ Reset Qdrant Collection
 -----------------------
 Deletes and recreates the Qdrant collection to remove all old duplicate documents.
 Use this after fixing the vector store upsert logic to clean up existing duplicates.
+Search is down until the next sync; for a rebuild without downtime use
+scripts/rebuild_collection.py instead.
 
 Usage:
     python scripts/reset_collection.py
@@ -16,6 +18,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app.config import get_settings
+from app.services.vectorstore import resolve_alias
 from qdrant_client import QdrantClient
 
 
@@ -24,7 +27,8 @@ def reset_collection():
     settings = get_settings()
     client = QdrantClient(host=settings.qdrant_host, port=settings.qdrant_port)
 
-    collection_name = settings.qdrant_collection
+    # QDRANT_COLLECTION is normally an alias; reset the collection behind it.
+    collection_name = resolve_alias(client, settings.qdrant_collection) or settings.qdrant_collection
 
     print(f"Connecting to Qdrant at {settings.qdrant_host}:{settings.qdrant_port}")
     print(f"Target collection: {collection_name}")
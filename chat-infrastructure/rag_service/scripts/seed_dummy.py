@@ -41,8 +41,11 @@ def build_ingest_payload(rows: List[Dict[str, Any]], chunk_size: int, chunk_over
 async def run(path: Path, chunk_size: int, chunk_overlap: int) -> None:
     rows = load_dataset(path)
     payload = build_ingest_payload(rows, chunk_size, chunk_overlap)
-    inserted = await ingest_documents(payload)
-    print(f"Ingested {inserted} chunks from {len(payload.documents)} documents.")
+    stats = await ingest_documents(payload)
+    print(
+        f"Ingested {stats.ingested_chunks} chunks from {len(payload.documents)} documents "
+        f"({stats.skipped_documents} unchanged, {stats.deleted_chunks} stale chunks removed)."
+    )
 
 
 def main() -> None:
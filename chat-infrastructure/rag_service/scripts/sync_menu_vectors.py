@@ -1,20 +1,29 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
+import hashlib
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
 
+import httpx
 import numpy as np
 import redis
-import requests
 from qdrant_client import QdrantClient, models
 from sentence_transformers import SentenceTransformer
 
+from menu_io import iter_items
+from vector_artifact import DTYPES, write_artifact
 
-def load_items(path: Path) -> List[Dict[str, Any]]:
-    raw = json.loads(path.read_text(encoding="utf-8"))
-    return raw.get("items", [])
+T = TypeVar("T")
+
+# Items read, encoded and written to every target per pass, so memory stays bounded
+# however large the catalog is.
+WINDOW_SIZE = 4096
 
 
 def canonical_text(item: Dict[str, Any]) -> str:
@@ -40,33 +49,149 @@ def canonical_text(item: Dict[str, Any]) -> str:
     return " ".join(pieces)
 
 
-def encode_with_service(endpoint: str, api_key: Optional[str], items: List[Dict[str, Any]], batch_size: int) -> List[Dict[str, Any]]:
-    payloads: List[Dict[str, Any]] = []
-    texts = [canonical_text(item) for item in items]
+def text_key(text: str) -> str:
+    """Checkpoint key of an encoded text; an item whose text changed is encoded again."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class Checkpoint:
+    """Vectors encoded by earlier runs, keyed by :func:`text_key` and appended as JSONL.
+
+    Only the byte offset of each record is kept in memory; vectors are read back
+    when an item needs them. Unreadable lines are skipped. A torn last line from a
+    killed run is cut off, so records appended by this run start on a line of their own.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.offsets: Dict[str, int] = {}
+        if path.exists():
+            complete = 0
+            with path.open("rb") as handle:
+                for line in handle:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        self.offsets[json.loads(line)["text_key"]] = complete
+                    except (ValueError, KeyError, TypeError):
+                        pass
+                    complete += len(line)
+            if complete < path.stat().st_size:
+                with path.open("r+b") as handle:
+                    handle.truncate(complete)
+        self._handle = path.open("a+b")
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.offsets
+
+    def get(self, key: str) -> List[float]:
+        self._handle.seek(self.offsets[key])
+        return json.loads(self._handle.readline())["vector"]
+
+    def add(self, records: Sequence[Tuple[str, List[float]]]) -> None:
+        self._handle.seek(0, os.SEEK_END)
+        for key, vector in records:
+            self.offsets[key] = self._handle.tell()
+            self._handle.write((json.dumps({"text_key": key, "vector": vector}) + "\n").encode("utf-8"))
+        self._handle.flush()
+
+    def close(self) -> None:
+        self._handle.close()
+
+
+async def _post_batch(
+    client: httpx.AsyncClient,
+    endpoint: str,
+    texts: Sequence[str],
+    retries: int,
+    backoff: float,
+) -> List[List[float]]:
+    attempt = 0
+    while True:
+        try:
+            response = await client.post(endpoint, json={"texts": list(texts)})
+            response.raise_for_status()
+            embeddings = response.json().get("embeddings", [])
+            if len(embeddings) != len(texts):
+                raise RuntimeError("Embedding service returned mismatched vector count")
+            return embeddings
+        except (httpx.HTTPError, RuntimeError) as exc:
+            status = exc.response.status_code if isinstance(exc, httpx.HTTPStatusError) else None
+            if (status is not None and status < 500 and status != 429) or attempt >= retries:
+                raise
+            delay = backoff * 2**attempt
+            attempt += 1
+            print(f"Embedding batch failed ({exc}); retrying in {delay:.1f}s.")
+            await asyncio.sleep(delay)
 
-    for start in range(0, len(texts), batch_size):
-        chunk = texts[start : start + batch_size]
-        response = requests.post(
-            endpoint,
-            headers={
-                "Content-Type": "application/json",
-                **({"x-rag-admin-key": api_key} if api_key else {}),
-            },
-            json={"texts": chunk},
-            timeout=60,
-        )
-        response.raise_for_status()
-        data = response.json()
-        embeddings = data.get("embeddings", [])
-        if len(embeddings) != len(chunk):
-            raise RuntimeError("Embedding service returned mismatched vector count")
-        for item, vector in zip(items[start : start + batch_size], embeddings):
-            payloads.append({"item": item, "vector": np.array(vector, dtype=np.float32)})
-    return payloads
+
+async def _encode_with_service(
+    endpoint: str,
+    api_key: Optional[str],
+    items: List[Dict[str, Any]],
+    batch_size: int,
+    concurrency: int,
+    retries: int,
+    backoff: float,
+    checkpoint: Optional[Checkpoint],
+) -> Dict[str, List[float]]:
+    texts = {text_key(text): text for text in map(canonical_text, items)}
+    vectors = {key: checkpoint.get(key) for key in texts if checkpoint and key in checkpoint}
+    pending = [(key, text) for key, text in texts.items() if key not in vectors]
+
+    batches = [pending[start : start + batch_size] for start in range(0, len(pending), batch_size)]
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    headers = {"Content-Type": "application/json", **({"x-rag-admin-key": api_key} if api_key else {})}
+    limits = httpx.Limits(max_connections=max(concurrency, 1), max_keepalive_connections=max(concurrency, 1))
+    async with httpx.AsyncClient(headers=headers, limits=limits, timeout=60) as client:
+
+        async def encode(batch: List[Tuple[str, str]]) -> None:
+            async with semaphore:
+                embeddings = await _post_batch(client, endpoint, [text for _, text in batch], retries, backoff)
+            records = [(key, vector) for (key, _), vector in zip(batch, embeddings)]
+            vectors.update(records)
+            if checkpoint:
+                checkpoint.add(records)
+
+        tasks = [asyncio.ensure_future(encode(batch)) for batch in batches]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+    return vectors
+
+
+def encode_with_service(
+    endpoint: str,
+    api_key: Optional[str],
+    items: List[Dict[str, Any]],
+    batch_size: int,
+    concurrency: int = 4,
+    retries: int = 3,
+    backoff: float = 1.0,
+    checkpoint: Optional[Checkpoint] = None,
+) -> List[Dict[str, Any]]:
+    """Encode items through the embedding endpoint with ``concurrency`` batches in flight.
+
+    Failed batches are retried with exponential backoff. With ``checkpoint``, every
+    encoded vector is appended to it and texts already in it are not sent again.
+    """
+    vectors = asyncio.run(
+        _encode_with_service(endpoint, api_key, items, batch_size, concurrency, retries, backoff, checkpoint)
+    )
+    return [
+        {"item": item, "vector": np.array(vectors[text_key(canonical_text(item))], dtype=np.float32)}
+        for item in items
+    ]
 
 
-def encode_with_model(model_name: str, items: List[Dict[str, Any]], batch_size: int) -> List[Dict[str, Any]]:
-    model = SentenceTransformer(model_name)
+def encode_with_model(model: SentenceTransformer, items: List[Dict[str, Any]], batch_size: int) -> List[Dict[str, Any]]:
     texts = [canonical_text(item) for item in items]
     vectors = model.encode(texts, batch_size=batch_size, normalize_embeddings=True)
     payloads = []
@@ -75,128 +200,349 @@ def encode_with_model(model_name: str, items: List[Dict[str, Any]], batch_size:
     return payloads
 
 
-def write_json(payloads: List[Dict[str, Any]], path: Path) -> None:
-    data = []
-    for entry in payloads:
-        data.append(
-            {
+class JsonSink:
+    """Streams ``--json-output`` entries to a temporary file that replaces ``path`` once complete."""
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._tmp = path.with_name(f".{path.name}.tmp")
+        self._handle = self._tmp.open("w", encoding="utf-8")
+        self._handle.write('{"items": [')
+        self._count = 0
+
+    def write(self, payloads: List[Dict[str, Any]]) -> None:
+        for entry in payloads:
+            data = {
                 "menu_item_id": entry["item"]["menu_item_id"],
-                "vector": entry["vector"].tolist(),
+                "vector": np.asarray(entry["vector"]).tolist(),
                 "metadata": entry["item"],
             }
-        )
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps({"items": data}, indent=2, ensure_ascii=False), encoding="utf-8")
-    print(f"Wrote embeddings to {path}")
+            self._handle.write(("," if self._count else "") + "\n  " + json.dumps(data, ensure_ascii=False))
+            self._count += 1
 
+    def finish(self) -> None:
+        self._handle.write("\n]}\n")
+        self._handle.close()
+        os.replace(self._tmp, self.path)
+        print(f"Wrote embeddings to {self.path}")
 
-def sync_qdrant(
-    payloads: List[Dict[str, Any]],
-    host: str,
-    port: int,
-    api_key: Optional[str],
-    collection: str,
-    recreate: bool,
-) -> None:
-    client = QdrantClient(host=host, port=port, api_key=api_key)
-    vector_size = len(payloads[0]["vector"])
-    if recreate:
-        client.recreate_collection(
-            collection_name=collection,
-            vectors_config=models.VectorParams(size=vector_size, distance=models.Distance.COSINE),
-        )
-    else:
-        if not client.collection_exists(collection):
+
+class ArtifactSink:
+    """Collects vectors for ``--vector-output``; the artifact matrix is written in one piece at the end."""
+
+    def __init__(self, path: Path, dtype: str) -> None:
+        self.path = path
+        self.dtype = dtype
+        self.ids: List[Any] = []
+        self.blocks: List[np.ndarray] = []
+        self.metadata: List[Dict[str, Any]] = []
+
+    def write(self, payloads: List[Dict[str, Any]]) -> None:
+        self.ids.extend(entry["item"]["menu_item_id"] for entry in payloads)
+        self.blocks.append(np.stack([np.asarray(entry["vector"], dtype=self.dtype) for entry in payloads]))
+        self.metadata.extend(entry["item"] for entry in payloads)
+
+    def finish(self) -> None:
+        write_artifact(self.path, self.ids, np.concatenate(self.blocks), self.metadata, dtype=self.dtype)
+        print(f"Wrote {len(self.ids)} vectors to {self.path} ({self.dtype}).")
+
+
+def vector_hash(entry: Dict[str, Any]) -> str:
+    """Fingerprint of a synced point: its float32 vector plus its metadata."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.asarray(entry["vector"], dtype=np.float32).tobytes())
+    digest.update(json.dumps(entry["item"], sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def run_batches(entries: Sequence[T], batch_size: int, parallel: int, send: Callable[[Sequence[T]], None]) -> None:
+    """Call ``send`` on consecutive batches of ``entries``, ``parallel`` batches at a time."""
+    batches = [entries[start : start + batch_size] for start in range(0, len(entries), max(batch_size, 1))]
+    with ThreadPoolExecutor(max_workers=max(parallel, 1)) as executor:
+        for _ in executor.map(send, batches):
+            pass
+
+
+class QdrantSink:
+    """Upserts changed items in parallel batches and, at the end, deletes points of items never written.
+
+    Unchanged items are detected through the ``vector_hash`` stored in each payload.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        api_key: Optional[str],
+        collection: str,
+        recreate: bool,
+        batch_size: int = 256,
+        parallel: int = 4,
+        delete_missing: bool = True,
+    ) -> None:
+        self.client = QdrantClient(host=host, port=port, api_key=api_key)
+        self.collection = collection
+        self.recreate = recreate
+        self.batch_size = batch_size
+        self.parallel = parallel
+        self.delete_missing = delete_missing
+        # ``(point id, fingerprint)`` of stored points not seen in the input yet, keyed by
+        # the id as a string; ``None`` until the first write.
+        self.unseen: Optional[Dict[str, Tuple[Any, Optional[str]]]] = None
+        self.written = 0
+        self.unchanged = 0
+
+    def _prepare(self, vector_size: int) -> Dict[str, Tuple[Any, Optional[str]]]:
+        client, collection = self.client, self.collection
+        if self.recreate or not client.collection_exists(collection):
             client.recreate_collection(
                 collection_name=collection,
                 vectors_config=models.VectorParams(size=vector_size, distance=models.Distance.COSINE),
             )
+        stored: Dict[str, Tuple[Any, Optional[str]]] = {}
+        offset = None
+        while True:
+            points, offset = client.scroll(
+                collection_name=collection,
+                limit=1000,
+                offset=offset,
+                with_payload=["vector_hash"],
+                with_vectors=False,
+            )
+            for point in points:
+                stored[str(point.id)] = (point.id, (point.payload or {}).get("vector_hash"))
+            if offset is None:
+                return stored
+
+    def write(self, payloads: List[Dict[str, Any]]) -> None:
+        if self.unseen is None:
+            self.unseen = self._prepare(len(payloads[0]["vector"]))
+        changed = []
+        for entry in payloads:
+            fingerprint = vector_hash(entry)
+            _, stored_fingerprint = self.unseen.pop(str(entry["item"]["menu_item_id"]), (None, None))
+            if stored_fingerprint != fingerprint:
+                changed.append((entry, fingerprint))
+
+        def upsert(batch: Sequence[Any]) -> None:
+            self.client.upsert(
+                collection_name=self.collection,
+                points=[
+                    models.PointStruct(
+                        id=entry["item"]["menu_item_id"],
+                        vector=np.asarray(entry["vector"], dtype=np.float32).tolist(),
+                        payload={**entry["item"], "vector_hash": fingerprint},
+                    )
+                    for entry, fingerprint in batch
+                ],
+                wait=True,
+            )
+
+        run_batches(changed, self.batch_size, self.parallel, upsert)
+        self.written += len(changed)
+        self.unchanged += len(payloads) - len(changed)
+
+    def finish(self) -> None:
+        stale = [point_id for point_id, _ in (self.unseen or {}).values()] if self.delete_missing else []
+
+        def delete(batch: Sequence[Any]) -> None:
+            self.client.delete(
+                collection_name=self.collection, points_selector=models.PointIdsList(points=list(batch)), wait=True
+            )
 
-    points = [
-        models.PointStruct(
-            id=item["item"]["menu_item_id"],
-            vector=item["vector"].tolist(),
-            payload=item["item"],
+        run_batches(stale, self.batch_size, self.parallel, delete)
+        print(
+            f"Qdrant collection '{self.collection}': {self.written} upserted, "
+            f"{self.unchanged} unchanged, {len(stale)} deleted."
         )
-        for item in payloads
-    ]
-    client.upsert(collection_name=collection, points=points)
-    print(f"Upserted {len(points)} vectors into Qdrant collection '{collection}'.")
-
-
-def sync_redis(
-    payloads: List[Dict[str, Any]],
-    host: str,
-    port: int,
-    password: Optional[str],
-    prefix: str,
-    index_name: str,
-    recreate: bool,
-) -> None:
-    from redis.commands.search.field import TagField, VectorField, TextField
-    from redis.commands.search.indexDefinition import IndexDefinition, IndexType
-    from redis.commands.search import Search
-
-    r = redis.Redis(host=host, port=port, password=password, decode_responses=False)
-    dim = len(payloads[0]["vector"])
-    if recreate:
+
+
+def _redis_index_schema(dim: int, algorithm: str, hnsw: Dict[str, int]) -> tuple:
+    from redis.commands.search.field import TagField, TextField, VectorField
+
+    attributes: Dict[str, Any] = {"TYPE": "FLOAT32", "DIM": dim, "DISTANCE_METRIC": "COSINE"}
+    if algorithm == "HNSW":
+        attributes.update({key: value for key, value in hnsw.items() if value})
+    return (
+        TextField("name"),
+        TagField("category"),
+        TagField("dietary_tags"),
+        TagField("allergens"),
+        VectorField("embedding", algorithm, attributes),
+    )
+
+
+class RedisSink:
+    """Writes changed item hashes in parallel pipelines and, at the end, unlinks hashes of items never written.
+
+    ``algorithm`` and ``hnsw`` (M, EF_CONSTRUCTION, EF_RUNTIME) only apply when the
+    index is created; pass ``recreate`` to change an existing index.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        password: Optional[str],
+        prefix: str,
+        index_name: str,
+        recreate: bool,
+        batch_size: int = 256,
+        parallel: int = 4,
+        delete_missing: bool = True,
+        algorithm: str = "FLAT",
+        hnsw: Optional[Dict[str, int]] = None,
+    ) -> None:
+        self.r = redis.Redis(
+            host=host, port=port, password=password, decode_responses=False, max_connections=parallel + 1
+        )
+        self.prefix = prefix
+        self.index_name = index_name
+        self.recreate = recreate
+        self.batch_size = batch_size
+        self.parallel = parallel
+        self.delete_missing = delete_missing
+        self.algorithm = algorithm
+        self.hnsw = hnsw or {}
+        self.enabled = True
+        # Fingerprints of stored hashes not seen in the input yet; ``None`` until the first write.
+        self.unseen: Optional[Dict[bytes, Optional[bytes]]] = None
+        self.written = 0
+        self.unchanged = 0
+
+    def _unsupported(self) -> None:
+        print("Redis instance does not support RediSearch/Vector commands. Skipping Redis sync.")
+        self.enabled = False
+
+    def _prepare(self, dim: int) -> Dict[bytes, Optional[bytes]]:
+        from redis.commands.search.indexDefinition import IndexDefinition, IndexType
+
+        r, prefix, index_name = self.r, self.prefix, self.index_name
+        stored: Dict[bytes, Optional[bytes]] = {}
+        if self.recreate:
+            try:
+                r.ft(index_name).dropindex(delete_documents=True)
+            except redis.exceptions.ResponseError as err:
+                message = str(err).lower()
+                if "unknown command" in message:
+                    self._unsupported()
+                    return stored
+                if "unknown index" not in message:
+                    raise
+            except Exception:
+                pass
+
         try:
-            r.ft(index_name).dropindex(delete_documents=True)
+            r.ft(index_name).info()
         except redis.exceptions.ResponseError as err:
-            message = str(err).lower()
-            if "unknown command" in message:
-                print("Redis instance does not support RediSearch/Vector commands. Skipping Redis sync.")
-                return
-            if "unknown index" not in message:
-                raise
-        except Exception:
-            pass
+            if "unknown command" in str(err):
+                self._unsupported()
+                return stored
+            r.ft(index_name).create_index(
+                _redis_index_schema(dim, self.algorithm, self.hnsw),
+                definition=IndexDefinition(prefix=[prefix], index_type=IndexType.HASH),
+            )
 
-    try:
-        r.ft(index_name).info()
-    except redis.exceptions.ResponseError as err:
-        if "unknown command" in str(err):
-            print("Redis instance does not support RediSearch/Vector commands. Skipping Redis sync.")
+        # Only hashes carrying an embedding count as ours; other keys under the prefix are left alone.
+        keys = list(r.scan_iter(match=f"{prefix}*", count=1000, _type="hash"))
+        for start in range(0, len(keys), 1000):
+            pipe = r.pipeline(transaction=False)
+            for key in keys[start : start + 1000]:
+                pipe.hget(key, "vector_hash")
+                pipe.hexists(key, "embedding")
+            replies = pipe.execute()
+            for key, fingerprint, has_embedding in zip(keys[start : start + 1000], replies[::2], replies[1::2]):
+                if has_embedding:
+                    stored[key] = fingerprint
+        return stored
+
+    def write(self, payloads: List[Dict[str, Any]]) -> None:
+        if self.unseen is None:
+            self.unseen = self._prepare(len(payloads[0]["vector"]))
+        if not self.enabled:
             return
-        schema = (
-            TextField("name"),
-            TagField("category"),
-            TagField("dietary_tags"),
-            TagField("allergens"),
-            VectorField("embedding", "FLAT", {"TYPE": "FLOAT32", "DIM": dim, "DISTANCE_METRIC": "COSINE"}),
-        )
-        r.ft(index_name).create_index(
-            schema,
-            definition=IndexDefinition(prefix=[prefix], index_type=IndexType.HASH),
-        )
+        changed = []
+        for entry in payloads:
+            key = f"{self.prefix}{entry['item']['menu_item_id']}".encode("utf-8")
+            fingerprint = vector_hash(entry)
+            if self.unseen.pop(key, None) != fingerprint.encode("ascii"):
+                changed.append((key, entry, fingerprint))
+
+        def write(batch: Sequence[Any]) -> None:
+            pipe = self.r.pipeline(transaction=False)
+            for key, entry, fingerprint in batch:
+                item = entry["item"]
+                pipe.hset(
+                    key,
+                    mapping={
+                        "name": item["name"],
+                        "category": item.get("category_name", ""),
+                        "dietary_tags": ",".join(item.get("dietary_tags") or []),
+                        "allergens": ",".join(item.get("allergens") or []),
+                        "embedding": np.asarray(entry["vector"], dtype=np.float32).tobytes(),
+                        "vector_hash": fingerprint,
+                    },
+                )
+            pipe.execute()
+
+        run_batches(changed, self.batch_size, self.parallel, write)
+        self.written += len(changed)
+        self.unchanged += len(payloads) - len(changed)
+
+    def finish(self) -> None:
+        if not self.enabled:
+            return
+        stale = sorted(self.unseen or {}) if self.delete_missing else []
+
+        def unlink(batch: Sequence[bytes]) -> None:
+            self.r.unlink(*batch)
 
-    pipe = r.pipeline(transaction=False)
-    for entry in payloads:
-        item = entry["item"]
-        key = f"{prefix}{item['menu_item_id']}"
-        vector = np.array(entry["vector"], dtype=np.float32).tobytes()
-        pipe.hset(
-            key,
-            mapping={
-                "name": item["name"],
-                "category": item.get("category_name", ""),
-                "dietary_tags": ",".join(item.get("dietary_tags") or []),
-                "allergens": ",".join(item.get("allergens") or []),
-                "embedding": vector,
-            },
+        run_batches(stale, self.batch_size, self.parallel, unlink)
+        print(
+            f"Redis prefix '{self.prefix}': {self.written} written, "
+            f"{self.unchanged} unchanged, {len(stale)} deleted."
         )
-    pipe.execute()
-    print(f"Synced {len(payloads)} vectors to Redis prefix '{prefix}'.")
+
+
+def iter_windows(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    iterator = iter(items)
+    while window := list(islice(iterator, size)):
+        yield window
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Encode menu items with a fine-tuned model and sync to vector stores.")
-    parser.add_argument("--input", required=True, help="Path to menu_items_enriched.json")
+    parser.add_argument("--input", required=True, help="Path to menu_items_enriched.json or .jsonl[.gz|.zst]")
     parser.add_argument("--model-path", help="Directory or HF model name for sentence transformer")
     parser.add_argument("--embed-endpoint", help="HTTP endpoint for embedding service (e.g. http://localhost:8081/rag/embed)")
     parser.add_argument("--embed-key", help="Optional admin key/header for embedding service")
     parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument(
+        "--embed-concurrency", type=int, default=4, help="Embedding requests in flight (with --embed-endpoint)."
+    )
+    parser.add_argument("--embed-retries", type=int, default=3, help="Retries per failed embedding batch.")
+    parser.add_argument(
+        "--embed-backoff", type=float, default=1.0, help="Initial retry delay in seconds; doubles on every retry."
+    )
+    parser.add_argument(
+        "--checkpoint",
+        help="JSONL file of encoded vectors (with --embed-endpoint). An interrupted run resumes from it; "
+        "it is removed once every target is synced.",
+    )
     parser.add_argument("--json-output", help="Optional path to dump embeddings JSON")
+    parser.add_argument(
+        "--vector-output",
+        help="Optional .npy artifact path: a memory-mappable vector matrix, a .meta.json id sidecar and item metadata.",
+    )
+    parser.add_argument("--vector-dtype", choices=DTYPES, default="float32", help="Element type of --vector-output.")
+    parser.add_argument("--sync-batch-size", type=int, default=256, help="Items per Qdrant upsert / Redis pipeline.")
+    parser.add_argument("--sync-parallel", type=int, default=4, help="Batches written concurrently per target.")
+    parser.add_argument(
+        "--keep-missing",
+        action="store_true",
+        help="Do not delete vectors of items absent from --input (use when syncing a partial catalog).",
+    )
 
     # Qdrant
     parser.add_argument("--qdrant-host")
@@ -212,49 +558,111 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--redis-prefix", default="menu:")
     parser.add_argument("--redis-index", default="idx:menu-similarity")
     parser.add_argument("--redis-recreate", action="store_true")
+    parser.add_argument(
+        "--redis-index-algorithm",
+        choices=["FLAT", "HNSW"],
+        default="FLAT",
+        help="Vector index type, applied when the index is created (add --redis-recreate to switch).",
+    )
+    parser.add_argument("--redis-hnsw-m", type=int, default=16, help="HNSW M: edges per node.")
+    parser.add_argument("--redis-hnsw-ef-construction", type=int, default=200, help="HNSW EF_CONSTRUCTION.")
+    parser.add_argument("--redis-hnsw-ef-runtime", type=int, default=10, help="HNSW EF_RUNTIME for KNN queries.")
 
     return parser.parse_args()
 
 
 def main() -> None:
     args = parse_args()
-    items = load_items(Path(args.input))
-    if not items:
+    items = iter_items(Path(args.input))
+    first = next(items, None)
+    if first is None:
         raise SystemExit("No items in input.")
 
+    checkpoint = Checkpoint(Path(args.checkpoint)) if args.embed_endpoint and args.checkpoint else None
     if args.embed_endpoint:
-        payloads = encode_with_service(args.embed_endpoint, args.embed_key, items, args.batch_size)
+        if checkpoint is not None and len(checkpoint):
+            print(f"Resuming: {len(checkpoint)} texts already encoded in {checkpoint.path}.")
+
+        def encode(window: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            return encode_with_service(
+                args.embed_endpoint,
+                args.embed_key,
+                window,
+                args.batch_size,
+                concurrency=args.embed_concurrency,
+                retries=args.embed_retries,
+                backoff=args.embed_backoff,
+                checkpoint=checkpoint,
+            )
+
     elif args.model_path:
-        payloads = encode_with_model(args.model_path, items, args.batch_size)
+        model = SentenceTransformer(args.model_path)
+
+        def encode(window: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            return encode_with_model(model, window, args.batch_size)
+
     else:
         raise SystemExit("Either --embed-endpoint or --model-path must be provided.")
 
+    sinks: List[Any] = []
     if args.json_output:
-        write_json(payloads, Path(args.json_output))
-
+        sinks.append(JsonSink(Path(args.json_output)))
+    if args.vector_output:
+        sinks.append(ArtifactSink(Path(args.vector_output), args.vector_dtype))
     if args.qdrant_host:
-        sync_qdrant(
-            payloads,
-            host=args.qdrant_host,
-            port=args.qdrant_port,
-            api_key=args.qdrant_api_key,
-            collection=args.qdrant_collection,
-            recreate=args.qdrant_recreate,
+        sinks.append(
+            QdrantSink(
+                host=args.qdrant_host,
+                port=args.qdrant_port,
+                api_key=args.qdrant_api_key,
+                collection=args.qdrant_collection,
+                recreate=args.qdrant_recreate,
+                batch_size=args.sync_batch_size,
+                parallel=args.sync_parallel,
+                delete_missing=not args.keep_missing,
+            )
         )
-
     if args.redis_host:
-        sync_redis(
-            payloads,
-            host=args.redis_host,
-            port=args.redis_port,
-            password=args.redis_password,
-            prefix=args.redis_prefix,
-            index_name=args.redis_index,
-            recreate=args.redis_recreate,
+        sinks.append(
+            RedisSink(
+                host=args.redis_host,
+                port=args.redis_port,
+                password=args.redis_password,
+                prefix=args.redis_prefix,
+                index_name=args.redis_index,
+                recreate=args.redis_recreate,
+                batch_size=args.sync_batch_size,
+                parallel=args.sync_parallel,
+                delete_missing=not args.keep_missing,
+                algorithm=args.redis_index_algorithm,
+                hnsw={
+                    "M": args.redis_hnsw_m,
+                    "EF_CONSTRUCTION": args.redis_hnsw_ef_construction,
+                    "EF_RUNTIME": args.redis_hnsw_ef_runtime,
+                },
+            )
+        )
+
+    try:
+        for window in iter_windows(chain([first], items), WINDOW_SIZE):
+            payloads = encode(window)
+            for sink in sinks:
+                sink.write(payloads)
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+    for sink in sinks:
+        sink.finish()
+
+    if not sinks:
+        print(
+            "No output target specified. Use --json-output, --vector-output, --qdrant-host, or --redis-host "
+            "to persist embeddings."
         )
+        return
 
-    if not any([args.json_output, args.qdrant_host, args.redis_host]):
-        print("No output target specified. Use --json-output, --qdrant-host, or --redis-host to persist embeddings.")
+    if checkpoint is not None:
+        checkpoint.path.unlink(missing_ok=True)
 
 
 if __name__ == "__main__":
@@ -2,11 +2,23 @@ from __future__ import annotations
 
 import argparse
 import json
+import math
+import shutil
+import time
 from pathlib import Path
-from typing import Iterable, List
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
+import numpy as np
+import torch
 from sentence_transformers import InputExample, SentenceTransformer, losses
-from torch.utils.data import DataLoader
+from torch.utils.data import DataLoader, Dataset
+from transformers import get_linear_schedule_with_warmup
+
+TOKEN_CACHE_FORMAT = 1
+TOKENIZE_CHUNK = 4096
+# Never cap below this many tokens, whatever the length distribution says.
+MIN_SEQ_LENGTH = 16
+STATE_FILE = "trainer_state.pt"
 
 
 def load_triplets(path: Path) -> List[InputExample]:
@@ -21,6 +33,276 @@ def load_triplets(path: Path) -> List[InputExample]:
     return examples
 
 
+def _fingerprint(pairs: Path, model_name: str, columns: int, percentile: float, max_seq_length: Optional[int]) -> Dict[str, Any]:
+    stat = pairs.stat()
+    return {
+        "pairs": str(pairs.resolve()),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "model": model_name,
+        "columns": columns,
+        "percentile": percentile,
+        "max_seq_length": max_seq_length,
+    }
+
+
+def build_token_cache(
+    pairs: Path,
+    cache_dir: Path,
+    tokenize: Callable[[List[str]], List[List[int]]],
+    columns: int,
+    model_max_length: int,
+    fingerprint: Dict[str, Any],
+    percentile: float,
+    max_seq_length: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Tokenize every distinct text in ``pairs`` once and store the ids under ``cache_dir``.
+
+    Layout: ``ids.npy`` (all token ids back to back), ``offsets.npy`` (where each text
+    starts), ``rows.npy`` (one text index per example column) and ``meta.json``. The
+    sequence length is capped at ``percentile`` of the token lengths unless
+    ``max_seq_length`` is given. Returns the metadata; an up-to-date cache is reused.
+    """
+    meta_path = cache_dir / "meta.json"
+    if meta_path.exists():
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta.get("format") == TOKEN_CACHE_FORMAT and meta.get("fingerprint") == fingerprint:
+            return meta
+
+    texts: List[str] = []
+    text_rows: Dict[str, int] = {}
+    rows: List[List[int]] = []
+    with pairs.open("r", encoding="utf-8") as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            example = [record["anchor"], record["positive"], record.get("negative")][:columns]
+            if example[-1] is None:
+                raise SystemExit("Triplet loss needs a negative in every row of the pairs file.")
+            row = []
+            for text in example:
+                idx = text_rows.get(text)
+                if idx is None:
+                    idx = text_rows[text] = len(texts)
+                    texts.append(text)
+                row.append(idx)
+            rows.append(row)
+    if not rows:
+        raise SystemExit("No training examples found.")
+
+    encoded: List[List[int]] = []
+    for start in range(0, len(texts), TOKENIZE_CHUNK):
+        encoded.extend(tokenize(texts[start : start + TOKENIZE_CHUNK]))
+    lengths = np.array([len(ids) for ids in encoded])
+    if max_seq_length is None:
+        max_seq_length = int(math.ceil(np.percentile(lengths, percentile)))
+    cap = max(min(max_seq_length, model_max_length), MIN_SEQ_LENGTH)
+    # Truncated texts keep their final special token ([SEP] / </s>).
+    encoded = [ids if len(ids) <= cap else ids[: cap - 1] + ids[-1:] for ids in encoded]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(ids) for ids in encoded], out=offsets[1:])
+
+    tmp_dir = cache_dir.with_name(f".{cache_dir.name}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    np.save(tmp_dir / "ids.npy", np.fromiter((tok for ids in encoded for tok in ids), dtype=np.int32, count=int(offsets[-1])))
+    np.save(tmp_dir / "offsets.npy", offsets)
+    np.save(tmp_dir / "rows.npy", np.asarray(rows, dtype=np.int32))
+    meta = {
+        "format": TOKEN_CACHE_FORMAT,
+        "fingerprint": fingerprint,
+        "examples": len(rows),
+        "texts": len(texts),
+        "max_seq_length": cap,
+        "truncated": int((lengths > cap).sum()),
+    }
+    (tmp_dir / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    tmp_dir.rename(cache_dir)
+    return meta
+
+
+class TokenizedPairs(Dataset):
+    """Examples from a token cache; arrays are memory-mapped lazily in each worker."""
+
+    def __init__(self, cache_dir: Path, pad_token_id: int) -> None:
+        self.cache_dir = cache_dir
+        self.pad_token_id = pad_token_id
+        self._arrays: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        self._length = len(np.load(cache_dir / "rows.npy", mmap_mode="r"))
+
+    def _load(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if self._arrays is None:
+            self._arrays = tuple(np.load(self.cache_dir / f"{name}.npy", mmap_mode="r") for name in ("ids", "offsets", "rows"))
+        return self._arrays
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, idx: int) -> List[np.ndarray]:
+        ids, offsets, rows = self._load()
+        return [ids[offsets[text] : offsets[text + 1]] for text in rows[idx]]
+
+    def collate(self, batch: List[List[np.ndarray]]) -> Tuple[List[Dict[str, torch.Tensor]], torch.Tensor]:
+        """Pad each column to the longest sequence in the batch, not to the global cap."""
+        features = []
+        for column in zip(*batch):
+            width = max(len(ids) for ids in column)
+            input_ids = torch.full((len(column), width), self.pad_token_id, dtype=torch.long)
+            attention_mask = torch.zeros((len(column), width), dtype=torch.long)
+            for row, ids in enumerate(column):
+                input_ids[row, : len(ids)] = torch.from_numpy(ids.astype(np.int64))
+                attention_mask[row, : len(ids)] = 1
+            features.append({"input_ids": input_ids, "attention_mask": attention_mask})
+        return features, torch.zeros(len(batch), dtype=torch.long)
+
+
+def epoch_batches(examples: int, batch_size: int, seed: int, epoch: int) -> List[np.ndarray]:
+    """The shuffled batches of ``epoch``; the same for a given seed, so a resumed run can skip ahead."""
+    order = np.random.default_rng([seed, epoch]).permutation(examples)
+    return [order[start : start + batch_size] for start in range(0, examples, batch_size)]
+
+
+def save_checkpoint(model: SentenceTransformer, path: Path, state: Dict[str, Any]) -> None:
+    tmp, old = path.with_name(f"{path.name}.tmp"), path.with_name(f"{path.name}.old")
+    shutil.rmtree(tmp, ignore_errors=True)
+    model.save(str(tmp))
+    torch.save(state, tmp / STATE_FILE)
+    if path.exists():
+        # Left over if a previous save died before its cleanup; ``path`` is newer.
+        shutil.rmtree(old, ignore_errors=True)
+        path.rename(old)
+    tmp.rename(path)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def find_checkpoint(path: Path) -> Optional[Path]:
+    """The latest complete checkpoint, including one left behind by a crash mid-save."""
+    for candidate in (path, path.with_name(f"{path.name}.old")):
+        if (candidate / STATE_FILE).exists():
+            return candidate
+    return None
+
+
+def train_fast(args: argparse.Namespace) -> None:
+    """Training loop over a pre-tokenized cache with multi-worker loading and resumable checkpoints."""
+    pairs = Path(args.pairs)
+    output = Path(args.output)
+    cache_dir = Path(args.token_cache) if args.token_cache else pairs.with_name(f"{pairs.stem}.tokens")
+    checkpoint_dir = Path(args.checkpoint_dir) if args.checkpoint_dir else output / "checkpoint"
+    columns = 3 if args.loss == "triplet" else 2
+    fingerprint = _fingerprint(pairs, args.model_name, columns, args.length_percentile, args.max_seq_length)
+
+    checkpoint = find_checkpoint(checkpoint_dir) if args.resume else None
+    state: Dict[str, Any] = {}
+    if checkpoint is not None:
+        state = torch.load(checkpoint / STATE_FILE, map_location="cpu")
+        if state["fingerprint"] != fingerprint:
+            raise SystemExit(f"{checkpoint} was made from different pairs or settings; remove it or drop --resume.")
+        print(f"Resuming from {checkpoint} (epoch {state['epoch'] + 1}, batch {state['batch']}).")
+        model = SentenceTransformer(str(checkpoint))
+    else:
+        model = SentenceTransformer(args.model_name)
+
+    tokenizer = model.tokenizer
+    started = time.monotonic()
+    meta = build_token_cache(
+        pairs,
+        cache_dir,
+        lambda texts: tokenizer(
+            texts, truncation=True, max_length=model.max_seq_length, return_attention_mask=False, return_token_type_ids=False
+        )["input_ids"],
+        columns,
+        model.max_seq_length,
+        fingerprint,
+        args.length_percentile,
+        args.max_seq_length,
+    )
+    print(
+        f"Token cache {cache_dir}: {meta['examples']} examples, {meta['texts']} distinct texts, "
+        f"max_seq_length {meta['max_seq_length']} ({meta['truncated']} truncated), ready in {time.monotonic() - started:.1f}s."
+    )
+    # Saved with the model, so encoding at serving time uses the same cap as training.
+    model.max_seq_length = meta["max_seq_length"]
+
+    dataset = TokenizedPairs(cache_dir, tokenizer.pad_token_id)
+    if args.loss == "triplet":
+        train_loss = losses.TripletLoss(
+            model,
+            distance_metric=losses.TripletDistanceMetric.COSINE,
+            triplet_margin=0.3,
+        )
+    else:
+        train_loss = losses.MultipleNegativesRankingLoss(model)
+    device = model.device
+    train_loss.to(device)
+
+    batches_per_epoch = math.ceil(len(dataset) / args.batch_size)
+    total_steps = batches_per_epoch * args.epochs
+    optimizer = torch.optim.AdamW(train_loss.parameters(), lr=args.lr, weight_decay=0.01)
+    scheduler = get_linear_schedule_with_warmup(optimizer, int(total_steps * args.warmup_ratio), total_steps)
+    start_epoch, start_batch, global_step = 0, 0, 0
+    if state:
+        optimizer.load_state_dict(state["optimizer"])
+        scheduler.load_state_dict(state["scheduler"])
+        torch.set_rng_state(state["torch_rng"])
+        start_epoch, start_batch, global_step = state["epoch"], state["batch"], state["global_step"]
+
+    def checkpoint_state(epoch: int, batch: int) -> Dict[str, Any]:
+        return {
+            "fingerprint": fingerprint,
+            "epoch": epoch,
+            "batch": batch,
+            "global_step": global_step,
+            "optimizer": optimizer.state_dict(),
+            "scheduler": scheduler.state_dict(),
+            "torch_rng": torch.get_rng_state(),
+        }
+
+    for epoch in range(start_epoch, args.epochs):
+        plan = epoch_batches(len(dataset), args.batch_size, args.seed, epoch)
+        loader = DataLoader(
+            dataset,
+            batch_sampler=plan[start_batch:],
+            collate_fn=dataset.collate,
+            num_workers=args.num_workers,
+            prefetch_factor=4 if args.num_workers else None,
+        )
+        train_loss.train()
+        window_start, window_examples, window_loss, window_steps = time.monotonic(), 0, 0.0, 0
+        for batch, (features, labels) in enumerate(loader, start=start_batch):
+            features = [{key: value.to(device) for key, value in column.items()} for column in features]
+            loss = train_loss(features, labels.to(device))
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(train_loss.parameters(), 1.0)
+            optimizer.step()
+            scheduler.step()
+            optimizer.zero_grad()
+            global_step += 1
+            window_examples += len(labels)
+            window_loss += loss.item()
+            window_steps += 1
+
+            if global_step % args.log_steps == 0:
+                elapsed = time.monotonic() - window_start
+                print(
+                    f"epoch {epoch + 1}/{args.epochs} batch {batch + 1}/{batches_per_epoch} "
+                    f"loss {window_loss / window_steps:.4f} {window_examples / elapsed:.1f} examples/s"
+                )
+                window_start, window_examples, window_loss, window_steps = time.monotonic(), 0, 0.0, 0
+            if args.checkpoint_steps and global_step % args.checkpoint_steps == 0 and batch + 1 < batches_per_epoch:
+                save_checkpoint(model, checkpoint_dir, checkpoint_state(epoch, batch + 1))
+        start_batch = 0
+        save_checkpoint(model, checkpoint_dir, checkpoint_state(epoch + 1, 0))
+        print(f"Finished epoch {epoch + 1}/{args.epochs}; checkpoint saved to {checkpoint_dir}.")
+
+    model.save(str(output))
+    if not args.keep_checkpoint:
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+    print(f"Model saved to {args.output}")
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Fine-tune a sentence-transformer for menu similarity.")
     parser.add_argument("--pairs", required=True, help="Path to JSONL triplets generated by generate_similarity_pairs.py")
@@ -31,11 +313,35 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--epochs", type=int, default=2)
     parser.add_argument("--lr", type=float, default=2e-5)
     parser.add_argument("--warmup-ratio", type=float, default=0.1)
+    parser.add_argument(
+        "--fast",
+        action="store_true",
+        help="Train from a pre-tokenized cache with multi-worker loading, checkpoints and throughput logs.",
+    )
+    parser.add_argument("--token-cache", help="Token cache directory (--fast; default: <pairs stem>.tokens next to --pairs).")
+    parser.add_argument("--num-workers", type=int, default=2, help="DataLoader worker processes (--fast).")
+    parser.add_argument(
+        "--length-percentile",
+        type=float,
+        default=99.0,
+        help="Cap sequences at this percentile of the token lengths (--fast; default 99).",
+    )
+    parser.add_argument("--max-seq-length", type=int, help="Explicit sequence length cap; overrides --length-percentile.")
+    parser.add_argument("--checkpoint-dir", help="Checkpoint directory (--fast; default: <output>/checkpoint).")
+    parser.add_argument("--checkpoint-steps", type=int, default=500, help="Optimizer steps between checkpoints (0 = per epoch only).")
+    parser.add_argument("--resume", action="store_true", help="Continue from the latest checkpoint, mid-epoch if needed (--fast).")
+    parser.add_argument("--keep-checkpoint", action="store_true", help="Keep the checkpoint after training finishes (--fast).")
+    parser.add_argument("--log-steps", type=int, default=50, help="Optimizer steps between throughput logs (--fast).")
+    parser.add_argument("--seed", type=int, default=42, help="Shuffle seed (--fast).")
     return parser.parse_args()
 
 
 def main() -> None:
     args = parse_args()
+    if args.fast:
+        train_fast(args)
+        return
+
     data_path = Path(args.pairs)
     examples = load_triplets(data_path)
     if not examples:
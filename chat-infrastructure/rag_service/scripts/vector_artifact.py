@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# An artifact at ``x.npy`` is the sidecar ``x.meta.json`` (ids, shape, generation),
+# which names its matrix ``x.<generation>.npy`` and optional ``x.<generation>.items.json``
+# metadata. Replacing the sidecar switches readers to a new generation in one step.
+FORMAT_VERSION = 2
+DTYPES = ("float32", "float16")
+GENERATION_LENGTH = 12
+
+
+@dataclass
+class VectorArtifact:
+    """Menu item vectors: row ``i`` of ``vectors`` belongs to ``ids[i]``.
+
+    ``vectors`` is a read-only memory map when loaded with ``mmap=True``; pages are
+    only read from disk when rows are touched.
+    """
+
+    ids: List[str]
+    vectors: np.ndarray
+    metadata: Optional[List[Dict[str, Any]]] = None
+    _rows: Dict[str, int] = field(default_factory=dict, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def row(self, menu_item_id: str) -> int:
+        if not self._rows:
+            self._rows = {item_id: idx for idx, item_id in enumerate(self.ids)}
+        return self._rows[menu_item_id]
+
+    def vector(self, menu_item_id: str) -> np.ndarray:
+        return self.vectors[self.row(menu_item_id)]
+
+
+def sidecar_path(path: Path) -> Path:
+    return path.with_suffix(".meta.json")
+
+
+def _generation_path(path: Path, generation: str, suffix: str) -> Path:
+    return path.with_name(f"{path.stem}.{generation}{suffix}")
+
+
+def _remove_other_generations(path: Path, generation: str) -> None:
+    for suffix in (".npy", ".items.json"):
+        pattern = re.compile(rf"{re.escape(path.stem)}\.[0-9a-f]{{{GENERATION_LENGTH}}}{re.escape(suffix)}")
+        for old in path.parent.glob(f"{path.stem}.*{suffix}"):
+            if pattern.fullmatch(old.name) and old != _generation_path(path, generation, suffix):
+                old.unlink(missing_ok=True)
+
+
+def _replace_atomically(path: Path, write: Any) -> None:
+    tmp = path.with_name(f".{path.name}.tmp")
+    with tmp.open("wb") as handle:
+        write(handle)
+    os.replace(tmp, path)
+
+
+def write_artifact(
+    path: Path,
+    ids: Sequence[str],
+    vectors: Any,
+    metadata: Optional[Sequence[Dict[str, Any]]] = None,
+    dtype: str = "float32",
+) -> None:
+    """Write a new generation of the artifact at ``path``.
+
+    The matrix and metadata go to new generation files, and the sidecar is replaced
+    last. Readers therefore see either the old generation or the new one, never a mix.
+    Files of older generations are removed afterwards.
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype must be one of {DTYPES}")
+    matrix = np.ascontiguousarray(np.asarray(vectors, dtype=dtype))
+    if matrix.ndim != 2 or matrix.shape[0] != len(ids):
+        raise ValueError(f"Expected {len(ids)} vectors, got an array of shape {matrix.shape}")
+    if metadata is not None and len(metadata) != len(ids):
+        raise ValueError("metadata must have one entry per id")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    generation = uuid.uuid4().hex[:GENERATION_LENGTH]
+    matrix_path = _generation_path(path, generation, ".npy")
+    metadata_path = _generation_path(path, generation, ".items.json") if metadata is not None else None
+    sidecar = {
+        "format": FORMAT_VERSION,
+        "generation": generation,
+        "dtype": dtype,
+        "count": matrix.shape[0],
+        "dim": matrix.shape[1],
+        "matrix": matrix_path.name,
+        "metadata": metadata_path.name if metadata_path else None,
+        "ids": [str(item_id) for item_id in ids],
+    }
+    _replace_atomically(matrix_path, lambda handle: np.save(handle, matrix, allow_pickle=False))
+    if metadata_path is not None:
+        _replace_atomically(metadata_path, lambda handle: handle.write(_json_bytes(list(metadata))))
+    _replace_atomically(sidecar_path(path), lambda handle: handle.write(_json_bytes(sidecar)))
+    _remove_other_generations(path, generation)
+
+
+def _json_bytes(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def load_artifact(path: Path, mmap: bool = True, with_metadata: bool = False) -> VectorArtifact:
+    """Load the current generation; ``metadata`` is only read with ``with_metadata``.
+
+    If a writer replaces the artifact and removes this generation's files while they
+    are being opened, the new generation is loaded instead.
+    """
+    try:
+        return _load_generation(path, mmap, with_metadata)
+    except FileNotFoundError:
+        if not sidecar_path(path).exists():
+            raise
+        return _load_generation(path, mmap, with_metadata)
+
+
+def _load_generation(path: Path, mmap: bool, with_metadata: bool) -> VectorArtifact:
+    sidecar = json.loads(sidecar_path(path).read_text(encoding="utf-8"))
+    if sidecar.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported vector artifact format in {sidecar_path(path)}")
+    matrix_path = path.with_name(sidecar["matrix"])
+    vectors = np.load(matrix_path, mmap_mode="r" if mmap else None, allow_pickle=False)
+    if vectors.shape != (sidecar["count"], sidecar["dim"]):
+        raise ValueError(
+            f"{matrix_path} holds {vectors.shape}, sidecar expects ({sidecar['count']}, {sidecar['dim']})"
+        )
+    metadata = None
+    if with_metadata:
+        metadata = (
+            json.loads(path.with_name(sidecar["metadata"]).read_text(encoding="utf-8"))
+            if sidecar.get("metadata")
+            else [{} for _ in sidecar["ids"]]
+        )
+    return VectorArtifact(ids=sidecar["ids"], vectors=vectors, metadata=metadata)
+
+
+def json_to_artifact(json_path: Path, path: Path, dtype: str = "float32") -> int:
+    """Convert a ``sync_menu_vectors.py --json-output`` file; returns the number of vectors."""
+    entries = json.loads(json_path.read_text(encoding="utf-8")).get("items", [])
+    write_artifact(
+        path,
+        [entry["menu_item_id"] for entry in entries],
+        [entry["vector"] for entry in entries],
+        [entry.get("metadata") or {} for entry in entries],
+        dtype=dtype,
+    )
+    return len(entries)
+
+
+def artifact_to_json(path: Path, json_path: Path) -> int:
+    """Write an artifact back out in the ``--json-output`` layout; returns the number of vectors."""
+    artifact = load_artifact(path, with_metadata=True)
+    data = [
+        {"menu_item_id": item_id, "vector": artifact.vectors[idx].astype(np.float32).tolist(), "metadata": meta}
+        for idx, (item_id, meta) in enumerate(zip(artifact.ids, artifact.metadata or []))
+    ]
+    json_path.parent.mkdir(parents=True, exist_ok=True)
+    json_path.write_text(json.dumps({"items": data}, indent=2, ensure_ascii=False), encoding="utf-8")
+    return len(data)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Convert and inspect memory-mapped menu vector artifacts.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    from_json = subparsers.add_parser("from-json", help="Convert a --json-output file to an artifact.")
+    from_json.add_argument("input", help="Embeddings JSON written by sync_menu_vectors.py --json-output.")
+    from_json.add_argument("output", help="Artifact path, e.g. data/menu_vectors.npy.")
+    from_json.add_argument("--dtype", choices=DTYPES, default="float32")
+
+    to_json = subparsers.add_parser("to-json", help="Convert an artifact back to the JSON layout.")
+    to_json.add_argument("input", help="Artifact .npy path.")
+    to_json.add_argument("output", help="JSON file to write.")
+
+    info = subparsers.add_parser("info", help="Print the shape and dtype of an artifact.")
+    info.add_argument("input", help="Artifact .npy path.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.command == "from-json":
+        count = json_to_artifact(Path(args.input), Path(args.output), args.dtype)
+        print(f"Wrote {count} vectors to the artifact {sidecar_path(Path(args.output))}.")
+    elif args.command == "to-json":
+        count = artifact_to_json(Path(args.input), Path(args.output))
+        print(f"Wrote {count} vectors to {args.output}.")
+    else:
+        artifact = load_artifact(Path(args.input))
+        print(f"{len(artifact)} vectors x {artifact.vectors.shape[1]} dims, {artifact.vectors.dtype}.")
+
+
+if __name__ == "__main__":
+    main()
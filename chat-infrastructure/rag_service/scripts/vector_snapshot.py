@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
+
+import msgpack
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from qdrant_client import QdrantClient  # noqa: E402
+from qdrant_client.http import models as qm  # noqa: E402
+
+from app.config import get_settings  # noqa: E402
+from app.services.vectorstore import create_versioned_collection, get_client, resolve_alias  # noqa: E402
+from rebuild_collection import check_legacy, go_live, point_count  # noqa: E402
+
+try:  # zstd is optional; without it snapshots are written uncompressed.
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+# File layout: MAGIC, one compression byte, then a stream of msgpack frames: the
+# manifest, point batches ({"ids", "vectors", "payloads"}) and an {"end"} trailer.
+MAGIC = b"RAGVEC1\n"
+COMPRESSION_NONE = 0
+COMPRESSION_ZSTD = 1
+FORMAT_VERSION = 1
+# Qdrant's default; indexing is switched off while a snapshot is bulk loaded.
+DEFAULT_INDEXING_THRESHOLD = 20000
+
+
+def _open_reader(handle: BinaryIO) -> BinaryIO:
+    if handle.read(len(MAGIC)) != MAGIC:
+        raise SystemExit("Not a vector snapshot file.")
+    compression = handle.read(1)[0]
+    if compression == COMPRESSION_ZSTD:
+        if zstandard is None:
+            raise SystemExit("Snapshot is zstd-compressed but the zstandard package is not installed.")
+        return zstandard.ZstdDecompressor().stream_reader(handle)
+    return handle
+
+
+def read_frames(path: Path) -> Iterator[Dict[str, Any]]:
+    with path.open("rb") as handle:
+        yield from msgpack.Unpacker(_open_reader(handle), raw=False, max_buffer_size=1 << 30)
+
+
+def stored_embed_model(client: QdrantClient, collection: str, fallback: Optional[str]) -> str:
+    """The ``embed_model`` recorded on the collection's points at ingest time."""
+    points, _ = client.scroll(
+        collection_name=collection,
+        scroll_filter=qm.Filter(must_not=[qm.IsEmptyCondition(is_empty=qm.PayloadField(key="embed_model"))]),
+        limit=1,
+        with_payload=["embed_model"],
+        with_vectors=False,
+    )
+    model = (points[0].payload or {}).get("embed_model") if points else fallback
+    if not model:
+        raise SystemExit(
+            f"{collection} records no embedding model (ingested before it was stored); "
+            "pass --embed-model to vouch for the model its vectors came from."
+        )
+    if fallback and model != fallback:
+        raise SystemExit(f"{collection} was embedded with '{model}', not '{fallback}'.")
+    return model
+
+
+def export_snapshot(
+    client: QdrantClient,
+    collection: str,
+    output: Path,
+    batch_size: int,
+    compress: bool,
+    embed_model: Optional[str] = None,
+) -> int:
+    """Write every point of ``collection`` to ``output``; returns the number of points.
+
+    The manifest names the embedding model recorded on the points, never the one this
+    node is configured with. Points without one count as ``embed_model``; points of
+    another model abort the export.
+    """
+    info = client.get_collection(collection)
+    vectors_config = info.config.params.vectors
+    model = stored_embed_model(client, collection, embed_model)
+    manifest = {
+        "format": FORMAT_VERSION,
+        "collection": collection,
+        "embed_model": model,
+        "vector_size": vectors_config.size,
+        "distance": str(vectors_config.distance.value),
+        "points": point_count(client, collection),
+        "created_at": time.time(),
+    }
+    compression = COMPRESSION_ZSTD if compress and zstandard is not None else COMPRESSION_NONE
+    exported = 0
+    output.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        with output.open("wb") as handle:
+            handle.write(MAGIC + bytes([compression]))
+            stream: Any = zstandard.ZstdCompressor(level=3).stream_writer(handle) if compression else handle
+            stream.write(msgpack.packb(manifest, use_bin_type=True))
+            offset = None
+            while True:
+                points, offset = client.scroll(
+                    collection_name=collection, limit=batch_size, offset=offset, with_payload=True, with_vectors=True
+                )
+                for point in points:
+                    point_model = (point.payload or {}).get("embed_model", embed_model)
+                    if point_model != model:
+                        raise SystemExit(
+                            f"Point {point.id} records embedding model {point_model!r}, not '{model}'. Pass "
+                            "--embed-model for points ingested before it was stored, or rebuild the collection."
+                        )
+                if points:
+                    frame = {
+                        "ids": [point.id for point in points],
+                        "vectors": np.asarray([point.vector for point in points], dtype="<f4").tobytes(),
+                        "payloads": [point.payload or {} for point in points],
+                    }
+                    stream.write(msgpack.packb(frame, use_bin_type=True))
+                    exported += len(points)
+                if offset is None:
+                    break
+            stream.write(msgpack.packb({"end": True, "points": exported}, use_bin_type=True))
+            if compression:
+                stream.flush(zstandard.FLUSH_FRAME)
+    except BaseException:
+        # A partial file must not pass for a snapshot.
+        output.unlink(missing_ok=True)
+        raise
+    return exported
+
+
+def import_snapshot(client: QdrantClient, path: Path, parallel: int, index_timeout: float) -> Tuple[str, bool]:
+    """Bulk-load ``path`` into a new versioned collection.
+
+    Refuses snapshots made with a different embedding model than this node uses,
+    since their vectors would not match query embeddings. Returns the collection's
+    name and whether its index finished building within ``index_timeout``.
+    """
+    settings = get_settings()
+    frames = read_frames(path)
+    manifest = next(frames, None)
+    if not manifest or manifest.get("format") != FORMAT_VERSION:
+        raise SystemExit("Unsupported or empty snapshot.")
+    if manifest["embed_model"] != settings.ollama_embed_model:
+        raise SystemExit(
+            f"Snapshot was embedded with '{manifest['embed_model']}' but OLLAMA_EMBED_MODEL is "
+            f"'{settings.ollama_embed_model}'."
+        )
+    if manifest["distance"] != qm.Distance.COSINE.value:
+        raise SystemExit(f"Unsupported distance '{manifest['distance']}'.")
+
+    dim = manifest["vector_size"]
+    collection = create_versioned_collection(client, settings.qdrant_collection, dim)
+    client.update_collection(collection, optimizers_config=qm.OptimizersConfigDiff(indexing_threshold=0))
+    print(f"Loading {manifest['points']} points from {manifest['collection']} into {collection}.")
+
+    def upsert(frame: Dict[str, Any]) -> int:
+        vectors = np.frombuffer(frame["vectors"], dtype="<f4").reshape(-1, dim)
+        client.upsert(
+            collection_name=collection,
+            points=qm.Batch(ids=frame["ids"], vectors=vectors.tolist(), payloads=frame["payloads"]),
+            wait=True,
+        )
+        return len(frame["ids"])
+
+    loaded = 0
+    trailer = None
+    pending: Set[Future] = set()
+    try:
+        with ThreadPoolExecutor(max_workers=max(parallel, 1)) as executor:
+            for frame in frames:
+                if frame.get("end"):
+                    trailer = frame
+                    break
+                if len(pending) >= parallel * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    loaded += sum(future.result() for future in done)
+                pending.add(executor.submit(upsert, frame))
+            loaded += sum(future.result() for future in pending)
+        if trailer is None or trailer["points"] != loaded:
+            raise SystemExit(f"Snapshot is truncated: loaded {loaded} points.")
+    except BaseException:
+        client.delete_collection(collection)
+        raise
+
+    client.update_collection(
+        collection, optimizers_config=qm.OptimizersConfigDiff(indexing_threshold=DEFAULT_INDEXING_THRESHOLD)
+    )
+    deadline = time.monotonic() + index_timeout
+    indexed = True
+    while client.get_collection(collection).status != qm.CollectionStatus.GREEN:
+        if time.monotonic() > deadline:
+            print(f"Warning: {collection} is still indexing; searches are exact until it finishes.")
+            indexed = False
+            break
+        time.sleep(1)
+    print(f"Loaded {loaded} points into {collection}.")
+    return collection, indexed
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Export the vector collection to a local file, or bootstrap a node from one without re-embedding."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export = subparsers.add_parser("export", help="Dump points, vectors and payloads of the live collection.")
+    export.add_argument("output", help="Snapshot file to write.")
+    export.add_argument("--collection", help="Collection or alias to export (defaults to QDRANT_COLLECTION).")
+    export.add_argument("--batch-size", type=int, default=1000, help="Points per scroll page and file frame.")
+    export.add_argument("--no-compress", action="store_true", help="Write without zstd compression.")
+    export.add_argument(
+        "--embed-model",
+        help="Model to record for points ingested before the model was stored on them; "
+        "points recording another model still abort the export.",
+    )
+
+    load = subparsers.add_parser("import", help="Load a snapshot into a new collection and switch the alias to it.")
+    load.add_argument("input", help="Snapshot file to read.")
+    load.add_argument("--parallel", type=int, default=4, help="Concurrent upsert batches.")
+    load.add_argument(
+        "--index-timeout",
+        type=float,
+        default=600,
+        help="Seconds to wait for the HNSW index before switching (default 600).",
+    )
+    load.add_argument(
+        "--switch-while-indexing",
+        action="store_true",
+        help="Switch the alias even if the index is still building after --index-timeout "
+        "(searches are exact, and slow, until it finishes).",
+    )
+    load.add_argument("--no-switch", action="store_true", help="Load the collection but leave the alias.")
+    load.add_argument(
+        "--migrate-legacy",
+        action="store_true",
+        help="Replace a plain collection named like the alias (pre blue/green deployments).",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    client = get_client()
+    alias = get_settings().qdrant_collection
+    if args.command == "export":
+        collection = args.collection or resolve_alias(client, alias) or alias
+        output = Path(args.output)
+        started = time.monotonic()
+        exported = export_snapshot(
+            client, collection, output, args.batch_size, not args.no_compress, args.embed_model
+        )
+        print(
+            f"Exported {exported} points from {collection} to {output} "
+            f"({output.stat().st_size / 1e6:.1f} MB) in {time.monotonic() - started:.1f}s."
+        )
+        return
+
+    if not args.no_switch:
+        check_legacy(client, alias, args.migrate_legacy)
+    collection, indexed = import_snapshot(client, Path(args.input), args.parallel, args.index_timeout)
+    if args.no_switch:
+        return
+    if not indexed and not args.switch_while_indexing:
+        print(f"Alias left in place; once {collection} is indexed, run: rebuild_collection.py switch {collection}")
+        return
+    go_live(client, alias, collection, args.migrate_legacy)
+
+
+if __name__ == "__main__":
+    main()